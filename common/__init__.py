@@ -2,6 +2,7 @@ from .ptconfig import load_config, write_config
 from .resolver import Resolver
 from .data_file_collector import DataFileCollector
 from .trace_data_category import TraceDataCategory
+from .trace_data_encoding import InternTable
 
 __all__ = [
     load_config.__name__,
@@ -9,4 +10,5 @@ __all__ = [
     Resolver.__name__,
     DataFileCollector.__name__,
     TraceDataCategory.__name__,
+    InternTable.__name__,
 ]
@@ -0,0 +1,68 @@
+import bz2
+import gzip
+import lzma
+import pathlib
+import typing
+
+import pandas as pd
+
+# Compressions that trace data files may be written with; see `ptconfig.PyTypes.output_compression`
+Compression = typing.Literal["gzip", "bz2", "xz"]
+
+_COMPRESSORS: dict[str, typing.Callable[[bytes], bytes]] = {
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+
+# Leading bytes of each compression's format; pickles always start with b"\x80"
+_MAGIC_NUMBERS: dict[bytes, str] = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+}
+
+
+def compress(data: bytes, compression: str | None) -> bytes:
+    """
+    Compress the given data.
+
+    :param data: The data to compress
+    :param compression: One of the names given by `Compression`, or None to leave the data as it is
+    :returns: The compressed data
+    """
+    if compression is None:
+        return data
+
+    compressor = _COMPRESSORS.get(compression)
+    if compressor is None:
+        raise ValueError(
+            f"Unsupported compression {compression}; expected one of {list(_COMPRESSORS)}"
+        )
+    return compressor(data)
+
+
+def detect(path: pathlib.Path) -> str | None:
+    """
+    Detect the compression of a file from its leading bytes, as the file endings of trace data files do not indicate it.
+
+    :param path: Path to the file
+    :returns: The name of the compression, or None if the file is not compressed
+    """
+    with path.open("rb") as f:
+        head = f.read(max(map(len, _MAGIC_NUMBERS)))
+
+    for magic, compression in _MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def read_pickle(path: pathlib.Path) -> typing.Any:
+    """
+    Load a pickled object, such as trace data, from a file that may be compressed.
+
+    :param path: Path to the file
+    :returns: The unpickled object
+    """
+    return pd.read_pickle(path, compression=detect(path))
@@ -22,13 +22,9 @@ class DataFileCollector(ABC):
         :param path: The path of the folder containing the files. 
         :param include_also_files_in_subdirectories: Whether the data files in the subfolders should also be collected."""
         self.collected_data.clear()
-        if include_also_files_in_subdirectories:
-            potential_trace_data_file_paths = path.rglob(self.file_pattern)
-        else:
-            potential_trace_data_file_paths = path.glob(self.file_pattern)
-
-        # Ensures that the order is deterministic.
-        sorted_potential_trace_data_file_paths = sorted(potential_trace_data_file_paths)
+        sorted_potential_trace_data_file_paths = self._find_file_paths(
+            path, include_also_files_in_subdirectories
+        )
         for potential_trace_data_file_path in sorted_potential_trace_data_file_paths:
             try:
                 potential_data = self._on_potential_file_path_found(
@@ -44,6 +40,17 @@ class DataFileCollector(ABC):
                 logger.error(exception)
                 continue
 
+    def _find_file_paths(
+        self, path: pathlib.Path, include_also_files_in_subdirectories: bool
+    ) -> list[pathlib.Path]:
+        if include_also_files_in_subdirectories:
+            potential_file_paths = path.rglob(self.file_pattern)
+        else:
+            potential_file_paths = path.glob(self.file_pattern)
+
+        # Ensures that the order is deterministic.
+        return sorted(potential_file_paths)
+
     @abstractmethod
     def _on_potential_file_path_found(self, file_path: pathlib.Path) -> typing.Any:
         pass
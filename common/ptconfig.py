@@ -7,6 +7,8 @@ from dacite.exceptions import DaciteError
 import toml
 
 import constants
+from common.compression import Compression
+from common.trace_data_file import Format
 
 
 @dataclass
@@ -18,6 +20,20 @@ class PyTypes:
     proj_path: pathlib.Path
     venv_path: pathlib.Path
     benchmark_performance: bool = False
+    benchmark_warmup: int = 2
+    benchmark_repetitions: int = 10
+    apply_optimisations: bool = False
+    type_only_snapshots: bool = False
+    saturation_threshold: int = 10
+    saturation_backoff: int = 50
+    recursion_depth: int = 10
+    ignore_modules: list[str] = field(default_factory=list)
+    ignore_functions: list[str] = field(default_factory=list)
+    ignore_decorators: list[str] = field(default_factory=list)
+    persist_saturation: bool = False
+    output_format: Format = "columnar"
+    output_compression: Compression | None = None
+    trace_store: bool = False
 
     output_template: str = field(
         default="pytypes/{project}/{test_case}/{func_name}"
@@ -29,6 +45,19 @@ class PyTypes:
         + constants.NP_ARRAY_FILE_ENDING,
         repr=False,
     )
+    output_benchmark_template: str = field(
+        default="pytypes/{project}/{test_case}/{func_name}"
+        + constants.BENCHMARK_FILE_ENDING,
+        repr=False,
+    )
+    saturation_cache_template: str = field(
+        default="pytypes/{project}/" + constants.SATURATION_CACHE_FILE_NAME,
+        repr=False,
+    )
+    trace_store_template: str = field(
+        default="pytypes/{project}/" + constants.TRACE_STORE_FILE_NAME,
+        repr=False,
+    )
 
 
 @dataclass
@@ -146,6 +175,9 @@ def write_config(config_path: pathlib.Path, pttoml: TomlCfg):
     ad = asdict(pttoml)
     ad["pytypes"].pop("output_template")
     ad["pytypes"].pop("output_npy_template")
+    ad["pytypes"].pop("output_benchmark_template")
+    ad["pytypes"].pop("saturation_cache_template")
+    ad["pytypes"].pop("trace_store_template")
 
     with config_path.open("w") as f:
         toml.dump(ad, f)
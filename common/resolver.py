@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import functools
 import importlib.util
 from importlib.machinery import SourceFileLoader
@@ -6,7 +6,9 @@ import logging
 import os
 import pathlib
 import sys
+import typing
 from types import ModuleType, NoneType
+import weakref
 
 import pandas as pd
 
@@ -36,6 +38,15 @@ def _attempt_module_lookup(
     return None
 
 
+class ResolverCacheInfo(typing.NamedTuple):
+    """Statistics of the cache behind `Resolver.get_module_and_name`"""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
 @dataclass
 class Resolver:
     """
@@ -44,12 +55,21 @@ class Resolver:
     :param proj_path: Path to root directory containing the project's types
     :param stdlib_path: Path to standard library's directory of the Python binary, containing stdlib types
     :param venv_path: Path to project's virtual environment's directory containing third-party deps
+    :param cache_size: Maximum amount of types whose module and name are remembered by `get_module_and_name`
 
     :raises ValueError: If any of the three specified paths is not a directory
     """
     stdlib_path: pathlib.Path
     proj_path: pathlib.Path
     venv_path: pathlib.Path
+    cache_size: int = 4096
+
+    # Weakly keyed, so that dynamically created types can still be garbage collected
+    _module_and_name_cache: weakref.WeakKeyDictionary[type, tuple[str | None, str] | None] = field(
+        default_factory=weakref.WeakKeyDictionary, init=False, repr=False, compare=False
+    )
+    _cache_hits: int = field(default=0, init=False, repr=False, compare=False)
+    _cache_misses: int = field(default=0, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         for path in (self.stdlib_path, self.proj_path, self.venv_path):
@@ -126,10 +146,40 @@ class Resolver:
     def get_module_and_name(self, ty: type) -> tuple[str | None, str] | None:
         """Retrieve module path and qualified type name from a type.
         Fails if the type lies outside of the three paths specified in the constructor.
+        Results are cached per type, see `cache_info`.
 
         :param ty: Any given type whose defining file is relative to the specified paths
         :return: a pair of (module name, type name) if successful, where module_name is None is the type is a builtin
         """
+        cache = self._module_and_name_cache
+        try:
+            module_and_name = cache[ty]
+        except KeyError:
+            self._cache_misses += 1
+            module_and_name = self._lookup_module_and_name(ty)
+
+            # Evict the oldest entry
+            if len(cache) >= self.cache_size:
+                cache.pop(next(iter(cache)), None)
+            cache[ty] = module_and_name
+        else:
+            self._cache_hits += 1
+
+        return module_and_name
+
+    def cache_info(self) -> ResolverCacheInfo:
+        """Report the usage of the cache behind `get_module_and_name`.
+
+        :return: The amount of cache hits and misses, and the maximum and current size of the cache
+        """
+        return ResolverCacheInfo(
+            hits=self._cache_hits,
+            misses=self._cache_misses,
+            maxsize=self.cache_size,
+            currsize=len(self._module_and_name_cache),
+        )
+
+    def _lookup_module_and_name(self, ty: type) -> tuple[str | None, str] | None:
         # 0. builtin types
         module = sys.modules[ty.__module__]
         logger.debug(f"{(module.__name__, ty.__name__)} as builtin?")
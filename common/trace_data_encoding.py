@@ -0,0 +1,308 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+from constants import Column, Schema
+
+
+STRING_COLUMNS: list[str] = [
+    column
+    for column, dtype in Schema.TraceData.items()
+    if isinstance(dtype, pd.StringDtype)
+]
+
+
+class InternTable:
+    """
+    Table of all strings that occur in dictionary-encoded trace data.
+
+    Trace data that is encoded with the same table shares its categories, so that it can be
+    concatenated without falling back to storing every string per row.
+    """
+
+    def __init__(self):
+        """Creates an empty intern table."""
+        self._codes: dict[str, int] = dict()
+        self._strings: list[str] = list()
+        self._dtype: pd.CategoricalDtype | None = None
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def __contains__(self, string: str) -> bool:
+        return string in self._codes
+
+    def intern(self, strings: typing.Iterable[str]) -> None:
+        """
+        Add the given strings to the table, unless they are already contained.
+
+        :param strings: The strings to add
+        """
+        for string in strings:
+            if string not in self._codes:
+                self._codes[string] = len(self._strings)
+                self._strings.append(string)
+                self._dtype = None
+
+    def dtype(self) -> pd.CategoricalDtype:
+        """
+        Get the dtype that encodes every string in the table.
+
+        :returns: A categorical dtype whose categories are the strings of the table, in insertion order
+        """
+        if self._dtype is None:
+            self._dtype = pd.CategoricalDtype(categories=self._strings)
+        return self._dtype
+
+
+def is_compact(trace_data: pd.DataFrame) -> bool:
+    """
+    Check whether the string columns of the given trace data are dictionary-encoded,
+    i.e. whether it conforms to `Schema.CompactTraceData` rather than `Schema.TraceData`.
+
+    :param trace_data: The trace data to check
+    :returns: True if any string column is categorical
+    """
+    return any(
+        isinstance(trace_data.dtypes[column], pd.CategoricalDtype)
+        for column in STRING_COLUMNS
+        if column in trace_data.columns
+    )
+
+
+def multiplicity_columns(columns: typing.Iterable[str]) -> list[str] | None:
+    """
+    Get the columns of `Schema.Multiplicities` that follow the columns of `Schema.TraceData`.
+
+    :param columns: The columns of a DataFrame
+    :returns: The multiplicity columns, in their order in `Schema.Multiplicities`,
+    or None if the columns are not those of trace data
+    """
+    columns = list(columns)
+    trace_data_columns = list(Schema.TraceData.keys())
+    extra = columns[len(trace_data_columns) :]
+    if columns[: len(trace_data_columns)] != trace_data_columns or extra != [
+        column for column in Schema.Multiplicities if column in extra
+    ]:
+        return None
+    return extra
+
+
+def has_trace_data_schema(trace_data: pd.DataFrame) -> bool:
+    """
+    Check whether the given DataFrame is trace data in either encoding.
+
+    :param trace_data: The DataFrame to check
+    :returns: True if its columns and their types conform to `Schema.TraceData` or `Schema.CompactTraceData`,
+    optionally followed by columns of `Schema.Multiplicities`
+    """
+    multiplicities = multiplicity_columns(trace_data.columns)
+    if multiplicities is None:
+        return False
+
+    schema = Schema.CompactTraceData if is_compact(trace_data) else Schema.TraceData
+    schema = schema | {column: Schema.Multiplicities[column] for column in multiplicities}
+    return all(
+        _has_dtype(trace_data.dtypes[column], dtype) for column, dtype in schema.items()
+    )
+
+
+def _has_dtype(actual: typing.Any, expected: typing.Any) -> bool:
+    # Categorical dtypes only compare equal if their categories do, which are irrelevant here
+    if isinstance(expected, pd.CategoricalDtype):
+        return isinstance(actual, pd.CategoricalDtype)
+    return actual == expected
+
+
+def compact(
+    trace_data: pd.DataFrame, intern_table: InternTable | None = None
+) -> pd.DataFrame:
+    """
+    Dictionary-encode the string columns of the given trace data.
+
+    :param trace_data: The trace data to encode, in either encoding
+    :param intern_table: The table to intern the strings in. Trace data encoded with the same table
+    after all of its strings have been interned shares its categories
+    :returns: The trace data, conforming to `Schema.CompactTraceData`
+    """
+    if intern_table is None:
+        intern_table = InternTable()
+
+    for column in STRING_COLUMNS:
+        intern_table.intern(trace_data[column].dropna().unique())
+
+    dtype = intern_table.dtype()
+    return trace_data.assign(
+        **{column: _encode(trace_data[column], dtype) for column in STRING_COLUMNS}
+    )
+
+
+def _encode(values: pd.Series, dtype: pd.CategoricalDtype) -> pd.Categorical:
+    # Unlike astype, which keeps the order of categories that only differ in their order from the dtype's,
+    # as such dtypes compare equal, this always yields codes into the categories of the dtype
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categorical = values.array
+    else:
+        categorical = pd.Categorical(values)
+
+    # The appended -1 maps the code of missing values onto itself
+    mapping = np.append(dtype.categories.get_indexer(categorical.categories), -1)
+    return pd.Categorical.from_codes(mapping[categorical.codes], dtype=dtype)
+
+
+def expand(trace_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Decode the string columns of the given trace data.
+
+    :param trace_data: The trace data to decode, in either encoding
+    :returns: The trace data, conforming to `Schema.TraceData`
+    """
+    return trace_data.astype(Schema.TraceData)
+
+
+def with_encoding_of(
+    processed: pd.DataFrame, trace_data: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Convert the processed trace data into the encoding of the trace data it was derived from.
+
+    :param processed: The trace data to convert
+    :param trace_data: The trace data whose encoding is adopted
+    :returns: The processed trace data, in the encoding of `trace_data`
+    """
+    if is_compact(trace_data):
+        return processed.astype(Schema.CompactTraceData)
+    return processed.astype(Schema.TraceData)
+
+
+def occurrences(trace_data: pd.DataFrame) -> pd.Series:
+    """
+    Get how often each row of the given trace data has occurred.
+
+    :param trace_data: The trace data, in either encoding
+    :returns: The `Column.COUNT` of each row, or 1 for trace data without counts, aligned with the trace data
+    """
+    if Column.COUNT in trace_data.columns:
+        return trace_data[Column.COUNT].fillna(1)
+    return pd.Series(1, index=trace_data.index, dtype=pd.UInt64Dtype())
+
+
+def per_test(trace_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Get the multiplicities of the rows of a single file, i.e. traced test, which counts once per row
+    however often the row occurs in it. Multiplicities the file already has are kept.
+
+    :param trace_data: The trace data of the file, in either encoding
+    :returns: The trace data, followed by all columns of `Schema.Multiplicities`
+    """
+    ones = pd.array(np.ones(len(trace_data), dtype=np.uint64), dtype=pd.UInt64Dtype())
+    multiplicities = {
+        column: trace_data[column] if column in trace_data.columns else ones
+        for column in Schema.Multiplicities
+    }
+    counted = trace_data[list(Schema.TraceData)].assign(**multiplicities)
+    counted.loc[counted.duplicated(list(Schema.TraceData)), Column.TESTS] = 0
+    return counted
+
+
+def deduplicate(trace_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop duplicate rows of the given trace data, regardless of their multiplicities,
+    which are summed up into the first occurrence of each row instead.
+
+    :param trace_data: The trace data to deduplicate, in either encoding
+    :returns: The unique rows in the order of their first occurrence, with a new index
+    """
+    multiplicities = multiplicity_columns(trace_data.columns)
+    if not multiplicities:
+        return trace_data.drop_duplicates(ignore_index=True)
+
+    if Column.COUNT in multiplicities:
+        trace_data = trace_data.assign(**{Column.COUNT: occurrences(trace_data)})
+    summed = trace_data[multiplicities].groupby(
+        grouping_keys(trace_data, list(Schema.TraceData)), dropna=False, sort=False
+    ).transform("sum")
+    first = ~trace_data.duplicated(list(Schema.TraceData))
+    return trace_data[first].assign(**summed[first]).reset_index(drop=True)
+
+
+def grouping_keys(trace_data: pd.DataFrame, columns: list[str]) -> list[pd.Series]:
+    """
+    Get keys to group the given trace data by, which treat missing values as their own group in either encoding.
+    Dictionary-encoded columns are grouped by their codes, in which missing values are -1.
+
+    :param trace_data: The trace data to group
+    :param columns: The columns to group by
+    :returns: One key per column, aligned with the trace data
+    """
+    keys = list()
+    for column in columns:
+        values = trace_data[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.codes.rename(column)
+        keys.append(values)
+    return keys
+
+
+class StreamingConcatenation:
+    """
+    Concatenates trace data batch by batch, without holding the batches and their concatenation in memory at once.
+
+    The batches are kept column by column, and each column is only concatenated once the result is requested,
+    after which its batches are released; the peak memory is therefore close to the result and a single column of it.
+    Dictionary-encoded batches must have been encoded with the same `InternTable`, which only ever appends
+    categories, so that their codes remain valid under the categories of the last batch.
+    """
+
+    def __init__(self):
+        """Creates an empty concatenation."""
+        self._columns: dict[str, list[typing.Any]] = dict()
+        self._dtypes: dict[str, typing.Any] = dict()
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def add(self, batch: pd.DataFrame) -> None:
+        """
+        Append a batch to the concatenation. The batch must not be modified afterwards.
+
+        :param batch: The batch to append, whose columns and encoding must match the previous batches
+        """
+        if self._columns and list(batch.columns) != list(self._columns):
+            raise ValueError(
+                f"Expected the columns {list(self._columns)}, got {list(batch.columns)}"
+            )
+
+        for column in batch.columns:
+            values = batch[column].array
+            # Codes are kept rather than the categoricals, whose categories only grow from batch to batch
+            self._columns.setdefault(column, list()).append(
+                values.codes if isinstance(values, pd.Categorical) else values
+            )
+            self._dtypes[column] = values.dtype
+        self._rows += len(batch)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Concatenate the batches, which empties this concatenation.
+
+        :returns: The batches, concatenated in the order they were added, with a new index
+        """
+        data: dict[str, typing.Any] = dict()
+        for column in list(self._columns):
+            chunks = self._columns.pop(column)
+            dtype = self._dtypes.pop(column)
+            if isinstance(dtype, pd.CategoricalDtype):
+                data[column] = pd.Categorical.from_codes(
+                    np.concatenate(chunks), dtype=dtype
+                )
+            else:
+                data[column] = pd.concat(
+                    [pd.Series(chunk, copy=False) for chunk in chunks], ignore_index=True
+                ).array
+            del chunks
+
+        self._rows = 0
+        return pd.DataFrame(data, copy=False)
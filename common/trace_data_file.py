@@ -0,0 +1,386 @@
+"""
+Columnar file format for trace data, version 2 of the `.pytype` files.
+
+Unlike pickled DataFrames, which are version 1, files in this format can be memory-mapped, read partially
+and appended to. A file consists of the magic number, the data of its row groups, and a footer:
+
+    MAGIC | row group 0 | ... | row group n | footer (JSON) | footer length (u64, little-endian) | MAGIC
+
+The footer describes the schema, i.e. the name, encoding and dtype of each column, the dictionary of each
+string column, and the offset of each column within each row group, and may hold metadata of the file's writer. String columns are dictionary-encoded
+as 32-bit codes, in which missing values are -1; integer columns are stored as fixed-width integers,
+with a byte mask of missing values if there are any. All arrays start at offsets that are multiples of 8.
+"""
+import json
+import mmap
+import os
+import pathlib
+import struct
+import typing
+
+import numpy as np
+import pandas as pd
+
+import constants
+from common import compression
+from common.trace_data_encoding import STRING_COLUMNS, multiplicity_columns
+from constants import Schema
+
+FORMAT_VERSION = 2
+
+MAGIC = b"PYTYPE\x00\x02"
+
+# Formats that trace data files may be written in; see `ptconfig.PyTypes.output_format`
+Format = typing.Literal["columnar", "pickle"]
+
+_FOOTER_LENGTH = struct.Struct("<Q")
+_TRAILER_SIZE = _FOOTER_LENGTH.size + len(MAGIC)
+_ALIGNMENT = 8
+
+_CODE_DTYPE = np.dtype("<i4")
+_INTEGER_DTYPES: dict[str, np.dtype] = {
+    column: np.dtype("<u8") if dtype == pd.UInt64Dtype() else np.dtype("<i8")
+    for column, dtype in (Schema.TraceData | Schema.Multiplicities).items()
+    if column not in STRING_COLUMNS
+}
+
+
+def is_columnar(path: pathlib.Path) -> bool:
+    """
+    :param path: Path to a trace data file
+    :returns: True if the file is in this format, rather than a pickle
+    """
+    with path.open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def serialise(
+    trace_data: pd.DataFrame,
+    row_group_size: int = constants.ROW_GROUP_SIZE,
+    metadata: dict[str, typing.Any] | None = None,
+) -> bytes:
+    """
+    Serialise trace data into this format.
+
+    :param trace_data: The trace data to serialise, in either encoding
+    :param row_group_size: The maximum amount of rows per row group
+    :param metadata: JSON serialisable metadata that is stored in the footer, see `read_metadata`
+    :returns: The content of the file
+    """
+    encoder = _Encoder()
+    body, row_groups = encoder.encode(trace_data, len(MAGIC), row_group_size)
+    return MAGIC + body + _trailer(encoder.footer(row_groups, metadata))
+
+
+def append(
+    path: pathlib.Path,
+    trace_data: pd.DataFrame,
+    row_group_size: int = constants.ROW_GROUP_SIZE,
+) -> None:
+    """
+    Append trace data to a file in this format as further row groups, creating the file if it does not exist.
+    The existing row groups are neither read nor rewritten, and the metadata of the file is kept.
+    Unlike writing a new file, appending is not atomic.
+
+    :param path: Path to the file
+    :param trace_data: The trace data to append, in either encoding
+    :param row_group_size: The maximum amount of rows per row group
+    """
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(serialise(trace_data, row_group_size))
+        return
+
+    footer, footer_offset = _read_footer(path)
+    encoder = _Encoder(footer)
+    body, row_groups = encoder.encode(trace_data, footer_offset, row_group_size)
+
+    with path.open("r+b") as f:
+        f.seek(footer_offset)
+        f.write(body)
+        f.write(
+            _trailer(encoder.footer(footer["row_groups"] + row_groups, footer.get("metadata")))
+        )
+        f.truncate()
+
+
+def read(
+    path: pathlib.Path,
+    columns: list[str] | None = None,
+    row_groups: list[int] | None = None,
+) -> pd.DataFrame:
+    """
+    Read trace data from a file in this format. The file is memory-mapped, and the fixed-width columns
+    are not copied into memory, but refer to the mapped file.
+
+    :param path: Path to the file
+    :param columns: The columns to read, by default all of them
+    :param row_groups: The indices of the row groups to read, by default all of them
+    :returns: The trace data of the selected columns and row groups, encoded like `Schema.CompactTraceData`
+    """
+    footer, _ = _read_footer(path)
+    schema = {column["name"]: column for column in footer["columns"]}
+    names = list(schema) if columns is None else columns
+    for name in names:
+        if name not in schema:
+            raise KeyError(f"{path} has no column {name}")
+
+    selected = footer["row_groups"]
+    if row_groups is not None:
+        selected = [selected[index] for index in row_groups]
+
+    with path.open("rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data: dict[str, typing.Any] = dict()
+    for name in names:
+        column = schema[name]
+        parts = [_column_of(mapped, column, group) for group in selected]
+        data[name] = _concatenate(column, parts)
+
+    return pd.DataFrame(data, columns=names, copy=False)
+
+
+def row_group_sizes(path: pathlib.Path) -> list[int]:
+    """
+    :param path: Path to a file in this format
+    :returns: The amount of rows of each row group
+    """
+    footer, _ = _read_footer(path)
+    return [group["rows"] for group in footer["row_groups"]]
+
+
+def read_metadata(path: pathlib.Path) -> dict[str, typing.Any] | None:
+    """
+    :param path: Path to a file in this format
+    :returns: The metadata the file has been serialised with, or None if it has none
+    """
+    footer, _ = _read_footer(path)
+    return footer.get("metadata")
+
+
+def has_trace_data_schema(path: pathlib.Path) -> bool:
+    """
+    Check whether a file in this format holds trace data, by reading its footer only.
+
+    :param path: Path to the file
+    :returns: True if its columns and their encodings conform to `Schema.CompactTraceData`,
+    optionally followed by columns of `Schema.Multiplicities`
+    """
+    try:
+        footer, _ = _read_footer(path)
+    except ValueError:
+        return False
+
+    names = [column["name"] for column in footer["columns"]]
+    if multiplicity_columns(names) is None:
+        return False
+    return all(
+        column["encoding"] == ("dictionary" if column["name"] in STRING_COLUMNS else "plain")
+        for column in footer["columns"]
+    )
+
+
+def load(path: pathlib.Path) -> pd.DataFrame:
+    """
+    Load a trace data file of any version, i.e. in this format or as a (compressed) pickle.
+
+    :param path: Path to the file
+    :returns: The trace data; files in this format are returned in the compact encoding
+    """
+    if is_columnar(path):
+        return read(path)
+    return compression.read_pickle(path)
+
+
+class _Encoder:
+    # Maps strings to codes per column, extending the dictionaries of an existing file
+
+    def __init__(self, footer: dict[str, typing.Any] | None = None):
+        self._dictionaries: dict[str, list[str]] = {
+            column: list() for column in STRING_COLUMNS
+        }
+        self._rows = 0
+        self._columns: list[str] | None = None
+        if footer is not None:
+            if footer.get("version") != FORMAT_VERSION:
+                raise ValueError(
+                    f"Cannot append to trace data file of version {footer.get('version')}"
+                )
+            self._rows = footer["rows"]
+            self._columns = [column["name"] for column in footer["columns"]]
+            for column in footer["columns"]:
+                if column["name"] in self._dictionaries:
+                    self._dictionaries[column["name"]] = list(column["dictionary"])
+
+        self._codes = {
+            column: {string: code for code, string in enumerate(strings)}
+            for column, strings in self._dictionaries.items()
+        }
+
+    def encode(
+        self, trace_data: pd.DataFrame, offset: int, row_group_size: int
+    ) -> tuple[bytes, list[dict[str, typing.Any]]]:
+        columns = list(trace_data.columns)
+        if multiplicity_columns(columns) is None:
+            raise ValueError(
+                f"Expected the columns {list(Schema.TraceData.keys())}, "
+                f"optionally followed by some of {list(Schema.Multiplicities.keys())}, got {columns}"
+            )
+        if self._columns is not None and columns != self._columns:
+            raise ValueError(f"Expected the columns {self._columns}, got {columns}")
+        self._columns = columns
+
+        arrays = {
+            column: self._encode_strings(column, trace_data[column])
+            if column in STRING_COLUMNS
+            else _encode_integers(column, trace_data[column])
+            for column in trace_data.columns
+        }
+        self._rows += len(trace_data)
+
+        body = bytearray()
+        groups = list()
+        for start in range(0, len(trace_data), max(row_group_size, 1)):
+            stop = min(start + row_group_size, len(trace_data))
+            group: dict[str, typing.Any] = {"rows": stop - start, "columns": dict()}
+            for column, (values, mask) in arrays.items():
+                entry = {"offset": offset + _pad(body), "mask": None}
+                body += values[start:stop].tobytes()
+                if mask is not None:
+                    entry["mask"] = offset + _pad(body)
+                    body += mask[start:stop].tobytes()
+                group["columns"][column] = entry
+            groups.append(group)
+
+        _pad(body)
+        return bytes(body), groups
+
+    def footer(
+        self,
+        row_groups: list[dict[str, typing.Any]],
+        metadata: dict[str, typing.Any] | None = None,
+    ) -> dict[str, typing.Any]:
+        assert self._columns is not None
+        footer = {
+            "version": FORMAT_VERSION,
+            "rows": self._rows,
+            "columns": [
+                {
+                    "name": column,
+                    "encoding": "dictionary",
+                    "dtype": _CODE_DTYPE.str,
+                    "dictionary": self._dictionaries[column],
+                }
+                if column in STRING_COLUMNS
+                else {
+                    "name": column,
+                    "encoding": "plain",
+                    "dtype": _INTEGER_DTYPES[column].str,
+                }
+                for column in self._columns
+            ],
+            "row_groups": row_groups,
+        }
+        if metadata is not None:
+            footer["metadata"] = metadata
+        return footer
+
+    def _encode_strings(self, column: str, values: pd.Series) -> tuple[np.ndarray, None]:
+        categorical = pd.Categorical(values)
+        codes, strings = self._codes[column], self._dictionaries[column]
+        for string in categorical.categories:
+            if string not in codes:
+                codes[string] = len(strings)
+                strings.append(string)
+
+        # The appended -1 maps the code of missing values onto itself
+        mapping = np.array(
+            [codes[string] for string in categorical.categories] + [-1],
+            dtype=_CODE_DTYPE,
+        )
+        return mapping[categorical.codes], None
+
+
+def _encode_integers(column: str, values: pd.Series) -> tuple[np.ndarray, np.ndarray | None]:
+    mask = values.isna().to_numpy()
+    dtype = _INTEGER_DTYPES[column]
+    integers = values.fillna(0).to_numpy(dtype=dtype)
+    return integers, mask.astype(np.uint8) if mask.any() else None
+
+
+def _column_of(
+    mapped: mmap.mmap, column: dict[str, typing.Any], group: dict[str, typing.Any]
+) -> tuple[np.ndarray, np.ndarray | None]:
+    entry = group["columns"][column["name"]]
+    values = np.frombuffer(
+        mapped,
+        dtype=np.dtype(column["dtype"]),
+        count=group["rows"],
+        offset=entry["offset"],
+    )
+    mask = None
+    if entry["mask"] is not None:
+        mask = np.frombuffer(
+            mapped, dtype=np.uint8, count=group["rows"], offset=entry["mask"]
+        ).view(np.bool_)
+    return values, mask
+
+
+def _concatenate(
+    column: dict[str, typing.Any], parts: list[tuple[np.ndarray, np.ndarray | None]]
+) -> typing.Any:
+    # A single row group is used as it is, which refers to the mapped file
+    if len(parts) == 1:
+        values, mask = parts[0]
+    elif not parts:
+        values, mask = np.empty(0, dtype=np.dtype(column["dtype"])), None
+    else:
+        values = np.concatenate([part_values for part_values, _ in parts])
+        mask = None
+        if any(part_mask is not None for _, part_mask in parts):
+            mask = np.concatenate(
+                [
+                    part_mask
+                    if part_mask is not None
+                    else np.zeros(len(part_values), dtype=np.bool_)
+                    for part_values, part_mask in parts
+                ]
+            )
+
+    if column["encoding"] == "dictionary":
+        return pd.Categorical.from_codes(values, categories=column["dictionary"])
+
+    if mask is None:
+        mask = np.zeros(len(values), dtype=np.bool_)
+    return pd.arrays.IntegerArray(values, mask)
+
+
+def _pad(body: bytearray) -> int:
+    body += bytes(-len(body) % _ALIGNMENT)
+    return len(body)
+
+
+def _trailer(footer: dict[str, typing.Any]) -> bytes:
+    encoded = json.dumps(footer, separators=(",", ":")).encode()
+    return encoded + _FOOTER_LENGTH.pack(len(encoded)) + MAGIC
+
+
+def _read_footer(path: pathlib.Path) -> tuple[dict[str, typing.Any], int]:
+    with path.open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a trace data file of version {FORMAT_VERSION}")
+
+        size = f.seek(0, os.SEEK_END)
+        if size < len(MAGIC) + _TRAILER_SIZE:
+            raise ValueError(f"{path} is truncated")
+
+        f.seek(size - _TRAILER_SIZE)
+        trailer = f.read(_TRAILER_SIZE)
+        if trailer[_FOOTER_LENGTH.size:] != MAGIC:
+            raise ValueError(f"{path} is truncated")
+
+        (length,) = _FOOTER_LENGTH.unpack(trailer[: _FOOTER_LENGTH.size])
+        footer_offset = size - _TRAILER_SIZE - length
+        f.seek(footer_offset)
+        return json.loads(f.read(length)), footer_offset
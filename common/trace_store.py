@@ -0,0 +1,172 @@
+"""
+Trace data in a local SQLite database, as an alternative to trace data files.
+
+Unlike trace data files, which are loaded entirely, the database is indexed on the columns that identify
+a traced instance, so that the trace data of a single file or function can be queried without loading the rest.
+Every row is stored with its `Column.COUNT`; rows are neither deduplicated nor aggregated by the store.
+"""
+import pathlib
+import sqlite3
+import typing
+
+import pandas as pd
+
+import constants
+from common import ptconfig, trace_data_encoding
+from constants import Column, Schema
+
+# Version of the database schema, stored as the database's user_version
+STORE_VERSION = 1
+
+_TABLE = "trace_data"
+_COLUMNS: dict[str, typing.Any] = Schema.TraceData | {
+    Column.COUNT: Schema.Multiplicities[Column.COUNT]
+}
+_INDEXED = [
+    Column.FILENAME,
+    Column.CLASS,
+    Column.FUNCNAME,
+    Column.LINENO,
+    Column.CATEGORY,
+    Column.VARNAME,
+]
+
+
+def store_path(config: ptconfig.TomlCfg) -> pathlib.Path:
+    """
+    :param config: The config of the traced project
+    :returns: The path of the project's trace store
+    """
+    return config.pytypes.proj_path / config.pytypes.trace_store_template.format_map(
+        {"project": config.pytypes.project}
+    )
+
+
+class TraceStore:
+    """
+    Trace data stored in a SQLite database, which is created if it does not exist yet.
+
+    Multiple processes may insert into the same database, e.g. the workers of pytest-xdist; each insertion
+    is a single transaction, and waits for those of other processes for up to `timeout` seconds.
+    A store must only be used by the thread that opened it.
+    """
+
+    def __init__(
+        self, path: pathlib.Path, timeout: float = constants.TRACE_STORE_TIMEOUT
+    ):
+        """
+        Open the store.
+
+        :param path: Path to the database
+        :param timeout: The amount of seconds to wait for transactions of other connections
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=timeout)
+
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, STORE_VERSION):
+            self._connection.close()
+            raise ValueError(f"Cannot open trace store {path} of version {version}")
+
+        # Lets readers query the store while workers insert into it
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            columns = ", ".join(
+                f'"{column}" {_sql_type(column)}' for column in _COLUMNS
+            )
+            indexed = ", ".join(f'"{column}"' for column in _INDEXED)
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {_TABLE} ({columns})")
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {_TABLE}_lookup ON {_TABLE} ({indexed})"
+            )
+            self._connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    def __enter__(self) -> "TraceStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute(f"SELECT COUNT(*) FROM {_TABLE}").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        self._connection.close()
+
+    def insert(self, trace_data: pd.DataFrame) -> None:
+        """
+        Insert trace data in a single transaction.
+
+        :param trace_data: The trace data to insert, in either encoding; rows without a count count once
+        """
+        self.insert_all([trace_data])
+
+    def insert_all(self, batches: typing.Iterable[pd.DataFrame]) -> None:
+        """
+        Insert several batches of trace data in a single transaction.
+
+        :param batches: The trace data to insert, each in either encoding; rows without a count count once
+        """
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self._connection:
+            for trace_data in batches:
+                self._connection.executemany(
+                    f"INSERT INTO {_TABLE} VALUES ({placeholders})", _rows(trace_data)
+                )
+
+    def filenames(self) -> list[str]:
+        """
+        :returns: The files that trace data has been stored for, sorted
+        """
+        cursor = self._connection.execute(
+            f'SELECT DISTINCT "{Column.FILENAME}" FROM {_TABLE} ORDER BY "{Column.FILENAME}"'
+        )
+        return [filename for (filename,) in cursor]
+
+    def query(
+        self, filename: str | None = None, function_name: str | None = None
+    ) -> pd.DataFrame:
+        """
+        Query the trace data of a file or function, which is looked up by the index of the store.
+
+        :param filename: The file to query the trace data of, by default all of them
+        :param function_name: The function to query the trace data of, by default all of them
+        :returns: The matching rows in the order they have been inserted, conforming to `Schema.TraceData`
+        and followed by `Column.COUNT`
+        """
+        conditions, parameters = list(), list()
+        for column, value in ((Column.FILENAME, filename), (Column.FUNCNAME, function_name)):
+            if value is not None:
+                conditions.append(f'"{column}" = ?')
+                parameters.append(value)
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self._connection.execute(
+            f"SELECT * FROM {_TABLE}{where} ORDER BY rowid", parameters
+        )
+        return pd.DataFrame(cursor.fetchall(), columns=list(_COLUMNS)).astype(_COLUMNS)
+
+    def iter_files(self) -> typing.Iterator[tuple[str, pd.DataFrame]]:
+        """
+        Query the trace data file by file.
+
+        :returns: An iterator over each file and its trace data, see `query`
+        """
+        for filename in self.filenames():
+            yield filename, self.query(filename=filename)
+
+
+def _rows(trace_data: pd.DataFrame) -> typing.Iterator[tuple]:
+    trace_data = trace_data_encoding.expand(trace_data[list(Schema.TraceData)]).assign(
+        **{Column.COUNT: trace_data_encoding.occurrences(trace_data)}
+    )
+
+    # SQLite only accepts Python objects, in which missing values are None
+    rows = trace_data.astype(object).where(trace_data.notna(), None)
+    return rows.itertuples(index=False, name=None)
+
+
+def _sql_type(column: str) -> str:
+    return "TEXT" if column in trace_data_encoding.STRING_COLUMNS else "INTEGER"
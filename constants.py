@@ -7,14 +7,44 @@ CONFIG_FILE_NAME = "pytypes.toml"
 
 TRACERS_ATTRIBUTE = "pytype_tracers"
 
-AMOUNT_EXECUTIONS_TESTING_PERFORMANCE = 3
-
 SAMPLE_CODE_FOLDER_NAME = "examples"
 
 TRACE_DATA_FILE_ENDING = ".pytype"
 
 NP_ARRAY_FILE_ENDING = ".npy_pytype"
 
+BENCHMARK_FILE_ENDING = ".benchmark.json"
+
+SATURATION_CACHE_FILE_NAME = "saturation.json"
+
+TRACE_DATA_BATCH_SIZE = 32
+
+# The test case and file name that the pytest plugin stores each batch of traced tests under
+PLUGIN_BATCH_TEST_CASE = "pytest"
+PLUGIN_BATCH_FILE_NAME = "batch"
+
+MERGED_TRACE_DATA_FILE_NAME = "merged"
+
+COMPACTED_TRACE_DATA_FILE_NAME = "compacted"
+
+TRACE_STORE_FILE_NAME = "traces.sqlite3"
+
+# Seconds that insertions into a trace store wait for those of other processes
+TRACE_STORE_TIMEOUT = 60.0
+
+# Environment variable that pytest-xdist sets to the id of each of its workers
+XDIST_WORKER_VARIABLE = "PYTEST_XDIST_WORKER"
+
+MAIN_WORKER_ID = "main"
+
+MAX_PENDING_WRITES = 16
+
+# Maximum amount of rows per row group of columnar trace data files
+ROW_GROUP_SIZE = 65536
+
+# Amount of rows per batch when collecting trace data files as a stream
+COLLECTION_BATCH_SIZE = 65536
+
 PYTEST_FUNCTION_PATTERN = re.compile(r"test_")
 
 
@@ -29,6 +59,9 @@ class Column:
     VARTYPE_MODULE = "TypeModule"
     VARTYPE = "Type"
 
+    COUNT = "Count"
+    TESTS = "Tests"
+
     COLUMN_OFFSET = "ColumnOffset"
     VARTYPE_ORIGINAL = "OriginalType"
     VARTYPE_GENERATED = "GeneratedType"
@@ -67,6 +100,30 @@ class Schema:
         Column.VARTYPE: pd.StringDtype(),
     }
 
+    # Same columns as TraceData, but the string columns are dictionary-encoded,
+    # as their values are repeated across many rows.
+    # See common.trace_data_encoding for converting between both schemas
+    CompactTraceData = {
+        Column.FILENAME: pd.CategoricalDtype(),
+        Column.CLASS_MODULE: pd.CategoricalDtype(),
+        Column.CLASS: pd.CategoricalDtype(),
+        Column.FUNCNAME: pd.CategoricalDtype(),
+        Column.LINENO: pd.UInt64Dtype(),
+        Column.CATEGORY: pd.Int64Dtype(),
+        Column.VARNAME: pd.CategoricalDtype(),
+        Column.VARTYPE_MODULE: pd.CategoricalDtype(),
+        Column.VARTYPE: pd.CategoricalDtype(),
+    }
+
+    # Columns that may follow those of TraceData, once rows have been deduplicated across files.
+    # See tracing.compaction
+    Multiplicities = {
+        # how often the row occurred in total
+        Column.COUNT: pd.UInt64Dtype(),
+        # the amount of files, i.e. traced tests, the row occurred in
+        Column.TESTS: pd.UInt64Dtype(),
+    }
+
     TypeHintData = {
         Column.FILENAME: pd.StringDtype(),
         Column.CLASS: pd.StringDtype(),
@@ -1,6 +1,7 @@
 import click
 import pathlib
 import filecmp
+import os
 
 import typing
 
@@ -8,6 +9,7 @@ import numpy as np
 import pandas as pd
 
 import constants
+from common.trace_store import TraceStore
 from typegen.trace_data_file_collector import TraceDataFileCollector
 from evaluation.file_type_hints_collector import FileTypeHintsCollector
 from evaluation.metric_data_calculator import MetricDataCalculator
@@ -70,6 +72,21 @@ __all__ = [
     required=False,
     default="data",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="Amount of trace data files that are loaded in parallel",
+    required=False,
+    default=os.cpu_count() or 1,
+)
+@click.option(
+    "--processes",
+    help="Load trace data files in a pool of processes rather than threads",
+    is_flag=True,
+    required=False,
+    default=False,
+)
 def main(**params):
     original_path, traced_path, path_to_store, data_name = (params["original"], params["traced"], params["store"], params["data_name"])
     path_to_store.mkdir(parents=True, exist_ok=True)
@@ -77,19 +94,24 @@ def main(**params):
     trace_data_path = traced_path / "pytypes"
 
     # Gets the potentially changed file paths.
-    trace_data_file_collector = TraceDataFileCollector()
+    trace_data_file_collector = TraceDataFileCollector(
+        workers=params["jobs"], use_processes=params["processes"], streaming=True
+    )
     trace_data_file_collector.collect_data(trace_data_path, True)
     trace_data = trace_data_file_collector.trace_data
-    potential_changed_files_relative_paths = trace_data[
-        constants.Column.FILENAME
-    ].unique()
+    potential_changed_files_relative_paths = set(
+        trace_data[constants.Column.FILENAME].unique()
+    )
+    for trace_store_path in trace_data_path.rglob(constants.TRACE_STORE_FILE_NAME):
+        with TraceStore(trace_store_path) as trace_store:
+            potential_changed_files_relative_paths.update(trace_store.filenames())
 
     # Gets the changed file paths.
     (
         original_file_paths_to_compare,
         traced_file_paths_to_compare,
     ) = _get_changed_file_paths(
-        original_path, traced_path, potential_changed_files_relative_paths
+        original_path, traced_path, sorted(potential_changed_files_relative_paths)
     )
     metricdata_calculator = MetricDataCalculator()
     file_typehints_collector = FileTypeHintsCollector()
@@ -49,6 +49,14 @@ ORIGINAL_REPOSITORY_FOLDER_NAME = "Original"
     required=False,
     default=False,
 )
+@click.option(
+    "-p",
+    "--plugin",
+    help="Do not apply decorators to the tests, which are traced by running pytest with `--pytypes` instead",
+    is_flag=True,
+    required=False,
+    default=False,
+)
 @click.option(
     "-v",
     "--verbose",
@@ -61,13 +69,14 @@ ORIGINAL_REPOSITORY_FOLDER_NAME = "Original"
 
 
 def main(**params):
-    url, fmt, out, verb, notraverse, evaluate = (
+    url, fmt, out, verb, notraverse, evaluate, plugin = (
         params["uri"],
         params["format"],
         params["output"],
         params["verbose"],
         params["no_traverse"],
-        params["eval"]
+        params["eval"],
+        params["plugin"],
     )
     logging.basicConfig(level=verb)
 
@@ -86,7 +95,7 @@ def main(**params):
     try:
         detector = TestDetector.factory(proj=project)
         strategy = detector.create_strategy(recurse_into_subdirs=not notraverse)
-        strategy.apply(project)
+        strategy.apply(project, append_decorators=not plugin)
 
     except Exception as e:
         print(f"{e}")
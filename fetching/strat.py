@@ -26,20 +26,23 @@ class ApplicationStrategy(ABC):
     def __init__(self, recurse_into_subdirs: bool = True):
         self.globber = pathlib.Path.rglob if recurse_into_subdirs else pathlib.Path.glob
 
-    def apply(self, project: Project):
+    def apply(self, project: Project, append_decorators: bool = True):
         """Apply the subclass-specific strategy to the test files found in the project
 
         :param project: Path to the fetched resource, now a project
+        :param append_decorators: When set to False, the test files are left untouched, e.g. because
+        the tests are traced by the pytest plugin instead; only the config file is generated
         """
         assert project.test_directories is not None
 
-        for test_directory in project.test_directories:
-            test_files = list(filter(self._is_test_file, self.globber(test_directory, "*")))
-            for path in tqdm.tqdm(
-                test_files,
-                desc=f"Updating test files in {test_directory}",
-            ):
-                self._apply(path)
+        if append_decorators:
+            for test_directory in project.test_directories:
+                test_files = list(filter(self._is_test_file, self.globber(test_directory, "*")))
+                for path in tqdm.tqdm(
+                    test_files,
+                    desc=f"Updating test files in {test_directory}",
+                ):
+                    self._apply(path)
 
         generate_cfg(project.root)
 
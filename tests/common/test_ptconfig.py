@@ -87,3 +87,22 @@ def test_simple():
     )
 
     assert len(config.unifier) == 0
+
+    assert config.pytypes.ignore_modules == []
+    assert config.pytypes.ignore_functions == []
+    assert config.pytypes.ignore_decorators == []
+    assert config.pytypes.output_format == "columnar"
+    assert config.pytypes.output_compression is None
+    assert not config.pytypes.trace_store
+
+
+def test_ignore():
+    config_path = pathlib.Path("tests", "resource", "configs", "ignore.toml")
+    config = ptconfig.load_config(config_path)
+
+    assert config.pytypes.ignore_modules == ["repo.serialisation.*"]
+    assert config.pytypes.ignore_functions == [
+        "repo.logs.Logger.*",
+        "repo.utils.to_json",
+    ]
+    assert config.pytypes.ignore_decorators == ["log_calls", "functools.*"]
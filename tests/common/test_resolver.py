@@ -1,4 +1,5 @@
 import fractions
+import gc
 import importlib
 import os
 import sys
@@ -69,3 +70,37 @@ class Outer:
 def test_proj(resolver: Resolver, ty: type, module: str, name: str):
     assert resolver.get_module_and_name(ty) == (module, name)
     assert resolver.type_lookup(module, name).__name__ == ty.__name__
+
+
+def test_lookups_are_cached(resolver: Resolver):
+    for _ in range(3):
+        assert resolver.get_module_and_name(UserClass) == (
+            "tests.common.test_resolver",
+            "UserClass",
+        )
+
+    info = resolver.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+    assert info.currsize == 1
+
+
+def test_cache_is_bounded(resolver: Resolver):
+    resolver.cache_size = 2
+    for ty in (int, str, UserClass):
+        resolver.get_module_and_name(ty)
+
+    info = resolver.cache_info()
+    assert info.currsize == 2
+    assert info.misses == 3
+
+
+def test_cache_does_not_keep_types_alive(resolver: Resolver):
+    dynamic = type("Dynamic", (UserClass,), {})
+    dynamic.__module__ = UserClass.__module__
+    resolver.get_module_and_name(dynamic)
+    assert resolver.cache_info().currsize == 1
+
+    del dynamic
+    gc.collect()
+    assert resolver.cache_info().currsize == 0
@@ -0,0 +1,104 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import trace_data_encoding, trace_data_file
+from constants import Column, Schema
+
+
+def _trace_data(*function_names: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            Column.FILENAME: ["module.py"] * len(function_names),
+            Column.CLASS_MODULE: [None] * len(function_names),
+            Column.CLASS: [None] * len(function_names),
+            Column.FUNCNAME: list(function_names),
+            Column.LINENO: [None] + list(range(1, len(function_names))),
+            Column.CATEGORY: [3] * len(function_names),
+            Column.VARNAME: ["a"] * len(function_names),
+            Column.VARTYPE_MODULE: [None] * len(function_names),
+            Column.VARTYPE: ["int"] * len(function_names),
+        }
+    ).astype(Schema.TraceData)
+
+
+def _write(path: pathlib.Path, trace_data: pd.DataFrame, **kwargs) -> pathlib.Path:
+    path.write_bytes(trace_data_file.serialise(trace_data, **kwargs))
+    return path
+
+
+def test_round_trip_keeps_missing_values(tmp_path):
+    trace_data = _trace_data("f", "g", "h")
+    path = _write(tmp_path / "trace.pytype", trace_data)
+
+    read = trace_data_file.read(path)
+
+    assert trace_data_encoding.is_compact(read)
+    pd.testing.assert_frame_equal(trace_data_encoding.expand(read), trace_data)
+
+
+def test_integer_columns_refer_to_the_mapped_file(tmp_path):
+    path = _write(tmp_path / "trace.pytype", _trace_data("f", "g"))
+
+    values = trace_data_file.read(path)[Column.CATEGORY].array._data
+
+    assert values.base is not None
+    assert not values.flags.writeable
+
+
+def test_append_adds_row_groups(tmp_path):
+    path = tmp_path / "trace.pytype"
+    trace_data_file.append(path, _trace_data("f", "g"))
+    trace_data_file.append(path, _trace_data("g", "h", "i"))
+
+    assert trace_data_file.row_group_sizes(path) == [2, 3]
+    read = trace_data_encoding.expand(trace_data_file.read(path))
+    pd.testing.assert_frame_equal(
+        read,
+        pd.concat([_trace_data("f", "g"), _trace_data("g", "h", "i")], ignore_index=True),
+    )
+
+
+def test_metadata_is_kept_when_appending(tmp_path):
+    path = _write(tmp_path / "trace.pytype", _trace_data("f"), metadata={"writer": [1, 2]})
+    trace_data_file.append(path, _trace_data("g"))
+
+    assert trace_data_file.read_metadata(path) == {"writer": [1, 2]}
+    assert trace_data_file.read_metadata(_write(tmp_path / "other.pytype", _trace_data("f"))) is None
+
+
+def test_read_selects_columns_and_row_groups(tmp_path):
+    path = _write(tmp_path / "trace.pytype", _trace_data("f", "g", "h"), row_group_size=2)
+
+    read = trace_data_file.read(path, columns=[Column.FUNCNAME], row_groups=[1])
+
+    assert list(read.columns) == [Column.FUNCNAME]
+    assert list(read[Column.FUNCNAME]) == ["h"]
+
+    with pytest.raises(KeyError):
+        trace_data_file.read(path, columns=["unknown"])
+
+
+def test_schema_is_checked_from_footer(tmp_path):
+    path = _write(tmp_path / "trace.pytype", _trace_data("f"))
+    truncated = tmp_path / "truncated.pytype"
+    truncated.write_bytes(path.read_bytes()[:-4])
+
+    assert trace_data_file.has_trace_data_schema(path)
+    assert not trace_data_file.has_trace_data_schema(truncated)
+
+
+def test_serialise_rejects_other_schemas():
+    with pytest.raises(ValueError):
+        trace_data_file.serialise(pd.DataFrame({"x": np.arange(3)}))
+
+
+def test_load_reads_pickles(tmp_path):
+    trace_data = _trace_data("f")
+    path = tmp_path / "trace.pytype"
+    trace_data.to_pickle(path)
+
+    assert not trace_data_file.is_columnar(path)
+    pd.testing.assert_frame_equal(trace_data_file.load(path), trace_data)
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from common import InternTable, trace_data_encoding
+from common.trace_store import TraceStore
+from constants import Column, Schema
+
+
+def _trace_data(filename: str, *function_names: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            Column.FILENAME: [filename] * len(function_names),
+            Column.CLASS_MODULE: [None] * len(function_names),
+            Column.CLASS: [None] * len(function_names),
+            Column.FUNCNAME: list(function_names),
+            Column.LINENO: [None] + list(range(1, len(function_names))),
+            Column.CATEGORY: [3] * len(function_names),
+            Column.VARNAME: ["a"] * len(function_names),
+            Column.VARTYPE_MODULE: [None] * len(function_names),
+            Column.VARTYPE: ["int"] * len(function_names),
+        }
+    ).astype(Schema.TraceData)
+
+
+def test_query_keeps_missing_values_and_counts(tmp_path):
+    trace_data = _trace_data("a.py", "f", "g")
+    with TraceStore(tmp_path / "traces.sqlite3") as store:
+        store.insert(trace_data)
+        store.insert(trace_data.assign(**{Column.COUNT: 4}))
+
+        queried = store.query()
+
+    assert len(queried) == 4
+    pd.testing.assert_frame_equal(
+        queried[list(Schema.TraceData)],
+        pd.concat([trace_data, trace_data], ignore_index=True),
+    )
+    assert queried[Column.COUNT].tolist() == [1, 1, 4, 4]
+
+
+def test_query_by_file_and_function(tmp_path):
+    with TraceStore(tmp_path / "traces.sqlite3") as store:
+        store.insert(_trace_data("b.py", "f", "g"))
+        store.insert(_trace_data("a.py", "f"))
+
+        assert store.filenames() == ["a.py", "b.py"]
+        assert store.query(filename="b.py")[Column.FUNCNAME].tolist() == ["f", "g"]
+        assert store.query(filename="b.py", function_name="g")[Column.FUNCNAME].tolist() == ["g"]
+        assert store.query(function_name="f")[Column.FILENAME].tolist() == ["b.py", "a.py"]
+        assert store.query(filename="c.py").empty
+        assert [filename for filename, _ in store.iter_files()] == ["a.py", "b.py"]
+
+
+def test_insert_accepts_compact_trace_data(tmp_path):
+    trace_data = _trace_data("a.py", "f")
+    with TraceStore(tmp_path / "traces.sqlite3") as store:
+        store.insert(trace_data_encoding.compact(trace_data, InternTable()))
+
+        pd.testing.assert_frame_equal(store.query()[list(Schema.TraceData)], trace_data)
+
+
+def test_store_is_reopened_and_queries_use_index(tmp_path):
+    path = tmp_path / "traces.sqlite3"
+    with TraceStore(path) as store:
+        store.insert(_trace_data("a.py", "f"))
+    with TraceStore(path) as store:
+        assert len(store) == 1
+
+    with sqlite3.connect(path) as connection:
+        plan = connection.execute(
+            f'EXPLAIN QUERY PLAN SELECT * FROM trace_data WHERE "{Column.FILENAME}" = ?',
+            ["a.py"],
+        ).fetchall()
+    assert any("USING INDEX" in row[-1] for row in plan)
+
+
+def test_store_of_other_version_is_rejected(tmp_path):
+    path = tmp_path / "traces.sqlite3"
+    with sqlite3.connect(path) as connection:
+        connection.execute("PRAGMA user_version = 99")
+
+    with pytest.raises(ValueError):
+        TraceStore(path)
@@ -1,6 +1,7 @@
 import pathlib
 
 from tracing import decorators
+from tracing.optimisation import SaturationCache
 from common import ptconfig
 from constants import Column
 
@@ -89,3 +90,54 @@ def test_everything_is_traced_with_benchmark_performance(monkeypatch):
         mperf is not None
     ), f"When benchmarking, perf data 'mperf': should not be None"
     assert mperf.shape == (4,), f"Wrong benchmark shape for 'mperf': Got {mperf.shape}"
+
+
+def test_saturation_cache_is_loaded_and_saved_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        pathlib.Path, pathlib.Path.cwd.__name__, lambda: MOCK_PATH.resolve()
+    )
+    monkeypatch.setattr(
+        ptconfig,
+        ptconfig.load_config.__name__,
+        lambda _: ptconfig.TomlCfg(
+            ptconfig.PyTypes(
+                project="standard-trace",
+                proj_path=tmp_path,
+                stdlib_path=pathlib.Path(),
+                venv_path=pathlib.Path(),
+                apply_optimisations=True,
+                persist_saturation=True,
+            )
+        ),
+    )
+
+    exit_handlers = list()
+    register = decorators.atexit.register
+    monkeypatch.setattr(
+        decorators.atexit,
+        "register",
+        lambda handler: exit_handlers.append(handler) or register(handler),
+    )
+    monkeypatch.setattr(decorators, "_SATURATION_CACHES", dict())
+    loads, saves = list(), list()
+    load, save = SaturationCache.load, SaturationCache.save
+    monkeypatch.setattr(
+        SaturationCache,
+        "load",
+        staticmethod(lambda path, proj_path: loads.append(path) or load(path, proj_path)),
+    )
+    monkeypatch.setattr(
+        SaturationCache, "save", lambda cache, path: saves.append(path) or save(cache, path)
+    )
+
+    traced = decorators.trace(trace_function)
+    for _ in range(3):
+        traced()
+    assert len(loads) == 1
+    assert not saves
+
+    # The cache is saved when the process exits
+    assert exit_handlers.count(decorators._save_saturation_caches) == 1
+    decorators._save_saturation_caches()
+    assert saves == loads[:1]
+    assert saves[0].is_file()
@@ -0,0 +1,140 @@
+import ast
+import sys
+import textwrap
+
+from tracing.optimisation.utils import (
+    FrameWithMetadata,
+    LineIndex,
+    LineIndexCache,
+    LoopRange,
+    StatementKind,
+)
+
+
+SOURCE = textwrap.dedent(
+    """\
+    def loops(xs):
+        total = 0
+        for x in (
+            xs
+        ):
+            if x:
+                break
+            while total < 3:
+                total += 1
+        else:
+            total = -1
+        for y in xs: total += y
+        return (
+            total
+        )
+    """
+)
+
+
+def test_lines_are_classified_by_statement():
+    index = LineIndex(ast.parse(SOURCE))
+
+    kinds = [index.kind(line_number) for line_number in range(1, 16)]
+    assert kinds == [
+        StatementKind.OTHER,
+        StatementKind.OTHER,
+        StatementKind.FOR,
+        StatementKind.FOR,
+        StatementKind.FOR,
+        StatementKind.OTHER,
+        StatementKind.BREAK,
+        StatementKind.WHILE,
+        StatementKind.OTHER,
+        StatementKind.OTHER,
+        StatementKind.OTHER,
+        StatementKind.FOR,
+        StatementKind.RETURN,
+        StatementKind.RETURN,
+        StatementKind.RETURN,
+    ]
+
+
+def test_lines_are_mapped_to_innermost_loop():
+    index = LineIndex(ast.parse(SOURCE))
+
+    outer = LoopRange(kind=StatementKind.FOR, start=3, end=9, head=3)
+    inner = LoopRange(kind=StatementKind.WHILE, start=8, end=9, head=8)
+
+    assert index.loop(2) is None
+    assert index.loop(3) == outer
+    assert index.loop(7) == outer
+    assert index.loop(8) == inner
+    assert index.loop(9) == inner
+    # The else clause is not part of the loop
+    assert index.loop(11) is None
+    assert index.loop(12) == LoopRange(
+        kind=StatementKind.FOR, start=12, end=12, head=12
+    )
+
+
+def test_loop_heads_are_lines_that_start_iterations():
+    source = textwrap.dedent(
+        """\
+        def loops(xs):
+            i = 0
+            while (
+                i < 3
+            ):
+                i += 1
+            return [
+                x
+                for x in xs
+            ]
+        """
+    )
+    index = LineIndex(ast.parse(source))
+
+    while_loop = LoopRange(kind=StatementKind.WHILE, start=3, end=6, head=4)
+    comprehension = LoopRange(
+        kind=StatementKind.COMPREHENSION, start=7, end=10, head=9
+    )
+
+    assert index.head(3) is None
+    assert index.head(4) == while_loop
+    assert index.loop(6) == while_loop
+    assert index.head(9) == comprehension
+    assert index.loop(8) == comprehension
+    # The comprehension is part of the return statement
+    assert index.kind(8) == StatementKind.RETURN
+
+
+def test_unparsable_source_is_not_classified():
+    index = LineIndex.from_file("<does not exist>")
+
+    assert index.kind(1) == StatementKind.OTHER
+    assert index.loop(1) is None
+
+
+def test_frame_is_classified_using_index_of_its_file():
+    line_indices = LineIndexCache()
+    for _ in range(1):
+        fwm = FrameWithMetadata(sys._getframe(), line_indices=line_indices)
+        line_number = fwm.f_lineno
+
+    loop = fwm.loop()
+    assert loop is not None
+    assert loop.kind == StatementKind.FOR
+    assert line_number in loop
+    assert fwm.line_index is line_indices.for_file(__file__)
+    assert fwm.line_index.kind(loop.start) == StatementKind.FOR
+
+
+def test_indices_are_built_once_per_cache(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("for x in xs:\n    break\n")
+    line_indices = LineIndexCache()
+
+    index = line_indices.for_file(str(path))
+    assert line_indices.for_file(str(path)) is index
+    assert index.kind(2) == StatementKind.BREAK
+
+    # A later trace parses the changed source again
+    path.write_text("for x in xs:\n    x += 1\n    break\n")
+    assert line_indices.for_file(str(path)) is index
+    assert LineIndexCache().for_file(str(path)).kind(2) == StatementKind.OTHER
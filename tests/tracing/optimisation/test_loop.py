@@ -7,7 +7,7 @@ import pandas as pd
 from common import TraceDataCategory
 
 from tracing.tracer import Tracer
-from constants import Schema
+from constants import Column, Schema
 
 
 def skippable_looping():
@@ -31,6 +31,15 @@ def skippable_looping_with_skipped_variable():
     return r
 
 
+# Imported after the sample functions, whose line numbers are part of the expected trace data
+import types
+
+import pytest
+
+from tracing.optimisation import TriggerStatus, TypeStableLoop
+from tracing.optimisation.utils import FrameWithMetadata
+
+
 proj_path = pathlib.Path.cwd()
 stdlib_path = pathlib.Path(pathlib.__file__).parent
 venv_path = pathlib.Path(os.environ["VIRTUAL_ENV"])
@@ -197,3 +206,138 @@ def test_variable_is_not_traced():
     logging.debug(f"expected: \n{expected}")
     logging.debug(f"actual: \n{df}")
     assert expected.equals(df)
+
+
+class _Frame(types.SimpleNamespace):
+    """Stands in for the frame of skippable_looping, whose line number is set while iterating"""
+
+    def __init__(self):
+        code = types.SimpleNamespace(
+            co_filename=__file__, co_name=skippable_looping.__name__, co_flags=0
+        )
+        super().__init__(f_code=code, f_lineno=15, f_globals=globals(), f_back=None)
+
+
+def _iterate(loop: TypeStableLoop, frame: _Frame, new_rows_in: str, iterations: int) -> None:
+    # Each iteration of skippable_looping hits its head and body, producing a new row on line 17
+    for _ in range(iterations):
+        for line_number in (15, 16, 17):
+            frame.f_lineno = line_number
+            loop.advance(FrameWithMetadata(frame, "line"))
+
+        other = types.SimpleNamespace(**vars(frame))
+        other.f_code = types.SimpleNamespace(**vars(frame.f_code))
+        other.f_code.co_filename = new_rows_in
+        loop.on_new_rows(FrameWithMetadata(other, "line"), [17])
+
+
+def test_new_rows_in_loop_keep_it_traced():
+    frame = _Frame()
+    loop = TypeStableLoop(FrameWithMetadata(frame, "line"))
+
+    _iterate(loop, frame, new_rows_in=__file__, iterations=10)
+
+    assert loop.status() == TriggerStatus.INACTIVE
+
+
+def test_new_rows_in_other_files_are_not_counted():
+    frame = _Frame()
+    loop = TypeStableLoop(FrameWithMetadata(frame, "line"))
+
+    _iterate(loop, frame, new_rows_in="other.py", iterations=10)
+
+    assert loop.status() in TypeStableLoop.OPTIMIZING_STATES
+
+
+def test_loop_is_exited_by_its_own_frame_only():
+    frame = _Frame()
+    loop = TypeStableLoop(FrameWithMetadata(frame, "line"))
+    _iterate(loop, frame, new_rows_in="other.py", iterations=10)
+
+    # Lines of other frames outside of the loop, and their returns, do not end it
+    callee = _Frame()
+    callee.f_lineno = 30
+    loop.advance(FrameWithMetadata(callee, "line"))
+    loop.advance(FrameWithMetadata(callee, "return"))
+    assert loop.status() in TypeStableLoop.OPTIMIZING_STATES
+
+    frame.f_lineno = 18
+    loop.advance(FrameWithMetadata(frame, "line"))
+    assert loop.status() == TriggerStatus.EXITED
+
+
+def _identity(value):
+    return value
+
+
+def skippable_while_loop():
+    i = 0
+    while i < 100:
+        _identity(i if i < 50 else str(i))
+        i += 1
+    return i
+
+
+def skippable_nested_loops():
+    s = 0
+    for x in range(3):
+        for y in range(100):
+            _identity(y if y < 50 else str(y))
+            s += y
+    return s
+
+
+def skippable_list_comprehension():
+    return [_identity(x if x < 50 else str(x)) for x in range(100)]
+
+
+def skippable_generator_expression():
+    return list(_identity(x if x < 50 else str(x)) for x in range(100))
+
+
+def _trace(sample) -> pd.DataFrame:
+    tracer = Tracer(proj_path, stdlib_path, venv_path)
+
+    tracer.start_trace()
+    sample()
+    tracer.stop_trace()
+
+    return tracer.trace_data
+
+
+@pytest.mark.parametrize(
+    "sample",
+    [
+        skippable_while_loop,
+        skippable_nested_loops,
+        skippable_list_comprehension,
+        skippable_generator_expression,
+    ],
+)
+def test_stable_loops_are_not_traced(sample):
+    df = _trace(sample)
+
+    # The calls with str arguments are only made once the loop is no longer traced
+    parameters = df[
+        (df[Column.CATEGORY] == TraceDataCategory.FUNCTION_PARAMETER)
+        & (df[Column.FUNCNAME] == _identity.__name__)
+    ]
+    assert set(parameters[Column.VARTYPE]) == {"int"}
+
+    # Tracing resumes once the loop is done
+    returns = df[
+        (df[Column.CATEGORY] == TraceDataCategory.FUNCTION_RETURN)
+        & (df[Column.FUNCNAME] == sample.__name__)
+    ]
+    assert returns.shape[0] == 1
+
+
+def test_loops_end_with_their_call():
+    def sample():
+        skippable_while_loop()
+        _identity(b"")
+
+    df = _trace(sample)
+
+    parameters = df[df[Column.FUNCNAME] == _identity.__name__]
+    assert "bytes" in set(parameters[Column.VARTYPE])
@@ -0,0 +1,92 @@
+import os
+import pathlib
+
+import pandas as pd
+import pytest
+
+from common import TraceDataCategory
+from constants import Column
+from tracing.tracer import MonitoringTracer, Tracer
+
+
+def _identity(value):
+    return value
+
+
+def descend(n):
+    _identity(n if n > 20 else str(n))
+    if n == 0:
+        return 0
+    return descend(n - 1) + 1
+
+
+def descend_with_float(n):
+    if n == 0:
+        return 0
+    # Starting with 50, the call with 41 is the last of the traced depth
+    return descend_with_float(float(n - 1) if n == 41 else n - 1) + 1
+
+
+proj_path = pathlib.Path.cwd()
+stdlib_path = pathlib.Path(pathlib.__file__).parent
+venv_path = pathlib.Path(os.environ["VIRTUAL_ENV"])
+
+tracer_types = [Tracer]
+if MonitoringTracer.is_available():
+    tracer_types.append(MonitoringTracer)
+
+
+def _trace(tracer_type, sample, **kwargs) -> pd.DataFrame:
+    tracer = tracer_type(proj_path, stdlib_path, venv_path, **kwargs)
+
+    tracer.start_trace()
+    sample()
+    tracer.stop_trace()
+
+    return tracer.trace_data
+
+
+def _types_of(df: pd.DataFrame, category: TraceDataCategory, function_name: str) -> set[str]:
+    rows = df[(df[Column.CATEGORY] == category) & (df[Column.FUNCNAME] == function_name)]
+    return set(rows[Column.VARTYPE])
+
+
+@pytest.mark.parametrize("tracer_type", tracer_types)
+def test_deep_recursion_with_seen_argument_types_is_not_traced(tracer_type):
+    df = _trace(tracer_type, lambda: descend(50), recursion_depth=10)
+
+    # The calls with str arguments are only made below the traced depth
+    assert _types_of(df, TraceDataCategory.FUNCTION_PARAMETER, _identity.__name__) == {"int"}
+    assert _types_of(df, TraceDataCategory.FUNCTION_RETURN, descend.__name__) == {"int"}
+
+
+@pytest.mark.parametrize("tracer_type", tracer_types)
+def test_recursion_up_to_depth_is_traced(tracer_type):
+    df = _trace(tracer_type, lambda: descend(50), recursion_depth=100)
+
+    assert _types_of(df, TraceDataCategory.FUNCTION_PARAMETER, _identity.__name__) == {
+        "int",
+        "str",
+    }
+
+
+@pytest.mark.parametrize("tracer_type", tracer_types)
+def test_deep_recursion_with_new_argument_types_is_traced(tracer_type):
+    df = _trace(tracer_type, lambda: descend_with_float(50), recursion_depth=10)
+
+    assert _types_of(
+        df, TraceDataCategory.FUNCTION_PARAMETER, descend_with_float.__name__
+    ) == {"int", "float"}
+
+
+@pytest.mark.parametrize("tracer_type", tracer_types)
+def test_tracing_resumes_after_recursion(tracer_type):
+    def sample():
+        descend(50)
+        _identity(b"")
+
+    df = _trace(tracer_type, sample, recursion_depth=10)
+
+    assert "bytes" in _types_of(
+        df, TraceDataCategory.FUNCTION_PARAMETER, _identity.__name__
+    )
@@ -0,0 +1,221 @@
+import os
+import pathlib
+import types
+
+import pytest
+
+from constants import Column
+from tracing.optimisation import SaturationCache, TypeSaturation
+from tracing.tracer import MonitoringTracer, Tracer
+
+
+def saturating(x):
+    y = x * 2
+    if x > 100:
+        z = str(x)
+    return y
+
+
+proj_path = pathlib.Path.cwd()
+stdlib_path = pathlib.Path(pathlib.__file__).parent
+venv_path = pathlib.Path(os.environ["VIRTUAL_ENV"])
+
+tracer_types = [Tracer]
+if MonitoringTracer.is_available():
+    tracer_types.append(MonitoringTracer)
+
+
+def _call(saturation: TypeSaturation, frame, new_rows: int = 0) -> bool:
+    traces_lines = saturation.enter(frame)
+    saturation.record(new_rows)
+    saturation.exit(frame)
+    return traces_lines
+
+
+def test_code_is_saturated_after_stable_calls():
+    saturation = TypeSaturation(calls_until_saturation=3, backoff=100)
+    code = saturating.__code__
+
+    assert _call(saturation, types.SimpleNamespace(f_code=code), new_rows=4)
+    for _ in range(3):
+        assert _call(saturation, types.SimpleNamespace(f_code=code))
+    assert saturation.is_saturated(code)
+
+    assert not _call(saturation, types.SimpleNamespace(f_code=code))
+
+
+def test_saturated_code_is_sampled_after_backoff():
+    saturation = TypeSaturation(calls_until_saturation=1, backoff=3)
+    code = saturating.__code__
+
+    _call(saturation, types.SimpleNamespace(f_code=code))
+    traced = [_call(saturation, types.SimpleNamespace(f_code=code)) for _ in range(6)]
+    assert traced == [False, False, True, False, False, True]
+
+
+def test_new_rows_end_saturation():
+    saturation = TypeSaturation(calls_until_saturation=1, backoff=100)
+    code = saturating.__code__
+
+    _call(saturation, types.SimpleNamespace(f_code=code))
+    assert saturation.is_saturated(code)
+
+    assert not _call(saturation, types.SimpleNamespace(f_code=code), new_rows=1)
+    assert not saturation.is_saturated(code)
+    assert _call(saturation, types.SimpleNamespace(f_code=code))
+
+
+def test_returns_of_unknown_frames_are_ignored():
+    saturation = TypeSaturation(calls_until_saturation=1, backoff=100)
+    outer, inner = types.SimpleNamespace(f_code=saturating.__code__), types.SimpleNamespace(
+        f_code=test_returns_of_unknown_frames_are_ignored.__code__
+    )
+
+    saturation.enter(outer)
+    saturation.enter(inner)
+    saturation.exit(types.SimpleNamespace(f_code=saturating.__code__))
+
+    # The inner return was missed; the outer return discards it
+    saturation.exit(outer)
+    assert saturation.is_saturated(outer.f_code)
+    assert not saturation.is_saturated(inner.f_code)
+
+
+def _local_names(trace_data) -> set[str]:
+    rows = trace_data[trace_data[Column.FUNCNAME] == saturating.__name__]
+    return set(rows[Column.VARNAME])
+
+
+@pytest.mark.parametrize("tracer_type", tracer_types)
+def test_saturated_function_is_traced_without_lines(tracer_type):
+    tracer = tracer_type(
+        proj_path,
+        stdlib_path,
+        venv_path,
+        apply_opts=True,
+        saturation_threshold=3,
+        saturation_backoff=1000,
+    )
+
+    with tracer.active_trace():
+        for x in range(5):
+            saturating(x)
+        saturating(200)
+
+    assert tracer.saturation.is_saturated(saturating.__code__)
+    assert _local_names(tracer.trace_data) == {"x", "y", "saturating"}
+
+    # A new parameter type ends the saturation, so that later calls are traced fully again
+    with tracer.active_trace():
+        saturating(2.5)
+        saturating(300)
+
+    assert not tracer.saturation.is_saturated(saturating.__code__)
+    assert "z" in _local_names(tracer.trace_data)
+
+
+@pytest.mark.parametrize("tracer_type", tracer_types)
+def test_unoptimised_tracer_traces_every_line(tracer_type):
+    tracer = tracer_type(proj_path, stdlib_path, venv_path, apply_opts=False)
+
+    with tracer.active_trace():
+        for x in range(5):
+            saturating(x)
+        saturating(200)
+
+    assert "z" in _local_names(tracer.trace_data)
+
+
+def _compile_module(path: pathlib.Path, source: str) -> types.CodeType:
+    path.write_text(source)
+    module = compile(source, str(path), "exec")
+    return next(c for c in module.co_consts if isinstance(c, types.CodeType))
+
+
+def test_saturation_cache_is_persisted(tmp_path: pathlib.Path):
+    code = _compile_module(tmp_path / "module.py", "def f(x):\n    return x\n")
+    cache_path = tmp_path / "pytypes" / "saturation.json"
+
+    cache = SaturationCache(tmp_path)
+    cache.add(code)
+    cache.save(cache_path)
+
+    assert SaturationCache.load(cache_path, tmp_path).is_saturated(code)
+
+    cache.discard(code)
+    cache.save(cache_path)
+    assert not SaturationCache.load(cache_path, tmp_path).is_saturated(code)
+
+
+def test_concurrent_saves_are_merged(tmp_path: pathlib.Path):
+    first = _compile_module(tmp_path / "first.py", "def f(x):\n    return x\n")
+    second = _compile_module(tmp_path / "second.py", "def g(x):\n    return x\n")
+    cache_path = tmp_path / "saturation.json"
+
+    initial = SaturationCache(tmp_path)
+    initial.add(first)
+    initial.save(cache_path)
+
+    # As if loaded by two workers of the same session
+    worker = SaturationCache.load(cache_path, tmp_path)
+    other_worker = SaturationCache.load(cache_path, tmp_path)
+    worker.add(second)
+    worker.save(cache_path)
+    other_worker.discard(first)
+    other_worker.save(cache_path)
+
+    stored = SaturationCache.load(cache_path, tmp_path)
+    assert not stored.is_saturated(first)
+    assert stored.is_saturated(second)
+    assert other_worker.is_saturated(second)
+
+
+def test_copied_saturation_cache_is_independent(tmp_path: pathlib.Path):
+    code = _compile_module(tmp_path / "module.py", "def f(x):\n    return x\n")
+    cache = SaturationCache(tmp_path)
+    cache.add(code)
+
+    copied = cache.copy()
+    copied.discard(code)
+
+    assert cache.is_saturated(code)
+    assert not copied.is_saturated(code)
+
+
+def test_saturation_cache_forgets_changed_files(tmp_path: pathlib.Path):
+    source_path = tmp_path / "module.py"
+    code = _compile_module(source_path, "def f(x):\n    return x\n")
+    cache_path = tmp_path / "saturation.json"
+
+    cache = SaturationCache(tmp_path)
+    cache.add(code)
+    cache.save(cache_path)
+
+    changed = _compile_module(source_path, "def f(x):\n    return str(x)\n")
+    assert not SaturationCache.load(cache_path, tmp_path).is_saturated(changed)
+
+
+def test_invalid_saturation_cache_is_ignored(tmp_path: pathlib.Path):
+    code = _compile_module(tmp_path / "module.py", "def f(x):\n    return x\n")
+    cache_path = tmp_path / "saturation.json"
+    cache_path.write_text("{ not json")
+
+    assert not SaturationCache.load(cache_path, tmp_path).is_saturated(code)
+
+
+def test_cached_code_starts_out_saturated(tmp_path: pathlib.Path):
+    code = _compile_module(tmp_path / "module.py", "def f(x):\n    return x\n")
+    cache = SaturationCache(tmp_path)
+    cache.add(code)
+
+    saturation = TypeSaturation(calls_until_saturation=3, backoff=2, cache=cache)
+    frame = types.SimpleNamespace(f_code=code)
+    assert [_call(saturation, frame) for _ in range(4)] == [False, True, False, True]
+
+    # New trace data ends the saturation in the cache as well
+    _call(saturation, frame, new_rows=1)
+    assert not cache.is_saturated(code)
+
+    for _ in range(3):
+        _call(saturation, frame)
+    assert cache.is_saturated(code)
@@ -0,0 +1,94 @@
+import json
+import os
+import pathlib
+
+import pytest
+
+from tracing import benchmark
+from tracing.tracer import NoOperationTracer, Tracer
+
+proj_path = pathlib.Path.cwd()
+stdlib_path = pathlib.Path(pathlib.__file__).parent
+venv_path = pathlib.Path(os.environ["VIRTUAL_ENV"])
+
+
+def workload():
+    total = 0
+    for i in range(100):
+        total += i
+    return total
+
+
+def _traced(tracer_type, **kwargs):
+    def construct():
+        return tracer_type(proj_path, stdlib_path, venv_path, **kwargs)
+
+    return benchmark.Variant(tracer_type.__name__, workload, construct)
+
+
+def test_variants_are_warmed_up_and_repeated():
+    executions = list()
+    variant = benchmark.Variant("bare", lambda: executions.append(None))
+
+    (result,) = benchmark.run([variant], warmup=2, repetitions=5, measure_memory=False)
+
+    assert len(executions) == 7
+    assert len(result.samples) == 5
+    assert result.min <= result.median
+    assert result.stddev >= 0
+    assert result.events is None and result.rows is None and result.peak_memory is None
+
+
+def test_tracers_report_events_rows_and_memory():
+    results = benchmark.run(
+        [_traced(NoOperationTracer), _traced(Tracer, apply_opts=False)],
+        warmup=1,
+        repetitions=3,
+    )
+
+    for result in results:
+        # Every line of the loop emits an event
+        assert result.events is not None and result.events > 100
+        assert result.events_per_second is not None and result.events_per_second > 0
+        assert result.peak_memory is not None and result.peak_memory > 0
+
+    assert results[1].rows is not None and results[1].rows > 0
+
+
+def test_every_execution_is_traced_by_a_new_tracer():
+    tracers = list()
+
+    def construct():
+        tracers.append(Tracer(proj_path, stdlib_path, venv_path, apply_opts=True))
+        return tracers[-1]
+
+    (result,) = benchmark.run(
+        [benchmark.Variant("optimised", workload, construct)],
+        warmup=2,
+        repetitions=3,
+        measure_memory=False,
+    )
+
+    # The timed tracers have not seen the callable before, so that each one emits the same rows
+    assert len(tracers) == 5
+    assert result.tracer is tracers[-1]
+    assert {tracer.traced_rows for tracer in tracers} == {result.rows}
+    assert result.events == tracers[-1].event_count
+
+
+def test_record_is_serialisable():
+    results = benchmark.run(
+        [benchmark.Variant("bare", workload)], warmup=0, repetitions=2
+    )
+
+    record = benchmark.to_record(results, warmup=0, repetitions=2, func_name="test")
+    loaded = json.loads(json.dumps(record))
+
+    assert loaded["version"] == benchmark.RECORD_VERSION
+    assert loaded["func_name"] == "test"
+    assert set(loaded["variants"]["bare"]) >= {"samples", "min", "median", "stddev"}
+
+
+def test_repetitions_are_required():
+    with pytest.raises(ValueError):
+        benchmark.run([benchmark.Variant("bare", workload)], warmup=0, repetitions=0)
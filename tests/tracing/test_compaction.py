@@ -0,0 +1,94 @@
+import pathlib
+
+import pandas as pd
+
+import constants
+from common import trace_data_encoding, trace_data_file
+from constants import Column, Schema
+from tracing import compaction
+
+
+def _trace_data(*function_names: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            Column.FILENAME: ["module.py"] * len(function_names),
+            Column.CLASS_MODULE: [None] * len(function_names),
+            Column.CLASS: [None] * len(function_names),
+            Column.FUNCNAME: list(function_names),
+            Column.LINENO: [None] * len(function_names),
+            Column.CATEGORY: [3] * len(function_names),
+            Column.VARNAME: ["a"] * len(function_names),
+            Column.VARTYPE_MODULE: [None] * len(function_names),
+            Column.VARTYPE: ["int"] * len(function_names),
+        }
+    ).astype(Schema.TraceData)
+
+
+def _write(path: pathlib.Path, trace_data: pd.DataFrame) -> pathlib.Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(trace_data_file.serialise(trace_data))
+    return path
+
+
+def _multiplicities(path: pathlib.Path) -> dict[str, tuple[int, int]]:
+    compacted = trace_data_encoding.expand(trace_data_file.load(path))
+    return {
+        row[Column.FUNCNAME]: (row[Column.COUNT], row[Column.TESTS])
+        for _, row in compacted.iterrows()
+    }
+
+
+def test_compaction_counts_occurrences_and_tests(tmp_path):
+    ending = constants.TRACE_DATA_FILE_ENDING
+    _write(tmp_path / "a" / f"test_a-main-0{ending}", _trace_data("f", "g", "f"))
+    (tmp_path / "b").mkdir()
+    _trace_data("g", "h").to_pickle(tmp_path / "b" / f"test_b-main-1{ending}")
+    err = tmp_path / "b" / "test_b-main-1.err"
+    err.write_text("Traceback")
+
+    compacted_path = compaction.compact(tmp_path, batch_size=2)
+
+    assert compacted_path == tmp_path / f"{constants.COMPACTED_TRACE_DATA_FILE_NAME}{ending}"
+    assert list(tmp_path.rglob(f"*{ending}")) == [compacted_path]
+    assert err.is_file()
+    assert _multiplicities(compacted_path) == {"f": (2, 1), "g": (2, 2), "h": (1, 1)}
+
+
+def test_compaction_is_incremental(tmp_path):
+    ending = constants.TRACE_DATA_FILE_ENDING
+    _write(tmp_path / f"test_a-main-0{ending}", _trace_data("f", "g"))
+    compacted_path = compaction.compact(tmp_path)
+
+    _write(tmp_path / f"test_b-main-0{ending}", _trace_data("g", "h"))
+    compaction.compact(tmp_path)
+
+    assert _multiplicities(compacted_path) == {"f": (1, 1), "g": (2, 2), "h": (1, 1)}
+    manifest = compaction._read_manifest(compacted_path)
+    assert sorted(manifest["shards"]) == [f"test_a-main-0{ending}", f"test_b-main-0{ending}"]
+
+
+def test_compaction_skips_shards_listed_in_manifest(tmp_path):
+    ending = constants.TRACE_DATA_FILE_ENDING
+    shard = _write(tmp_path / f"test_a-main-0{ending}", _trace_data("f"))
+    content = shard.read_bytes()
+    compacted_path = compaction.compact(tmp_path)
+
+    # As if the earlier compaction had been interrupted after writing the compacted file, before removing the shard
+    shard.write_bytes(content)
+    manifest = compaction._read_manifest(compacted_path)
+    manifest["shards"][shard.name] = compaction._fingerprint(shard)
+    compacted_path.write_bytes(
+        trace_data_file.serialise(
+            trace_data_file.load(compacted_path),
+            metadata={compaction._MANIFEST_KEY: manifest},
+        )
+    )
+
+    compaction.compact(tmp_path)
+
+    assert not shard.exists()
+    assert _multiplicities(compacted_path) == {"f": (1, 1)}
+
+
+def test_compaction_without_shards(tmp_path):
+    assert compaction.compact(tmp_path) is None
@@ -0,0 +1,151 @@
+import os
+import pathlib
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+from constants import Column
+from tracing.tracer import MonitoringTracer, Tracer
+from tests.tracing.test_tracer import (
+    SampleClass,
+    OuterClass,
+    sample_compare_two_int_lists,
+    sample_convert_string_to_int,
+    sample_get_two_variables_declared_in_one_line,
+)
+
+proj_path = pathlib.Path.cwd()
+stdlib_path = pathlib.Path(pathlib.__file__).parent
+venv_path = pathlib.Path(os.environ["VIRTUAL_ENV"])
+
+pytestmark = pytest.mark.skipif(
+    not MonitoringTracer.is_available(), reason="sys.monitoring requires Python 3.12"
+)
+
+
+def _generate_squares(limit: int):
+    for i in range(limit):
+        square = i * i
+        yield square
+
+
+def _without_tracer_rows(trace_data: pd.DataFrame) -> pd.DataFrame:
+    tracer_file = str(pathlib.Path("tracing", "tracer.py"))
+    return trace_data[trace_data[Column.FILENAME] != tracer_file].reset_index(drop=True)
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda: sample_compare_two_int_lists([1, 2, 3], [1, 2, 4]),
+        lambda: sample_convert_string_to_int("not a number"),
+        lambda: sample_get_two_variables_declared_in_one_line(),
+        lambda: SampleClass(5, "sample").sample_check_if_arguments_match_members(5, "x"),
+        lambda: OuterClass(),
+        lambda: list(_generate_squares(4)),
+    ],
+)
+@pytest.mark.parametrize("apply_opts", [False, True])
+def test_monitoring_tracer_matches_settrace_tracer(call, apply_opts: bool):
+    settrace_tracer = Tracer(proj_path, stdlib_path, venv_path, apply_opts=apply_opts)
+    with settrace_tracer.active_trace():
+        call()
+
+    monitoring_tracer = MonitoringTracer(
+        proj_path, stdlib_path, venv_path, apply_opts=apply_opts
+    )
+    with monitoring_tracer.active_trace():
+        call()
+
+    # The tracers' own frames are traced too, and differ by the tracer's type
+    expected = _without_tracer_rows(settrace_tracer.trace_data)
+    actual = _without_tracer_rows(monitoring_tracer.trace_data)
+    assert not actual.empty
+    assert expected.equals(actual), f"expected:\n{expected}\n\nactual:\n{actual}"
+
+
+def _square(value: int) -> int:
+    squared = value * value
+    return squared
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        _square(3)
+
+
+@pytest.mark.parametrize("apply_opts", [False, True])
+def test_monitoring_tracer_only_traces_its_own_thread(apply_opts: bool):
+    settrace_tracer = Tracer(proj_path, stdlib_path, venv_path, apply_opts=apply_opts)
+    with settrace_tracer.active_trace():
+        sample_compare_two_int_lists([1, 2, 3], [1, 2, 4])
+
+    # Like sys.settrace, which is set per thread, code run by other threads is not traced
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,))
+    thread.start()
+    try:
+        monitoring_tracer = MonitoringTracer(
+            proj_path, stdlib_path, venv_path, apply_opts=apply_opts
+        )
+        with monitoring_tracer.active_trace():
+            for _ in range(50):
+                sample_compare_two_int_lists([1, 2, 3], [1, 2, 4])
+    finally:
+        stop.set()
+        thread.join()
+
+    expected = _without_tracer_rows(settrace_tracer.trace_data)
+    actual = _without_tracer_rows(monitoring_tracer.trace_data)
+    assert expected.equals(actual), f"expected:\n{expected}\n\nactual:\n{actual}"
+
+
+def test_monitoring_tracer_only_restarts_locations_disabled_by_optimisations(monkeypatch):
+    restarts = list()
+    restart_events = sys.monitoring.restart_events
+    monkeypatch.setattr(
+        sys.monitoring, "restart_events", lambda: restarts.append(restart_events())
+    )
+    disabled_in = list()
+    restart_disabled = MonitoringTracer._restart_disabled_locations
+
+    def record_restart(tracer: MonitoringTracer) -> None:
+        disabled_in.extend(tracer._disabled_in)
+        restart_disabled(tracer)
+
+    monkeypatch.setattr(MonitoringTracer, "_restart_disabled_locations", record_restart)
+
+    tracer = MonitoringTracer(proj_path, stdlib_path, venv_path, apply_opts=True)
+    with tracer.active_trace():
+        for _ in range(3):
+            sample_compare_two_int_lists(list(range(20)), list(range(20)))
+
+    # Locations outside of the project stay disabled until the tracer unregisters
+    assert disabled_in
+    assert len(restarts) == 1
+
+
+def test_monitoring_tracer_releases_tool_id():
+    tracer = MonitoringTracer(proj_path, stdlib_path, venv_path)
+    with tracer.active_trace():
+        sample_compare_two_int_lists([1], [1])
+
+    assert all(sys.monitoring.get_tool(tool_id) is None for tool_id in MonitoringTracer._TOOL_IDS)
+    assert sys.gettrace() is None
+
+
+def test_monitoring_tracer_stops_after_error():
+    tracer = MonitoringTracer(proj_path, stdlib_path, venv_path)
+
+    def failing_resolution(ty: type):
+        raise ImportError(f"Unable to resolve {ty}")
+
+    tracer._resolver.get_module_and_name = failing_resolution  # type: ignore
+
+    with pytest.raises(ImportError):
+        with tracer.active_trace():
+            sample_compare_two_int_lists([1], [1])
+
+    assert all(sys.monitoring.get_tool(tool_id) is None for tool_id in MonitoringTracer._TOOL_IDS)
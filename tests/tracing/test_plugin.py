@@ -0,0 +1,166 @@
+import os
+import pathlib
+import re
+
+import pandas as pd
+import pytest
+
+import constants
+from common import TraceDataCategory, ptconfig, trace_data_encoding, trace_data_file
+from constants import Column
+
+pytest_plugins = ["pytester"]
+
+SAMPLE_TESTS = """
+def add(a, b):
+    return a + b
+
+def test_int():
+    assert add(1, 2) == 3
+
+def test_str():
+    assert add("a", "b") == "ab"
+
+def test_int_again():
+    assert add(3, 4) == 7
+
+def test_fails():
+    assert add(1.0, 2.0) == 0
+"""
+
+
+@pytest.fixture
+def project(pytester: pytest.Pytester) -> pathlib.Path:
+    pytester.makepyfile(test_sample=SAMPLE_TESTS)
+    ptconfig.write_config(
+        pytester.path / constants.CONFIG_FILE_NAME,
+        ptconfig.TomlCfg(
+            pytypes=ptconfig.PyTypes(
+                project="plugin",
+                proj_path=pytester.path,
+                stdlib_path=pathlib.Path(pathlib.__file__).parent,
+                venv_path=pathlib.Path(os.environ["VIRTUAL_ENV"]),
+            )
+        ),
+    )
+    return pytester.path
+
+
+def _batches(project: pathlib.Path) -> list[pathlib.Path]:
+    output = project / "pytypes" / "plugin" / constants.PLUGIN_BATCH_TEST_CASE
+    return sorted(output.glob(f"*{constants.TRACE_DATA_FILE_ENDING}"))
+
+
+def _load(path: pathlib.Path) -> pd.DataFrame:
+    return trace_data_encoding.expand(trace_data_file.load(path))
+
+
+def _parameters(trace_data: pd.DataFrame) -> pd.DataFrame:
+    return trace_data[
+        (trace_data[Column.CATEGORY] == TraceDataCategory.FUNCTION_PARAMETER)
+        & (trace_data[Column.FUNCNAME] == "add")
+    ]
+
+
+def _parameter_types(trace_data: pd.DataFrame) -> set[str]:
+    return set(_parameters(trace_data)[Column.VARTYPE])
+
+
+def test_tests_of_a_batch_are_stored_by_a_single_write(
+    pytester: pytest.Pytester, project: pathlib.Path
+):
+    result = pytester.runpytest_inprocess("-p", "tracing.plugin", "--pytypes")
+    result.assert_outcomes(passed=3, failed=1)
+
+    batches = _batches(project)
+    assert len(batches) == 1
+    assert list((project / "pytypes" / "plugin").rglob(f"*{constants.TRACE_DATA_FILE_ENDING}")) == batches
+
+    traced = _load(batches[0])
+    assert _parameter_types(traced) == {"int", "str", "float"}
+    assert {"test_int", "test_str", "test_int_again", "test_fails"} <= set(traced[Column.FUNCNAME])
+
+    # add's parameters are traced as ints by test_int and test_int_again
+    ints = _parameters(traced)[_parameters(traced)[Column.VARTYPE] == "int"]
+    assert list(ints[Column.COUNT]) == [2, 2]
+    assert list(ints[Column.TESTS]) == [2, 2]
+
+
+def test_counts_of_all_tests_add_up(pytester: pytest.Pytester, project: pathlib.Path):
+    pytester.runpytest_inprocess("-p", "tracing.plugin", "--pytypes", "--pytypes-merge")
+
+    merged = _load(
+        project
+        / "pytypes"
+        / "plugin"
+        / (constants.MERGED_TRACE_DATA_FILE_NAME + constants.TRACE_DATA_FILE_ENDING)
+    )
+    parameters = merged[
+        (merged[Column.CATEGORY] == TraceDataCategory.FUNCTION_PARAMETER)
+        & (merged[Column.FUNCNAME] == "add")
+    ]
+    counts = parameters.groupby(Column.VARTYPE)[Column.COUNT].sum()
+
+    # add is called with ints by test_int and test_int_again
+    assert counts.to_dict() == {"float": 2, "int": 4, "str": 2}
+
+
+def test_failing_tests_are_stored_with_their_error(
+    pytester: pytest.Pytester, project: pathlib.Path
+):
+    pytester.runpytest_inprocess("-p", "tracing.plugin", "--pytypes")
+
+    errors = list((project / "pytypes" / "plugin").rglob("*.err"))
+    assert len(errors) == 1
+    assert errors[0].name.startswith("test_fails")
+    assert "AssertionError" in errors[0].read_text()
+
+
+def test_tests_are_not_traced_without_plugin(
+    pytester: pytest.Pytester, project: pathlib.Path
+):
+    result = pytester.runpytest_inprocess()
+    result.assert_outcomes(passed=3, failed=1)
+
+    assert not (project / "pytypes").exists()
+
+
+def test_installed_plugin_leaves_sessions_without_flag_untouched(
+    pytester: pytest.Pytester,
+):
+    # As if loaded by the entry point of an installed PyTypes, in a project without a config file
+    pytester.makepyfile(
+        test_other="""
+def test_plugin_is_not_registered(request):
+    assert request.config.pluginmanager.get_plugin("pytypes-tracing") is None
+"""
+    )
+
+    result = pytester.runpytest_inprocess("-p", "tracing.plugin")
+    result.assert_outcomes(passed=1)
+
+    assert not (pytester.path / "pytypes").exists()
+
+
+def test_files_are_named_after_the_worker(
+    pytester: pytest.Pytester, project: pathlib.Path, monkeypatch
+):
+    monkeypatch.setenv(constants.XDIST_WORKER_VARIABLE, "gw3")
+    pytester.runpytest_inprocess("-p", "tracing.plugin", "--pytypes")
+
+    names = [path.stem for path in _batches(project)]
+    assert len(names) == 1
+    assert re.fullmatch(rf"{constants.PLUGIN_BATCH_FILE_NAME}-gw3-\d+", names[0])
+
+
+def test_files_are_merged_after_the_session(
+    pytester: pytest.Pytester, project: pathlib.Path
+):
+    pytester.runpytest_inprocess("-p", "tracing.plugin", "--pytypes", "--pytypes-merge")
+
+    output = project / "pytypes" / "plugin"
+    files = list(output.rglob(f"*{constants.TRACE_DATA_FILE_ENDING}"))
+    assert files == [
+        output / (constants.MERGED_TRACE_DATA_FILE_NAME + constants.TRACE_DATA_FILE_ENDING)
+    ]
+    assert _parameter_types(_load(files[0])) == {"int", "str", "float"}
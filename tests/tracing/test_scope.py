@@ -0,0 +1,117 @@
+import functools
+import os
+import pathlib
+
+import pytest
+
+from constants import Column
+from tracing.scope import CodeScope, IgnoreRules, ScopeCache
+from tracing.tracer import MonitoringTracer, Tracer
+
+proj_path = pathlib.Path.cwd()
+stdlib_path = pathlib.Path(pathlib.__file__).parent
+venv_path = pathlib.Path(os.environ["VIRTUAL_ENV"])
+
+tracer_types = [Tracer]
+if MonitoringTracer.is_available():
+    tracer_types.append(MonitoringTracer)
+
+
+def sample_add(a: int, b: int) -> int:
+    result = a + b
+    return result
+
+
+def log_calls(f):
+    return f
+
+
+class Serialiser:
+    def dump(self, value):
+        return str(value)
+
+
+@log_calls
+def sample_logged(value):
+    return sample_add(value, value)
+
+
+@functools.lru_cache(maxsize=None)
+def sample_cached(value):
+    return value
+
+
+def test_project_code_is_traced():
+    scopes = ScopeCache(proj_path)
+
+    assert scopes.scope(sample_add.__code__) == CodeScope.TRACED
+    assert scopes.file_name(sample_add.__code__) == pathlib.Path(
+        "tests", "tracing", "test_scope.py"
+    )
+
+
+def test_out_of_project_code_is_ignored():
+    scopes = ScopeCache(proj_path)
+
+    assert scopes.scope(pathlib.Path.cwd.__code__) == CodeScope.IGNORED
+    assert scopes.file_name(pathlib.Path.cwd.__code__) is None
+
+
+@pytest.mark.parametrize(
+    ("rules", "excluded"),
+    [
+        (IgnoreRules(modules=["tests.tracing.*"]), True),
+        (IgnoreRules(modules=["tests.common.*"]), False),
+        (IgnoreRules(functions=["tests.tracing.test_scope.sample_*"]), True),
+        (IgnoreRules(functions=["tests.tracing.test_scope.sample_add"]), False),
+        (IgnoreRules(decorators=["log_calls"]), True),
+        (IgnoreRules(decorators=["functools.*"]), False),
+    ],
+)
+def test_ignore_rules_exclude_matching_code(rules: IgnoreRules, excluded: bool):
+    scopes = ScopeCache(proj_path, rules)
+
+    expected = CodeScope.EXCLUDED if excluded else CodeScope.TRACED
+    assert scopes.scope(sample_logged.__code__) == expected
+
+
+def test_ignore_rules_match_qualified_names_and_decorators_with_arguments():
+    scopes = ScopeCache(
+        proj_path,
+        IgnoreRules(
+            functions=["tests.tracing.test_scope.Serialiser.*"],
+            decorators=["functools.lru_cache"],
+        ),
+    )
+
+    assert scopes.scope(Serialiser.dump.__code__) == CodeScope.EXCLUDED
+    assert scopes.scope(sample_cached.__wrapped__.__code__) == CodeScope.EXCLUDED
+    assert scopes.scope(sample_add.__code__) == CodeScope.TRACED
+
+
+@pytest.mark.parametrize("tracer_type", tracer_types)
+@pytest.mark.parametrize(
+    ("apply_opts", "traced_functions"),
+    [(True, set()), (False, {sample_add.__name__})],
+)
+def test_excluded_code_is_not_traced(
+    tracer_type, apply_opts: bool, traced_functions: set[str]
+):
+    tracer = tracer_type(
+        proj_path,
+        stdlib_path,
+        venv_path,
+        apply_opts=apply_opts,
+        ignore_rules=IgnoreRules(decorators=["log_calls"]),
+    )
+
+    with tracer.active_trace():
+        sample_logged(1)
+        Serialiser().dump(2)
+
+    traced = tracer.trace_data
+    sampled = set(traced[Column.FUNCNAME]) & {sample_logged.__name__, sample_add.__name__}
+
+    # When optimising, the calls made by excluded code are not traced either
+    assert sampled == traced_functions
+    assert Serialiser.dump.__name__ in set(traced[Column.FUNCNAME])
@@ -0,0 +1,107 @@
+import pathlib
+
+import pandas as pd
+
+import constants
+from common import trace_data_encoding, trace_data_file
+from constants import Column, Schema
+from tracing import compaction, shards
+
+
+def _trace_data(*function_names: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            Column.FILENAME: ["module.py"] * len(function_names),
+            Column.CLASS_MODULE: [None] * len(function_names),
+            Column.CLASS: [None] * len(function_names),
+            Column.FUNCNAME: list(function_names),
+            Column.LINENO: [1] * len(function_names),
+            Column.CATEGORY: [3] * len(function_names),
+            Column.VARNAME: ["a"] * len(function_names),
+            Column.VARTYPE_MODULE: [None] * len(function_names),
+            Column.VARTYPE: ["int"] * len(function_names),
+        }
+    ).astype(Schema.TraceData)
+
+
+def _write(path: pathlib.Path, trace_data: pd.DataFrame) -> pathlib.Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    trace_data.to_pickle(str(path))
+    return path
+
+
+def test_worker_id_defaults_to_main(monkeypatch):
+    monkeypatch.delenv(constants.XDIST_WORKER_VARIABLE, raising=False)
+    assert shards.worker_id() == constants.MAIN_WORKER_ID
+
+    monkeypatch.setenv(constants.XDIST_WORKER_VARIABLE, "gw7")
+    assert shards.worker_id() == "gw7"
+
+
+def test_shard_suffixes_are_unique(monkeypatch):
+    monkeypatch.setenv(constants.XDIST_WORKER_VARIABLE, "gw0")
+
+    suffixes = [shards.shard_suffix() for _ in range(3)]
+    assert len(set(suffixes)) == 3
+    assert all(suffix.startswith("-gw0-") for suffix in suffixes)
+
+
+def test_merge_shards_keeps_unique_rows(tmp_path):
+    ending = constants.TRACE_DATA_FILE_ENDING
+    _write(tmp_path / "a" / f"test_a-gw0-0{ending}", _trace_data("f", "g"))
+    _write(tmp_path / "b" / f"test_b-gw1-0{ending}", _trace_data("g", "h"))
+    err = tmp_path / "b" / "test_b-gw1-0.err"
+    err.write_text("Traceback")
+
+    merged_path = shards.merge_shards(tmp_path)
+
+    assert merged_path == tmp_path / f"{constants.MERGED_TRACE_DATA_FILE_NAME}{ending}"
+    assert list(tmp_path.rglob(f"*{ending}")) == [merged_path]
+    assert err.is_file()
+
+    assert trace_data_file.is_columnar(merged_path)
+    merged = trace_data_encoding.expand(trace_data_file.load(merged_path))
+    assert sorted(merged[Column.FUNCNAME]) == ["f", "g", "h"]
+    assert (merged.dtypes == pd.Series(Schema.TraceData | Schema.Multiplicities)).all()
+
+
+def test_merge_shards_sums_counts(tmp_path):
+    ending = constants.TRACE_DATA_FILE_ENDING
+    counted = _trace_data("f", "g").assign(**{Column.COUNT: [3, 4]})
+    _write(tmp_path / f"test_a-gw0-0{ending}", counted.astype({Column.COUNT: "UInt64"}))
+    # Rows of files without counts count once
+    _write(tmp_path / f"test_b-gw1-0{ending}", _trace_data("g", "h"))
+
+    merged = trace_data_file.load(shards.merge_shards(tmp_path))
+
+    counts = dict(zip(merged[Column.FUNCNAME].astype(str), merged[Column.COUNT]))
+    assert counts == {"f": 3, "g": 5, "h": 1}
+    tests = dict(zip(merged[Column.FUNCNAME].astype(str), merged[Column.TESTS]))
+    assert tests == {"f": 1, "g": 2, "h": 1}
+
+
+def test_merged_shards_are_compacted_as_all_their_tests(tmp_path):
+    ending = constants.TRACE_DATA_FILE_ENDING
+    for worker in range(3):
+        _write(tmp_path / f"test_a-gw{worker}-0{ending}", _trace_data("f", "f"))
+
+    shards.merge_shards(tmp_path)
+    compacted = trace_data_file.load(compaction.compact(tmp_path))
+
+    assert list(compacted[Column.COUNT]) == [6]
+    assert list(compacted[Column.TESTS]) == [3]
+
+
+def test_merge_shards_skips_other_files(tmp_path):
+    ending = constants.TRACE_DATA_FILE_ENDING
+    other = _write(tmp_path / f"other{ending}", pd.DataFrame({"x": [1]}))
+    _write(tmp_path / f"test-main-0{ending}", _trace_data("f"))
+
+    shards.merge_shards(tmp_path)
+
+    assert other.is_file()
+    assert len(trace_data_file.load(tmp_path / f"merged{ending}")) == 1
+
+
+def test_merge_without_shards(tmp_path):
+    assert shards.merge_shards(tmp_path) is None
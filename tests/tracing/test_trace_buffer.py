@@ -0,0 +1,141 @@
+import pathlib
+
+import pandas as pd
+
+from common import TraceDataCategory
+from constants import Column, Schema
+from tracing.trace_buffer import TraceDataBuffer
+from tracing.trace_update import BatchTraceUpdate
+
+
+def _sample_batch(line_number: int = 3) -> BatchTraceUpdate:
+    batch = BatchTraceUpdate(
+        file_name=pathlib.Path("module.py"),
+        class_module=None,
+        class_name=None,
+        function_name="func",
+        line_number=line_number,
+    )
+    return batch.parameters({"a": (None, "int"), "b": ("pathlib", "Path")}).returns(
+        {"func": (None, "str")}
+    )
+
+
+def test_empty_buffer_produces_empty_frame_with_schema():
+    frame = TraceDataBuffer().to_frame()
+
+    assert frame.empty
+    assert list(frame.columns) == list(Schema.TraceData.keys())
+    assert (frame.dtypes == pd.Series(Schema.TraceData)).all()
+
+
+def test_buffer_grows_past_initial_capacity():
+    buffer = TraceDataBuffer(capacity=1)
+    for line_number in range(10):
+        buffer.extend(_sample_batch(line_number).to_rows())
+
+    # The return is traced on line 0 in each batch
+    assert len(buffer) == 21
+    frame = buffer.to_frame()
+    assert frame.shape[0] == 21
+    assert frame[Column.VARNAME].tolist()[:3] == ["a", "b", "func"]
+
+
+def test_buffer_matches_batch_frame():
+    buffer = TraceDataBuffer()
+    buffer.extend(_sample_batch().to_rows())
+
+    expected = pd.DataFrame(columns=Schema.TraceData.keys())
+    expected.loc[len(expected.index)] = [
+        "module.py", None, None, "func", 3, TraceDataCategory.FUNCTION_PARAMETER, "a", None, "int",
+    ]
+    expected.loc[len(expected.index)] = [
+        "module.py", None, None, "func", 3, TraceDataCategory.FUNCTION_PARAMETER, "b", "pathlib", "Path",
+    ]
+    expected.loc[len(expected.index)] = [
+        "module.py", None, None, "func", 0, TraceDataCategory.FUNCTION_RETURN, "func", None, "str",
+    ]
+    expected = expected.astype(Schema.TraceData)
+
+    assert expected.equals(buffer.to_frame())
+    assert expected.equals(_sample_batch().to_frame())
+
+
+def test_cleared_buffer_is_empty():
+    buffer = TraceDataBuffer()
+    buffer.extend(_sample_batch().to_rows())
+    buffer.clear()
+
+    assert len(buffer) == 0
+    assert buffer.to_frame().empty
+
+
+def test_buffer_skips_and_counts_duplicate_rows():
+    buffer = TraceDataBuffer()
+    assert buffer.extend(_sample_batch().to_rows()) == 3
+    assert buffer.extend(_sample_batch().to_rows()) == 0
+    assert buffer.extend(_sample_batch(line_number=4).to_rows()) == 2
+
+    assert len(buffer) == 5
+    assert buffer.counts().tolist() == [2, 2, 3, 1, 1]
+
+    row = next(iter(_sample_batch().to_rows()))
+    assert buffer.count(row) == 2
+    assert not buffer.to_frame().duplicated().any()
+
+
+def test_buffer_reuses_frame_until_rows_are_added():
+    buffer = TraceDataBuffer()
+    buffer.extend(_sample_batch().to_rows())
+    frame = buffer.to_frame()
+
+    buffer.extend(_sample_batch().to_rows())
+    assert buffer.to_frame() is frame
+
+    buffer.extend(_sample_batch(line_number=4).to_rows())
+    assert buffer.to_frame() is not frame
+    assert buffer.to_frame().shape[0] == 5
+
+
+def test_frame_since_skips_earlier_rows():
+    buffer = TraceDataBuffer()
+    buffer.extend(_sample_batch(1).to_rows())
+    start = len(buffer)
+    buffer.extend(_sample_batch(2).to_rows())
+    buffer.extend(_sample_batch(1).to_rows())
+
+    frame = buffer.to_frame(start)
+    assert frame.shape[0] == len(buffer) - start
+    assert set(frame[Column.LINENO]) == {2}
+    assert frame.index[0] == start
+    assert (frame.dtypes == pd.Series(Schema.TraceData)).all()
+
+
+def test_counts_since_are_aligned_with_frame_since():
+    buffer = TraceDataBuffer()
+    buffer.extend(_sample_batch(1).to_rows())
+    start = len(buffer)
+    buffer.extend(_sample_batch(2).to_rows())
+    buffer.extend(_sample_batch(2).to_rows())
+
+    counts = buffer.counts(start)
+    assert counts.index.equals(buffer.to_frame(start).index)
+    assert counts.tolist() == [2, 2]
+
+
+def test_increments_include_rows_appended_again():
+    buffer = TraceDataBuffer()
+    buffer.extend(_sample_batch(1).to_rows())
+    buffer.extend(_sample_batch(1).to_rows())
+    first = buffer.take_increments()
+
+    buffer.extend(_sample_batch(2).to_rows())
+    buffer.extend(_sample_batch(1).to_rows())
+    second = buffer.take_increments()
+
+    assert first.tolist() == [2, 2, 2]
+    assert buffer.select(second.index).equals(buffer.to_frame())
+    # The batches share the row of the return, which has been appended by both since
+    assert second.tolist() == [1, 1, 2, 1, 1]
+    assert (first.add(second, fill_value=0) == buffer.counts()).all()
+    assert buffer.take_increments().empty
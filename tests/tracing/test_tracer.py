@@ -82,6 +82,7 @@ class OuterClass:
 
 
 cwd = pathlib.Path.cwd()
+import types
 from types import NoneType
 
 proj_path = pathlib.Path.cwd()
@@ -92,6 +93,7 @@ stdlib_path = pathlib.Path(pathlib.__file__).parent
 
 import pytest
 from common import TraceDataCategory
+from tracing import tracer as tracer_module
 
 
 @pytest.fixture(scope="function")
@@ -712,4 +714,160 @@ def test_tracer_names_inner_correctly(tracers: list[Tracer]):
         logging.debug(f"\n{trace_data}")
 
         subset = expected.merge(trace_data, how="inner")
-        assert len(subset) == len(expected), f"Failed to find inner class!\n{trace_data}"
\ No newline at end of file
+        assert len(subset) == len(expected), f"Failed to find inner class!\n{trace_data}"
+
+
+class OuterWithMethods:
+    class InnerWithMethods:
+        def inner_method(self, value: int) -> int:
+            doubled = value * 2
+            return doubled
+
+
+@pytest.mark.skipif(sys.version_info < (3, 11), reason="co_qualname requires Python 3.11")
+def test_tracer_finds_class_of_nested_method(tracers: list[Tracer]):
+    for tracer in tracers:
+        with tracer.active_trace():
+            OuterWithMethods.InnerWithMethods().inner_method(2)
+            OuterWithMethods.InnerWithMethods().inner_method(3)
+
+        trace_data = tracer.trace_data
+        rows = trace_data[trace_data[Column.FUNCNAME] == "inner_method"]
+
+        assert not rows.empty
+        assert set(rows[Column.CLASS]) == {"OuterWithMethods.InnerWithMethods"}
+        assert set(rows[Column.CLASS_MODULE]) == {"tests.tracing.test_tracer"}
+        assert (
+            tracer._code2class[OuterWithMethods.InnerWithMethods.inner_method.__code__]
+            is OuterWithMethods.InnerWithMethods
+        )
+
+
+class WithProperty:
+    @property
+    def value(self) -> int:
+        value = 1
+        return value
+
+
+@pytest.mark.skipif(sys.version_info < (3, 11), reason="co_qualname requires Python 3.11")
+def test_tracer_remembers_missing_class_of_bound_owner(tracers: list[Tracer], monkeypatch):
+    scanned: list[types.CodeType] = list()
+    get_class_in_frame = tracer_module._get_class_in_frame
+
+    def count_scans(frame):
+        scanned.append(frame.f_code)
+        return get_class_in_frame(frame)
+
+    monkeypatch.setattr(tracer_module, "_get_class_in_frame", count_scans)
+
+    getter = WithProperty.value.fget.__code__
+    for tracer in tracers:
+        scanned.clear()
+        with tracer.active_trace():
+            for _ in range(50):
+                _ = WithProperty().value
+
+        # The property is not a function of the class, so the lookup fails, but only once
+        assert scanned.count(getter) == 1
+        assert tracer._code2class[getter] is None
+
+
+class IncomparableValue:
+    comparisons = 0
+
+    def __ne__(self, other):
+        IncomparableValue.comparisons += 1
+        raise ValueError("The truth value of this comparison is ambiguous")
+
+
+def sample_reassign_variables():
+    incomparable = IncomparableValue()
+    number = 1
+    number = 2
+    number = "changed"
+    incomparable = IncomparableValue()
+    return number, incomparable
+
+
+def _local_variable_lines(trace_data: pd.DataFrame, name: str) -> list[tuple[int, str]]:
+    rows = trace_data[
+        (trace_data[Column.FUNCNAME] == "sample_reassign_variables")
+        & (trace_data[Column.CATEGORY] == TraceDataCategory.LOCAL_VARIABLE)
+        & (trace_data[Column.VARNAME] == name)
+    ]
+    return sorted(zip(rows[Column.LINENO], rows[Column.VARTYPE]))
+
+
+def test_tracer_treats_failing_comparisons_as_changes():
+    tracer = Tracer(
+        proj_path=proj_path,
+        venv_path=venv_path,
+        stdlib_path=stdlib_path,
+        apply_opts=False,
+    )
+    with tracer.active_trace():
+        sample_reassign_variables()
+
+    first_line = sample_reassign_variables.__code__.co_firstlineno
+    assert _local_variable_lines(tracer.trace_data, "number") == [
+        (first_line + 2, int.__name__),
+        (first_line + 3, int.__name__),
+        (first_line + 4, str.__name__),
+    ]
+    assert len(_local_variable_lines(tracer.trace_data, "incomparable")) > 1
+
+
+def test_tracer_with_type_only_snapshots_only_traces_type_changes():
+    tracer = Tracer(
+        proj_path=proj_path,
+        venv_path=venv_path,
+        stdlib_path=stdlib_path,
+        apply_opts=False,
+        type_only_snapshots=True,
+    )
+    IncomparableValue.comparisons = 0
+    with tracer.active_trace():
+        sample_reassign_variables()
+
+    first_line = sample_reassign_variables.__code__.co_firstlineno
+    assert _local_variable_lines(tracer.trace_data, "number") == [
+        (first_line + 2, int.__name__),
+        (first_line + 4, str.__name__),
+    ]
+    assert _local_variable_lines(tracer.trace_data, "incomparable") == [
+        (first_line + 1, IncomparableValue.__name__)
+    ]
+    assert IncomparableValue.comparisons == 0
+
+
+def sample_modify_globals_indirectly():
+    globals()["an_indirect_global_var"] = 1.5
+    local_value = 1
+    return local_value
+
+
+def test_tracer_finds_globals_changed_without_store_global(tracers: list[Tracer]):
+    for tracer in tracers:
+        globals().pop("an_indirect_global_var", None)
+        with tracer.active_trace():
+            sample_modify_globals_indirectly()
+
+        trace_data = tracer.trace_data
+        rows = trace_data[
+            (trace_data[Column.CATEGORY] == TraceDataCategory.GLOBAL_VARIABLE)
+            & (trace_data[Column.VARNAME] == "an_indirect_global_var")
+        ]
+        assert list(rows[Column.VARTYPE]) == [float.__name__]
+
+
+def test_tracer_only_compares_globals_after_lines_that_store_them():
+    from tracing.tracer import _get_global_store_lines
+
+    assert _get_global_store_lines(read_from_global.__code__) == frozenset()
+    assert _get_global_store_lines(create_and_set_global.__code__) == frozenset(
+        {create_and_set_global.__code__.co_firstlineno + 2}
+    )
+
+    module_code = compile("x = 1\ny = x\ndel x\n", "<module>", "exec")
+    assert _get_global_store_lines(module_code) == frozenset({1, 2, 3})
@@ -0,0 +1,140 @@
+import pathlib
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import compression, trace_data_encoding, trace_data_file
+from common.trace_store import TraceStore
+from constants import Column, Schema
+import tracing.writer
+from tracing.writer import BackgroundWriter
+
+
+def _trace_data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            column: ["x"] if isinstance(dtype, pd.StringDtype) else [1]
+            for column, dtype in Schema.TraceData.items()
+        }
+    ).astype(Schema.TraceData)
+
+
+@pytest.mark.parametrize("compress", [None, "gzip", "bz2", "xz"])
+def test_trace_data_is_written_with_compression(tmp_path: pathlib.Path, compress):
+    writer = BackgroundWriter()
+    path = tmp_path / "nested" / "trace.pytype"
+
+    writer.submit_trace_data(path, _trace_data(), "pickle", compress)
+    writer.drain()
+
+    assert compression.detect(path) == compress
+    pd.testing.assert_frame_equal(compression.read_pickle(path), _trace_data())
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_trace_data_is_written_columnar_by_default(tmp_path: pathlib.Path):
+    writer = BackgroundWriter()
+    path = tmp_path / "trace.pytype"
+
+    writer.submit_trace_data(path, _trace_data())
+    writer.drain()
+
+    assert trace_data_file.is_columnar(path)
+    pd.testing.assert_frame_equal(
+        trace_data_encoding.expand(trace_data_file.read(path)), _trace_data()
+    )
+
+
+def test_trace_data_is_inserted_into_store(tmp_path: pathlib.Path):
+    writer = BackgroundWriter()
+    path = tmp_path / "nested" / "traces.sqlite3"
+
+    writer.submit_to_store(path, _trace_data())
+    writer.submit_to_store(path, _trace_data().assign(**{Column.COUNT: 3}))
+    writer.drain()
+
+    with TraceStore(path) as store:
+        assert store.query()[Column.COUNT].tolist() == [1, 3]
+
+
+def test_queued_inserts_share_a_store_and_a_transaction(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+):
+    events: list[str] = list()
+
+    class RecordingStore(TraceStore):
+        def __init__(self, path: pathlib.Path):
+            events.append("open")
+            super().__init__(path)
+
+        def insert_all(self, batches):
+            events.append("insert")
+            super().insert_all(batches)
+
+        def close(self):
+            events.append("close")
+            super().close()
+
+    # Holds up the thread until all inserts have been queued
+    queued = threading.Event()
+    write_atomically = tracing.writer._write_atomically
+
+    def blocking_write(path: pathlib.Path, data: bytes) -> None:
+        queued.wait()
+        write_atomically(path, data)
+
+    monkeypatch.setattr(tracing.writer, "TraceStore", RecordingStore)
+    monkeypatch.setattr(tracing.writer, "_write_atomically", blocking_write)
+
+    writer = BackgroundWriter()
+    path = tmp_path / "traces.sqlite3"
+    writer.submit_json(tmp_path / "blocker.json", {})
+    for count in range(1, 4):
+        writer.submit_to_store(path, _trace_data().assign(**{Column.COUNT: count}))
+    queued.set()
+    writer.drain()
+    assert events == ["open", "insert", "close"]
+
+    # Stores are reopened by inserts after draining
+    writer.submit_to_store(path, _trace_data())
+    writer.drain()
+    assert events[3:] == ["open", "insert", "close"]
+
+    with TraceStore(path) as store:
+        assert store.query()[Column.COUNT].tolist() == [1, 2, 3, 1]
+
+
+def test_benchmarks_are_saved_like_numpy(tmp_path: pathlib.Path):
+    writer = BackgroundWriter()
+    benchmarks = np.arange(4, dtype=float)
+
+    writer.submit_benchmarks(tmp_path / "bench.npy_pytype", benchmarks)
+    writer.drain()
+
+    np.testing.assert_array_equal(np.load(tmp_path / "bench.npy_pytype.npy"), benchmarks)
+
+
+def test_writes_are_bounded_and_ordered(tmp_path: pathlib.Path):
+    writer = BackgroundWriter(max_pending=1)
+    path = tmp_path / "trace.pytype"
+
+    for rows in range(1, 6):
+        writer.submit_trace_data(path, pd.concat([_trace_data()] * rows))
+    writer.drain()
+
+    assert len(trace_data_file.load(path)) == 5
+
+
+def test_drain_raises_failed_writes(tmp_path: pathlib.Path):
+    writer = BackgroundWriter()
+    blocker = tmp_path / "file"
+    blocker.touch()
+
+    writer.submit_trace_data(blocker / "trace.pytype", _trace_data())
+    with pytest.raises(OSError):
+        writer.drain()
+
+    # The error is only raised once
+    writer.drain()
@@ -1,9 +1,14 @@
 import libcst as cst
 import pathlib
+from common import TraceDataCategory
+from common.trace_store import TraceStore
+from constants import Schema
+from typegen import DropDuplicatesFilter, TraceDataFilter, UnionFilter
 from typegen.strats.gen import TypeHintGenerator
 from typegen.strats.inline import InlineGenerator
 from tests.typegen.strats._sample_data import get_test_data
 import pandas as pd
+import pytest
 
 
 def load_cst_module(path: pathlib.Path) -> cst.Module:
@@ -42,3 +47,41 @@ def test_inline_generator_generates_expected_content(get_test_data):
             print("---")
             assert False
 
+
+def test_inline_generator_queries_and_filters_trace_store_per_file(tmp_path):
+    (tmp_path / "module.py").write_text("def add(x, y):\n    return x + y\n")
+    trace_data = pd.DataFrame(columns=Schema.TraceData.keys())
+    for var_name, line_no, category in [
+        ("x", 1, TraceDataCategory.FUNCTION_PARAMETER),
+        ("y", 1, TraceDataCategory.FUNCTION_PARAMETER),
+        ("add", 0, TraceDataCategory.FUNCTION_RETURN),
+    ]:
+        trace_data.loc[len(trace_data.index)] = [
+            "module.py", None, None, "add", line_no, category, var_name, None, "int"
+        ]
+    trace_data = trace_data.astype(Schema.TraceData)
+
+    with TraceStore(tmp_path / "traces.sqlite3") as store:
+        # Traced by two tests, so that the rows are only unique once the filter has been applied
+        store.insert(trace_data)
+        store.insert(trace_data)
+
+        gen = TypeHintGenerator(
+            ident=InlineGenerator.ident,
+            types=store,
+            trace_data_filter=TraceDataFilter(ident=DropDuplicatesFilter.ident),
+        )
+        gen.apply(tmp_path)
+
+    assert (tmp_path / "module.py").read_text() == (
+        "def add(x: int, y: int) -> int:\n    return x + y\n"
+    )
+
+
+def test_inline_generator_rejects_filters_that_compare_rows_of_different_files():
+    with pytest.raises(ValueError):
+        TypeHintGenerator(
+            ident=InlineGenerator.ident,
+            types=pd.DataFrame(),
+            trace_data_filter=TraceDataFilter(ident=UnionFilter.ident),
+        )
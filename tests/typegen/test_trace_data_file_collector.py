@@ -1,5 +1,7 @@
 import pathlib
 import pandas as pd
+import pytest
+import constants
 from constants import Column, Schema
 from typegen import TraceDataFileCollector
 
@@ -34,3 +36,78 @@ def test_if_test_object_collects_generated_trace_data_in_folder_it_returns_corre
 
     assert actual_trace_data.shape[0] == 14
     assert expected_trace_data.equals(actual_trace_data)
+
+
+from common import trace_data_file
+from common.trace_data_encoding import compact, is_compact
+from tests.typegen.unification.data import sample_trace_data
+
+
+@pytest.mark.parametrize("compact_collector", [False, True])
+def test_if_test_object_collects_trace_data_in_either_encoding_it_returns_it_in_its_own_encoding(
+    tmp_path, sample_trace_data, compact_collector
+):
+    first, second = sample_trace_data.iloc[:7], sample_trace_data.iloc[7:]
+    first.to_pickle(tmp_path / f"first{constants.TRACE_DATA_FILE_ENDING}")
+    compact(second).to_pickle(tmp_path / f"second{constants.TRACE_DATA_FILE_ENDING}")
+
+    test_object = TraceDataFileCollector(compact=compact_collector)
+    test_object.collect_data(tmp_path, False)
+    actual_trace_data = test_object.trace_data
+
+    assert is_compact(actual_trace_data) == compact_collector
+    assert actual_trace_data.astype(Schema.TraceData).equals(
+        sample_trace_data.astype(Schema.TraceData).reset_index(drop=True)
+    )
+
+
+def _write_files(path: pathlib.Path, trace_data: pd.DataFrame) -> None:
+    # Alternates between the formats and encodings the collector accepts
+    for index, start in enumerate(range(0, len(trace_data), 3)):
+        part = trace_data.iloc[start : start + 3]
+        file_path = path / f"{index:02}{constants.TRACE_DATA_FILE_ENDING}"
+        if index % 3 == 0:
+            file_path.write_bytes(trace_data_file.serialise(part.astype(Schema.TraceData)))
+        elif index % 3 == 1:
+            compact(part).to_pickle(file_path)
+        else:
+            part.to_pickle(file_path)
+
+
+@pytest.mark.parametrize("compact_collector", [False, True])
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_if_test_object_streams_batches_from_parallel_workers_it_keeps_the_order_of_the_files(
+    tmp_path, sample_trace_data, compact_collector, use_processes
+):
+    _write_files(tmp_path, sample_trace_data)
+    pd.DataFrame({"x": [1]}).to_pickle(tmp_path / f"other{constants.TRACE_DATA_FILE_ENDING}")
+
+    test_object = TraceDataFileCollector(
+        compact=compact_collector, workers=2, use_processes=use_processes, batch_size=4
+    )
+    batches = list(test_object.iter_batches(tmp_path, False))
+
+    assert [len(batch) for batch in batches[:-1]] == [4] * (len(batches) - 1)
+    assert all(is_compact(batch) == compact_collector for batch in batches)
+    assert (
+        pd.concat([batch.astype(Schema.TraceData) for batch in batches], ignore_index=True)
+        .equals(sample_trace_data.astype(Schema.TraceData).reset_index(drop=True))
+    )
+
+
+@pytest.mark.parametrize("compact_collector", [False, True])
+def test_if_test_object_concatenates_streamed_batches_it_returns_the_same_trace_data(
+    tmp_path, sample_trace_data, compact_collector
+):
+    _write_files(tmp_path, sample_trace_data)
+
+    streamed = TraceDataFileCollector(compact=compact_collector, streaming=True, batch_size=4)
+    streamed.collect_data(tmp_path, False)
+    collected = TraceDataFileCollector(compact=compact_collector)
+    collected.collect_data(tmp_path, False)
+
+    assert streamed.collected_data == []
+    assert is_compact(streamed.trace_data) == compact_collector
+    assert streamed.trace_data.astype(Schema.TraceData).equals(
+        collected.trace_data.astype(Schema.TraceData)
+    )
@@ -0,0 +1,69 @@
+import os
+import pathlib
+
+import pandas as pd
+import pytest
+
+from common.trace_data_encoding import InternTable, compact, expand, is_compact
+from typegen.unification.filter_base import TraceDataFilter
+from typegen.unification.drop_dupes import DropDuplicatesFilter
+from typegen.unification.drop_min_threshold import MinThresholdFilter
+from typegen.unification.drop_test_func import DropTestFunctionDataFilter
+from typegen.unification.drop_vars import DropVariablesOfMultipleTypesFilter
+from typegen.unification.keep_only_first import KeepOnlyFirstFilter
+from typegen.unification.subtyping import UnifySubTypesFilter
+from typegen.unification.union import UnionFilter
+
+from .data import sample_trace_data
+
+from constants import Column, Schema
+
+proj_path = pathlib.Path.cwd()
+venv_path = pathlib.Path(os.environ["VIRTUAL_ENV"])
+stdlib_path = pathlib.Path(pathlib.__file__).parent
+
+
+def test_compact_and_expand_roundtrip(sample_trace_data):
+    compacted = compact(sample_trace_data)
+
+    assert is_compact(compacted)
+    assert not is_compact(sample_trace_data)
+    assert expand(compacted).equals(sample_trace_data.astype(Schema.TraceData))
+
+
+def test_shared_intern_table_keeps_concatenation_compact(sample_trace_data):
+    table = InternTable()
+    first = compact(sample_trace_data.iloc[:5], table)
+    second = compact(sample_trace_data.iloc[5:], table)
+    first = compact(first, table)
+
+    concatenated = pd.concat([first, second], ignore_index=True)
+    assert is_compact(concatenated)
+    assert expand(concatenated).equals(sample_trace_data.astype(Schema.TraceData))
+
+
+@pytest.mark.parametrize(
+    "trace_data_filter",
+    [
+        TraceDataFilter(ident=DropDuplicatesFilter.ident),  # type: ignore
+        TraceDataFilter(ident=DropTestFunctionDataFilter.ident, test_name_pat="test_"),  # type: ignore
+        TraceDataFilter(ident=DropVariablesOfMultipleTypesFilter.ident),  # type: ignore
+        TraceDataFilter(ident=KeepOnlyFirstFilter.ident),  # type: ignore
+        TraceDataFilter(ident=MinThresholdFilter.ident, min_threshold=0.3),  # type: ignore
+        TraceDataFilter(ident=UnionFilter.ident),  # type: ignore
+        TraceDataFilter(  # type: ignore
+            ident=UnifySubTypesFilter.ident,
+            proj_path=proj_path,
+            venv_path=venv_path,
+            stdlib_path=stdlib_path,
+        ),
+    ],
+    ids=lambda trace_data_filter: trace_data_filter.ident,
+)
+def test_filters_preserve_compact_encoding(trace_data_filter, sample_trace_data):
+    expected = trace_data_filter.apply(sample_trace_data.copy())
+    actual = trace_data_filter.apply(compact(sample_trace_data))
+
+    assert is_compact(actual)
+    assert expand(actual).equals(expected)
+    assert actual[Column.CLASS].isna().sum() == expected[Column.CLASS].isna().sum()
@@ -22,3 +22,15 @@ def test_drop_duplicates_filter_processes_and_returns_correct_data_and_differenc
     actual_trace_data = dropdup.apply(trace_data)
 
     assert expected_trace_data.equals(actual_trace_data)
+
+
+def test_drop_duplicates_filter_sums_counts(sample_trace_data):
+    trace_data = sample_trace_data.assign(**{Column.COUNT: 2}).astype({Column.COUNT: "UInt64"})
+    actual_trace_data = dropdup.apply(trace_data)
+
+    expected_counts = 2 * sample_trace_data.groupby(
+        list(Schema.TraceData.keys()), dropna=False, sort=False
+    ).size()
+
+    assert not actual_trace_data[list(Schema.TraceData.keys())].duplicated().any()
+    assert actual_trace_data[Column.COUNT].tolist() == expected_counts.tolist()
@@ -3,6 +3,7 @@ from typegen.unification.filter_base import TraceDataFilter
 
 from .data import sample_trace_data
 
+from common.trace_data_encoding import deduplicate
 from constants import Schema, Column
 
 drop_min_threshold = TraceDataFilter(MinThresholdFilter.ident)  # type: ignore
@@ -23,3 +24,18 @@ def test_drop_duplicates_filter_processes_and_returns_correct_data_and_differenc
     actual_trace_data = drop_min_threshold.apply(trace_data)
 
     assert expected_trace_data.equals(actual_trace_data)
+
+
+def test_counts_weigh_like_duplicate_rows(sample_trace_data):
+    expected_trace_data = drop_min_threshold.apply(sample_trace_data.copy())
+    expected_trace_data = expected_trace_data.drop_duplicates(ignore_index=True)
+
+    # Each unique row once, with its amount of duplicates as its count
+    counted_trace_data = deduplicate(
+        sample_trace_data.assign(**{Column.COUNT: 1}).astype({Column.COUNT: "UInt64"})
+    )
+    actual_trace_data = drop_min_threshold.apply(counted_trace_data)
+
+    assert expected_trace_data.equals(
+        actual_trace_data[list(Schema.TraceData.keys())]
+    )
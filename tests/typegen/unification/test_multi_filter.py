@@ -56,3 +56,24 @@ def test_trace_data_filter_list_processes_and_returns_correct_data(sample_trace_
     actual_trace_data = multi_filter.apply(trace_data)
 
     assert expected_trace_data.equals(actual_trace_data)
+
+
+def test_trace_data_filter_list_applies_per_file_only_if_all_filters_do():
+    drop_duplicates_filter = TraceDataFilter(DropDuplicatesFilter.ident)
+    replace_subtypes_filter = TraceDataFilter(
+        UnifySubTypesFilter.ident,
+        proj_path=proj_path,
+        venv_path=venv_path,
+        stdlib_path=stdlib_path,
+    )
+
+    per_file = TraceDataFilter(
+        ident=TraceDataFilterList.ident, filters=[drop_duplicates_filter]
+    )
+    across_files = TraceDataFilter(
+        ident=TraceDataFilterList.ident,
+        filters=[drop_duplicates_filter, replace_subtypes_filter],
+    )
+
+    assert per_file.applies_per_file()
+    assert not across_files.applies_per_file()
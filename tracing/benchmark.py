@@ -0,0 +1,186 @@
+"""
+Measurement of the overhead of tracing a callable, compared across tracer variants.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import gc
+import logging
+import statistics
+import time
+import tracemalloc
+import typing
+
+from tracing.tracer import TracerBase
+
+logger = logging.getLogger(__name__)
+
+# Version of the records produced by `to_record`
+RECORD_VERSION = 1
+
+
+@dataclass
+class Variant:
+    """A way of executing the benchmarked callable, e.g. without tracing or under a specific tracer"""
+
+    name: str
+    call: typing.Callable[[], typing.Any]
+    """Executes the benchmarked callable once"""
+    tracer_factory: typing.Callable[[], TracerBase] | None = None
+    """Constructs the tracer of a single execution, whose events and rows are reported; None if the callable is not traced"""
+
+
+@dataclass
+class VariantBenchmark:
+    """Measurements of a single variant"""
+
+    name: str
+    samples: list[float] = field(default_factory=list)
+    """The wall time of each repetition, in seconds"""
+    events: int | None = None
+    """The amount of events per repetition, if traced"""
+    rows: int | None = None
+    """The amount of unique rows the tracer of the last repetition has emitted, if traced"""
+    peak_memory: int | None = None
+    """The peak of memory allocated during a single execution, in bytes"""
+    tracer: TracerBase | None = field(default=None, repr=False)
+    """The tracer of the last repetition, if traced"""
+
+    @property
+    def min(self) -> float:
+        return min(self.samples)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+
+    @property
+    def stddev(self) -> float:
+        return statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0
+
+    @property
+    def events_per_second(self) -> float | None:
+        if self.events is None or self.median == 0:
+            return None
+        return self.events / self.median
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        """:returns: The measurements and the statistics derived from them"""
+        return {
+            "samples": self.samples,
+            "min": self.min,
+            "median": self.median,
+            "stddev": self.stddev,
+            "events": self.events,
+            "events_per_second": self.events_per_second,
+            "rows": self.rows,
+            "peak_memory": self.peak_memory,
+        }
+
+
+def run(
+    variants: list[Variant],
+    warmup: int,
+    repetitions: int,
+    measure_memory: bool = True,
+) -> list[VariantBenchmark]:
+    """
+    Benchmark each variant in turn. Each one is first executed `warmup` times without being measured,
+    so that caches of the interpreter are filled, and then timed `repetitions` times
+    with garbage collection turned off, like `timeit` does.
+    Every execution is traced by a new tracer, which is constructed before the timer starts, so that no repetition
+    measures a tracer that has already seen the callable.
+    Peak memory is measured by an additional execution, as tracking allocations distorts the timings.
+
+    :param variants: The variants to benchmark
+    :param warmup: The amount of executions before measuring
+    :param repetitions: The amount of timed executions, at least one
+    :param measure_memory: When set to False, peak memory is not measured
+    :returns: The measurements of each variant, in the given order
+    """
+    if repetitions < 1:
+        raise ValueError(f"At least one repetition is required, got {repetitions}")
+
+    return [_run_variant(variant, warmup, repetitions, measure_memory) for variant in variants]
+
+
+def to_record(
+    benchmarks: list[VariantBenchmark],
+    warmup: int,
+    repetitions: int,
+    **metadata: typing.Any,
+) -> dict[str, typing.Any]:
+    """
+    Combine the measurements of all variants into a record that describes itself, e.g. to be stored as JSON.
+
+    :param benchmarks: The measurements, as returned by `run`
+    :param warmup: The amount of executions before measuring
+    :param repetitions: The amount of timed executions
+    :param metadata: Further entries of the record, e.g. the name of the benchmarked test
+    :returns: The record
+    """
+    return {
+        "version": RECORD_VERSION,
+        **metadata,
+        "warmup": warmup,
+        "repetitions": repetitions,
+        "unit": {"time": "s", "memory": "B"},
+        "variants": {benchmark.name: benchmark.to_dict() for benchmark in benchmarks},
+    }
+
+
+def _run_variant(
+    variant: Variant, warmup: int, repetitions: int, measure_memory: bool
+) -> VariantBenchmark:
+    for _ in range(warmup):
+        _execute(variant.call, _construct_tracer(variant))
+
+    benchmark = VariantBenchmark(variant.name)
+    events = 0
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repetitions):
+            tracer = _construct_tracer(variant)
+            start = time.perf_counter()
+            _execute(variant.call, tracer)
+            benchmark.samples.append(time.perf_counter() - start)
+
+            if tracer is not None:
+                events += tracer.event_count
+            benchmark.tracer = tracer
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if benchmark.tracer is not None:
+        benchmark.events = events // repetitions
+        benchmark.rows = benchmark.tracer.traced_rows
+
+    if measure_memory and not tracemalloc.is_tracing():
+        tracer = _construct_tracer(variant)
+        tracemalloc.start()
+        try:
+            _execute(variant.call, tracer)
+            _, benchmark.peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    logger.debug(
+        f"Benchmarked {variant.name}: median {benchmark.median:.6f}s, stddev {benchmark.stddev:.6f}s"
+    )
+    return benchmark
+
+
+def _construct_tracer(variant: Variant) -> TracerBase | None:
+    return variant.tracer_factory() if variant.tracer_factory is not None else None
+
+
+def _execute(call: typing.Callable[[], typing.Any], tracer: TracerBase | None) -> None:
+    if tracer is None:
+        call()
+        return
+
+    with tracer.active_trace():
+        call()
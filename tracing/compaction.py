@@ -0,0 +1,188 @@
+"""
+Compaction of the trace data files of a project into a single file of unique rows.
+
+Tracing leaves a file per traced test, whose rows are largely the same across tests. Compaction streams these shards,
+deduplicates their rows and records the multiplicities of each row, see `Schema.Multiplicities`,
+in `pytypes/{project}/compacted.pytype`. The shards are removed once compacted, and recorded in a manifest
+in the footer of the compacted file, so that later runs only compact the shards that have been written since
+and add them to the compacted file.
+"""
+import logging
+import os
+import pathlib
+import typing
+
+import click
+import pandas as pd
+
+import constants
+from common import InternTable, ptconfig, trace_data_encoding, trace_data_file
+from common.trace_data_encoding import STRING_COLUMNS
+from constants import Schema
+from tracing import shards
+
+logger = logging.getLogger(__name__)
+
+# Version of the manifests that `compact` stores in the metadata of the compacted file
+MANIFEST_VERSION = 1
+
+_MANIFEST_KEY = "compaction"
+
+
+def compact(
+    path: pathlib.Path, batch_size: int = constants.COLLECTION_BATCH_SIZE
+) -> pathlib.Path | None:
+    """
+    Compact the trace data files in the given folder and its subfolders into the compacted file of the folder,
+    which is created if it does not exist yet, and remove them. Error files are kept.
+    Memory is bounded by the unique rows and a batch of rows from the shards.
+
+    :param path: The folder the trace data of a project is written to
+    :param batch_size: The amount of rows from the shards after which they are deduplicated
+    with the rows compacted so far
+    :returns: The path of the compacted file, or None if there is neither trace data nor a compacted file
+    """
+    compacted_path = path / (
+        constants.COMPACTED_TRACE_DATA_FILE_NAME + constants.TRACE_DATA_FILE_ENDING
+    )
+    manifest = _read_manifest(compacted_path)
+
+    intern_table = InternTable()
+    counted = _Multiplicities(intern_table)
+    if compacted_path.is_file():
+        counted.add(trace_data_file.load(compacted_path))
+
+    compacted_shards: list[pathlib.Path] = list()
+    pending: list[pd.DataFrame] = list()
+    pending_rows = 0
+    for shard in shards.find_shards(path):
+        name = shard.relative_to(path).as_posix()
+        if manifest["shards"].get(name) == _fingerprint(shard):
+            # Compacted by an earlier run that did not get to remove it
+            logger.info(f"Removing {shard}, it has already been compacted")
+            shard.unlink()
+            continue
+
+        trace_data = trace_data_file.load(shard)
+        if not trace_data_encoding.has_trace_data_schema(trace_data):
+            logger.info(f"Not compacting {shard}, its columns do not match the trace data schema")
+            continue
+
+        manifest["shards"][name] = _fingerprint(shard)
+        compacted_shards.append(shard)
+        pending.append(trace_data_encoding.per_test(trace_data))
+        pending_rows += len(trace_data)
+        if pending_rows >= batch_size:
+            counted.add(pd.concat(pending, ignore_index=True))
+            pending.clear()
+            pending_rows = 0
+
+    if pending:
+        counted.add(pd.concat(pending, ignore_index=True))
+
+    if not compacted_shards:
+        return compacted_path if compacted_path.is_file() else None
+
+    compacted = counted.result()
+
+    # The compacted rows and the manifest that lists their shards are replaced by a single atomic write,
+    # so that an interrupted compaction neither loses nor counts any shard twice; the shards are only removed afterwards
+    _replace(
+        compacted_path, trace_data_file.serialise(compacted, metadata={_MANIFEST_KEY: manifest})
+    )
+    for shard in compacted_shards:
+        shard.unlink()
+
+    logger.info(
+        f"Compacted {len(compacted_shards)} files into {compacted_path} with {len(compacted)} rows"
+    )
+    return compacted_path
+
+
+class _Multiplicities:
+    # Sums the multiplicities of unique rows, whose string columns are kept as codes of the intern table
+
+    def __init__(self, intern_table: InternTable):
+        self._intern_table = intern_table
+        self._rows: pd.DataFrame | None = None
+
+    def add(self, trace_data: pd.DataFrame) -> None:
+        for column in STRING_COLUMNS:
+            self._intern_table.intern(trace_data[column].dropna().unique())
+        encoded = trace_data_encoding.compact(trace_data, self._intern_table)
+
+        # Codes are stable as the intern table only appends strings, and are grouped by
+        # without dropping missing values, which are -1
+        rows = pd.DataFrame(
+            {
+                column: encoded[column].cat.codes if column in STRING_COLUMNS else encoded[column]
+                for column in encoded.columns
+            }
+        )
+        if self._rows is not None:
+            rows = pd.concat([self._rows, rows], ignore_index=True)
+        self._rows = rows.groupby(
+            list(Schema.TraceData), dropna=False, sort=False, as_index=False
+        )[list(Schema.Multiplicities)].sum()
+
+    def result(self) -> pd.DataFrame:
+        assert self._rows is not None
+        categories = self._intern_table.dtype()
+        return pd.DataFrame(
+            {
+                column: pd.Categorical.from_codes(self._rows[column], dtype=categories)
+                if column in STRING_COLUMNS
+                else self._rows[column].astype(dtype)
+                for column, dtype in (Schema.TraceData | Schema.Multiplicities).items()
+            }
+        )
+
+
+def _fingerprint(shard: pathlib.Path) -> dict[str, int]:
+    stat = shard.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_manifest(compacted_path: pathlib.Path) -> dict[str, typing.Any]:
+    metadata = trace_data_file.read_metadata(compacted_path) if compacted_path.is_file() else None
+    if metadata is None or _MANIFEST_KEY not in metadata:
+        return {"version": MANIFEST_VERSION, "shards": dict()}
+
+    manifest = metadata[_MANIFEST_KEY]
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(
+            f"Cannot compact into {compacted_path} with manifest of version {manifest.get('version')}"
+        )
+    return manifest
+
+
+def _replace(path: pathlib.Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+@click.command(
+    name="compact",
+    help="Compact the trace data files of a project into a single file of unique rows",
+)
+@click.option(
+    "-p",
+    "--path",
+    type=click.Path(
+        exists=True,
+        dir_okay=True,
+        writable=False,
+        readable=True,
+        path_type=pathlib.Path,
+    ),
+    help="Path to project directory",
+    required=True,
+)
+def main(**params):
+    config = ptconfig.load_config(params["path"] / constants.CONFIG_FILE_NAME)
+    compacted_path = compact(shards.project_output_path(config))
+    if compacted_path is None:
+        print("No trace data to compact")
+    else:
+        print(f"Compacted trace data into {compacted_path}")
@@ -0,0 +1,158 @@
+"""
+Tracers and their output as given by the config of a project, shared by the `trace` decorator and the pytest plugin.
+"""
+from dataclasses import dataclass
+import pathlib
+
+import pandas as pd
+
+from common import ptconfig
+from tracing import shards, writer
+from tracing.optimisation import SaturationCache
+from tracing.scope import IgnoreRules
+from tracing.tracer import MonitoringTracer, Tracer
+
+# sys.monitoring only calls back into Python for the locations that are actually traced
+TRACER_TYPE: type[Tracer] = Tracer
+if MonitoringTracer.is_available():
+    TRACER_TYPE = MonitoringTracer
+
+
+@dataclass
+class TemplateSubstitutes:
+    """The values substituted into the output templates of the config"""
+
+    project: str
+    test_case: str
+    func_name: str
+
+
+def ignore_rules(config: ptconfig.TomlCfg) -> IgnoreRules:
+    """
+    :param config: The config of the traced project
+    :returns: The patterns of code that is excluded from tracing
+    """
+    return IgnoreRules(
+        modules=config.pytypes.ignore_modules,
+        functions=config.pytypes.ignore_functions,
+        decorators=config.pytypes.ignore_decorators,
+    )
+
+
+def construct_tracer(
+    config: ptconfig.TomlCfg,
+    rules: IgnoreRules,
+    apply_opts: bool,
+    saturation_cache: SaturationCache | None = None,
+) -> Tracer:
+    """
+    Construct a tracer of the type that is available in this interpreter, see `TRACER_TYPE`,
+    with the settings of the config.
+
+    :param config: The config of the traced project
+    :param rules: The patterns of code that is excluded from tracing, see `ignore_rules`
+    :param apply_opts: When set to True, the tracer applies optimisations
+    :param saturation_cache: Saturated code objects from previous runs, see `load_saturation_cache`
+    :returns: The tracer
+    """
+    return TRACER_TYPE(
+        proj_path=config.pytypes.proj_path,
+        stdlib_path=config.pytypes.stdlib_path,
+        venv_path=config.pytypes.venv_path,
+        apply_opts=apply_opts,
+        type_only_snapshots=config.pytypes.type_only_snapshots,
+        saturation_threshold=config.pytypes.saturation_threshold,
+        saturation_backoff=config.pytypes.saturation_backoff,
+        recursion_depth=config.pytypes.recursion_depth,
+        ignore_rules=rules,
+        saturation_cache=saturation_cache,
+    )
+
+
+def saturation_cache_path(config: ptconfig.TomlCfg, project: str) -> pathlib.Path:
+    """
+    :param config: The config of the traced project
+    :param project: The name of the project
+    :returns: The path the project's saturation cache is stored at
+    """
+    return config.pytypes.proj_path / config.pytypes.saturation_cache_template.format_map(
+        {"project": project}
+    )
+
+
+def load_saturation_cache(
+    config: ptconfig.TomlCfg, project: str
+) -> tuple[pathlib.Path | None, SaturationCache | None]:
+    """
+    :param config: The config of the traced project
+    :param project: The name of the project
+    :returns: The path and the loaded saturation cache, or None for both if saturation is not persisted
+    """
+    if not config.pytypes.persist_saturation:
+        return None, None
+
+    path = saturation_cache_path(config, project)
+    return path, SaturationCache.load(path, config.pytypes.proj_path)
+
+
+def trace_data_path(config: ptconfig.TomlCfg, subst: TemplateSubstitutes) -> pathlib.Path:
+    """
+    Generate the path of a new trace data file, which ends with the shard's suffix, see `shards.shard_suffix`,
+    so that it does not overwrite other files, including those of other workers.
+
+    :param config: The config of the traced project
+    :param subst: The values of the output template
+    :returns: The path
+    """
+    trace_subst = config.pytypes.output_template.format_map(
+        {
+            "project": subst.project,
+            "test_case": subst.test_case,
+            "func_name": f"{subst.func_name}{shards.shard_suffix()}",
+        }
+    )
+    return config.pytypes.proj_path / trace_subst
+
+
+def store_trace_data(
+    config: ptconfig.TomlCfg,
+    subst: TemplateSubstitutes,
+    traced: pd.DataFrame,
+    err: str | None,
+) -> None:
+    """
+    Store trace data in a new trace data file, or the trace store if the config enables it,
+    and the error that ended the traced callable next to where the trace data file would have been.
+
+    :param config: The config of the traced project
+    :param subst: The values of the output template
+    :param traced: The trace data
+    :param err: The formatted error, if any
+    """
+    trace_output_path = trace_data_path(config, subst)
+    if config.pytypes.trace_store:
+        store_path = config.pytypes.proj_path / config.pytypes.trace_store_template.format_map(
+            {"project": subst.project}
+        )
+        writer.shared_writer().submit_to_store(store_path, traced)
+    else:
+        writer.shared_writer().submit_trace_data(
+            trace_output_path,
+            traced,
+            config.pytypes.output_format,
+            config.pytypes.output_compression,
+        )
+
+    if err is not None:
+        store_error(trace_output_path, err)
+
+
+def store_error(trace_output_path: pathlib.Path, err: str) -> None:
+    """
+    :param trace_output_path: The path of the trace data file the error belongs to
+    :param err: The formatted error
+    """
+    err_output_path = trace_output_path.with_suffix(".err")
+    err_output_path.parent.mkdir(parents=True, exist_ok=True)
+    with err_output_path.open("w") as f:
+        f.write(err)
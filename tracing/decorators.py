@@ -1,28 +1,24 @@
-from dataclasses import dataclass
+import atexit
 import functools
 import os
 import pathlib
 import inspect
 import traceback
 from typing import Any, Callable, Protocol, TypeVar
-import timeit
 
 import pandas as pd
-from pandas.util import hash_pandas_object
 import numpy as np
 
 import constants
 from common import ptconfig
+from tracing import benchmark, configured, shards, writer
+from tracing.optimisation import SaturationCache
 from tracing.tracer import NoOperationTracer, Tracer, TracerBase
 
 RetType = TypeVar("RetType")
 
-
-@dataclass
-class _TemplateSubstitutes:
-    project: str
-    test_case: str
-    func_name: str
+# Saturation caches shared by all traced callables of this process, which are saved at interpreter exit
+_SATURATION_CACHES: dict[pathlib.Path, SaturationCache] = dict()
 
 
 def _trace_callable(tracer: TracerBase, call: Callable[[], RetType]) -> str | None:
@@ -35,102 +31,132 @@ def _trace_callable(tracer: TracerBase, call: Callable[[], RetType]) -> str | No
         return traceback.format_exc()
 
 
+def _shared_saturation_cache(
+    config: ptconfig.TomlCfg, project: str
+) -> tuple[pathlib.Path | None, SaturationCache | None]:
+    # Loaded once per process instead of once per traced callable, and saved once when the process exits
+    if not config.pytypes.persist_saturation:
+        return None, None
+
+    path = configured.saturation_cache_path(config, project)
+    if path not in _SATURATION_CACHES:
+        if not _SATURATION_CACHES:
+            atexit.register(_save_saturation_caches)
+        _SATURATION_CACHES[path] = SaturationCache.load(path, config.pytypes.proj_path)
+    return path, _SATURATION_CACHES[path]
+
+
+def _save_saturation_caches() -> None:
+    for path, cache in _SATURATION_CACHES.items():
+        cache.save(path)
+
+
 def _execute_tracing(
     c: Callable[..., RetType],
     config: ptconfig.TomlCfg,
-    subst: _TemplateSubstitutes,
+    subst: configured.TemplateSubstitutes,
     *args,
     **kwargs,
 ) -> tuple[pd.DataFrame, np.ndarray | None]:
+    ignore_rules = configured.ignore_rules(config)
+    saturation_cache_path, saturation_cache = _shared_saturation_cache(config, subst.project)
+
     if config.pytypes.benchmark_performance:
-        no_operation_tracer = NoOperationTracer(
-            proj_path=config.pytypes.proj_path,
-            stdlib_path=config.pytypes.stdlib_path,
-            venv_path=config.pytypes.venv_path,
-        )
-        standard_tracer = Tracer(
-            proj_path=config.pytypes.proj_path,
-            stdlib_path=config.pytypes.stdlib_path,
-            venv_path=config.pytypes.venv_path,
-            apply_opts=False,
-        )
-        optimized_tracer = Tracer(
-            proj_path=config.pytypes.proj_path,
-            stdlib_path=config.pytypes.stdlib_path,
-            venv_path=config.pytypes.venv_path,
-            apply_opts=True,
-        )
 
-        tracers: list[TracerBase] = [
-            no_operation_tracer,
-            standard_tracer,
-            optimized_tracer,
-        ]
-        benchmarks = np.zeros((1 + len(tracers)))
+        def no_operation_tracer() -> TracerBase:
+            return NoOperationTracer(
+                proj_path=config.pytypes.proj_path,
+                stdlib_path=config.pytypes.stdlib_path,
+                venv_path=config.pytypes.venv_path,
+            )
 
-        # bare bones benchmark execution
-        benchmarks[0] = timeit.timeit(
-            lambda: c(*args, **kwargs),
-            number=constants.AMOUNT_EXECUTIONS_TESTING_PERFORMANCE,
-        )
+        def standard_tracer() -> TracerBase:
+            return configured.construct_tracer(config, ignore_rules, apply_opts=False)
 
-        for i, tracer in enumerate(tracers):
-            benchmarks[i + 1] = timeit.timeit(
-                lambda: _trace_callable(tracer, lambda: c(*args, **kwargs)),
-                number=constants.AMOUNT_EXECUTIONS_TESTING_PERFORMANCE,
+        def optimised_tracer() -> TracerBase:
+            # Every execution starts out with the process's saturation cache as it was before benchmarking
+            return configured.construct_tracer(
+                config,
+                ignore_rules,
+                apply_opts=True,
+                saturation_cache=saturation_cache.copy() if saturation_cache is not None else None,
             )
 
-        traced = tracers[-1].trace_data
+        def call() -> None:
+            c(*args, **kwargs)
 
-        # Unable to catch error in benchmarking mode due to timeit usage
+        variants = [
+            benchmark.Variant("bare", call),
+            benchmark.Variant("no_operation", call, no_operation_tracer),
+            benchmark.Variant("standard", call, standard_tracer),
+            benchmark.Variant("optimised", call, optimised_tracer),
+        ]
+        variant_benchmarks = benchmark.run(
+            variants,
+            warmup=config.pytypes.benchmark_warmup,
+            repetitions=config.pytypes.benchmark_repetitions,
+        )
+
+        # Median wall time of each variant, in the order expected by the evaluation
+        benchmarks = np.array([vb.median for vb in variant_benchmarks])
+
+        # Only the trace data and saturation of the last timed execution are kept
+        optimised = variant_benchmarks[-1].tracer
+        assert isinstance(optimised, Tracer)
+        traced = optimised.trace_data
+        counted = optimised.trace_data_since(0, counted=True)
+        if saturation_cache_path is not None and optimised.saturation.cache is not None:
+            _SATURATION_CACHES[saturation_cache_path] = optimised.saturation.cache
+
+        # Unable to catch error in benchmarking mode, as the callable is also executed without a tracer
         err = None
 
     else:
         benchmarks = None
+        variant_benchmarks = None
 
-        tracer = Tracer(
-            proj_path=config.pytypes.proj_path,
-            stdlib_path=config.pytypes.stdlib_path,
-            venv_path=config.pytypes.venv_path,
-            apply_opts=False,
+        tracer = configured.construct_tracer(
+            config,
+            ignore_rules,
+            apply_opts=config.pytypes.apply_optimisations,
+            saturation_cache=saturation_cache,
         )
 
         err = _trace_callable(tracer, lambda: c(*args, **kwargs))
 
         traced = tracer.trace_data
+        counted = tracer.trace_data_since(0, counted=True)
 
-    if benchmarks is not None:
-        # Append hash to avoid overwriting other benchmarks
-        benchmark_subst = config.pytypes.output_npy_template.format_map(
-            {
-                "project": subst.project,
-                "test_case": subst.test_case,
-                "func_name": f"{subst.func_name}-{hash(str(benchmarks))}",
-            }
-        )
-        benchmark_output_path = (
-            config.pytypes.proj_path / benchmark_subst
-        )
-        benchmark_output_path.parent.mkdir(parents=True, exist_ok=True)
-        np.save(benchmark_output_path, benchmarks)
-
-    # Append hash to avoid overwriting other pickled DataFrames
-    trace_subst = config.pytypes.output_template.format_map(
-        {
+    if benchmarks is not None and variant_benchmarks is not None:
+        # Append the shard's suffix to avoid overwriting other benchmarks
+        func_name = f"{subst.func_name}{shards.shard_suffix()}"
+        substitutes = {
             "project": subst.project,
             "test_case": subst.test_case,
-            "func_name": f"{subst.func_name}-{hash_pandas_object(traced).sum()}",
+            "func_name": func_name,
         }
-    )
+        benchmark_output_path = (
+            config.pytypes.proj_path
+            / config.pytypes.output_npy_template.format_map(substitutes)
+        )
+        writer.shared_writer().submit_benchmarks(benchmark_output_path, benchmarks)
 
-    trace_output_path = config.pytypes.proj_path / trace_subst
-    trace_output_path.parent.mkdir(parents=True, exist_ok=True)
-    traced.to_pickle(str(trace_output_path))
+        record_output_path = (
+            config.pytypes.proj_path
+            / config.pytypes.output_benchmark_template.format_map(substitutes)
+        )
+        record = benchmark.to_record(
+            variant_benchmarks,
+            warmup=config.pytypes.benchmark_warmup,
+            repetitions=config.pytypes.benchmark_repetitions,
+            project=subst.project,
+            test_case=subst.test_case,
+            func_name=subst.func_name,
+            tracer=configured.TRACER_TYPE.__name__,
+        )
+        writer.shared_writer().submit_json(record_output_path, record)
 
-    if err is not None:
-        err_output_path = trace_output_path.with_suffix(".err")
-        with err_output_path.open("w") as f:
-            f.write(err)
+    configured.store_trace_data(config, subst, counted, err)
 
     return traced, benchmarks
 
@@ -175,7 +201,7 @@ def trace(c: Callable[..., RetType]) -> _Traceable:
 
     @functools.wraps(c)
     def wrapper(*args, **kwargs) -> tuple[pd.DataFrame, np.ndarray | None]:
-        subst = _TemplateSubstitutes(
+        subst = configured.TemplateSubstitutes(
             project=cfg.pytypes.project,
             test_case=module_name,
             func_name=c.__name__,
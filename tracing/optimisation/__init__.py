@@ -2,6 +2,8 @@ from .enums import TriggerStatus
 from .base import Optimisation
 from .ignore import Ignore
 from .looping import TypeStableLoop
+from .recursion import TypeStableRecursion
+from .saturation import SaturationCache, TypeSaturation
 from .utils import FrameWithMetadata
 
 
@@ -10,5 +12,8 @@ __all__ = [
     Optimisation.__name__,
     Ignore.__name__,
     TypeStableLoop.__name__,
+    TypeStableRecursion.__name__,
+    TypeSaturation.__name__,
+    SaturationCache.__name__,
     FrameWithMetadata.__name__,
 ]
@@ -3,8 +3,6 @@ from abc import ABC, abstractmethod
 from .enums import TriggerStatus
 from .utils import FrameWithMetadata
 
-import pandas as pd
-
 
 class Optimisation(ABC):
     """Base class for tracing-related optimisations. 
@@ -14,6 +12,10 @@ class Optimisation(ABC):
     OPTIMIZING_STATES = (TriggerStatus.ENTRY, TriggerStatus.ONGOING)
     PESSIMIZING_STATES = (TriggerStatus.INACTIVE, TriggerStatus.EXITED)
 
+    # Whether code locations that are skipped while optimising may stop emitting events until the optimisation is over.
+    # Optimisations that need to observe skipped events to notice their end must set this to False
+    DISABLES_LOCATIONS = True
+
     def __init__(self, fwm: FrameWithMetadata):
         """
         Construct an Optimisation for a stack frame
@@ -34,13 +36,24 @@ class Optimisation(ABC):
         pass
 
     @abstractmethod
-    def advance(self, current_frame: FrameWithMetadata, traced: pd.DataFrame) -> None:
+    def advance(self, current_frame: FrameWithMetadata) -> None:
         """
         Modify the optimization's internal state based on given frame.
-        The traced DataFrame should be treated as read-only
 
         :param current_frame: The current stack frame
-        :param traced: The current trace data from the Tracer
+        """
+        pass
+
+    def on_new_rows(
+        self, current_frame: FrameWithMetadata, line_numbers: list[int]
+    ) -> None:
+        """
+        Called by the Tracer after an event has produced rows that had not been traced before.
+        Optimisations that depend on changes to the trace data should track them here,
+        instead of inspecting the whole trace data.
+
+        :param current_frame: The stack frame the rows were traced in
+        :param line_numbers: The line number of each new row
         """
         pass
 
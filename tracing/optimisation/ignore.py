@@ -1,28 +1,36 @@
 import logging
 import inspect
 
-import pandas as pd
-
 from . import Optimisation, TriggerStatus, utils
 
 
 class Ignore(Optimisation):
     """
     Dumb optimisation that is always ONGOING, in order to unconditionally
-    disable tracing for the relevant scope.
+    disable tracing for the relevant scope, i.e. the frame it has been created for
+    and every call made by it, until the frame returns.
     """
 
+    # The return of the frame must still be observed
+    DISABLES_LOCATIONS = False
+
     def __init__(self, frame: utils.FrameWithMetadata):
         super().__init__(frame)
         # By default, this optimisation is constantly active, as long as the current scope is active
         self._status = TriggerStatus.ONGOING
-
-    def advance(self, current_frame: utils.FrameWithMetadata, _: pd.DataFrame) -> None:
-        # If we reach a stack frame that is under the earliest stack frame we want to ignore
-        if self.fwm._frame.f_back and self.fwm._frame.f_back == current_frame._frame:
-            logging.debug(
-                f"Switched Ignore to EXITED with {inspect.getframeinfo(current_frame._frame)}"
-            )
+        self._caller = self.fwm._frame.f_back
+
+    def advance(self, current_frame: utils.FrameWithMetadata) -> None:
+        # If the frame returns, or we reach a stack frame that is under the earliest stack frame we want to ignore
+        returns = (
+            current_frame._frame is self.fwm._frame and current_frame.event == "return"
+        )
+        if returns or (self._caller is not None and current_frame._frame is self._caller):
+            # Looking up the frame's source is expensive, and only done for logging
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(
+                    f"Switched Ignore to EXITED with {inspect.getframeinfo(current_frame._frame)}"
+                )
             self._status = TriggerStatus.EXITED
 
     def status(self) -> TriggerStatus:
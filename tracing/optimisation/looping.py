@@ -1,10 +1,7 @@
 import logging
 
 from . import Optimisation, TriggerStatus, utils
-from .utils import FrameWithMetadata
-
-import pandas as pd
-from constants import Column
+from .utils import FrameWithMetadata, StatementKind
 
 logger = logging.getLogger(__name__)
 
@@ -13,11 +10,14 @@ class TypeStableLoop(Optimisation):
     """
     Triggers when the types of instances within loop bodies are stable for
     the given amount of iterations.
+
+    Handles for and while loops, comprehensions and generator expressions. Each loop is bound to the frame
+    it runs in, so that nested loops, and loops in recursive calls, are each tracked by an instance of their own.
     """
 
     def __init__(self, frame: FrameWithMetadata, iterations_until_entry: int = 5):
         """
-        :param frame: Representation of stack frame that points to head of for loop
+        :param frame: Representation of stack frame that starts an iteration of the loop, see `FrameWithMetadata.started_loop`
         :param iterations_until_entry: The amount of iterations that shall pass until the optimisation starts firing
         """
         super().__init__(frame)
@@ -27,17 +27,33 @@ class TypeStableLoop(Optimisation):
         self._iterations_since_type_changes = 0
         self._status = TriggerStatus.INACTIVE
 
-        self._relevant_lines: tuple[int, int] = (self.fwm.f_lineno, self.fwm.f_lineno)
+        # The lines of the loop's body are known from the source, unless it cannot be parsed,
+        # in which case they are gathered during the first iteration
+        self._loop = self.fwm.started_loop()
+        self._relevant_lines: tuple[int, int] = (
+            (self._loop.start, self._loop.end)
+            if self._loop is not None
+            else (self.fwm.f_lineno, self.fwm.f_lineno)
+        )
+        self._head = self._loop.head if self._loop is not None else self.fwm.f_lineno
+
+        # Generator expressions return to their caller after every element, and start the next iteration when resumed
+        self._resumes = self.fwm.is_generator_expression()
+
+        # Any event in the calling frame means that the loop's frame is no longer executing
+        self._caller = self.fwm._frame.f_back
+
+        # Amount of new rows traced within the loop's lines, and its value at the last loop head
         self._loop_traced_count = 0
+        self._loop_traced_count_at_head = 0
 
     def status(self) -> TriggerStatus:
         return self._status
 
-    def advance(self, current_frame: utils.FrameWithMetadata, traced: pd.DataFrame):
-        # Early exit conditions: Encountering break or return
-        if current_frame.is_break() or current_frame.is_return():
+    def advance(self, current_frame: utils.FrameWithMetadata) -> None:
+        if self._has_exited(current_frame):
             logger.debug(
-                f"{TypeStableLoop.__name__}: {self._status} -> EXITED: break or return"
+                f"{TypeStableLoop.__name__}: {self._status} -> EXITED: break, return or left frame"
             )
             self._status = TriggerStatus.EXITED
             return
@@ -50,7 +66,7 @@ class TypeStableLoop(Optimisation):
             )
 
         if self._iterations_since_type_changes < self.until_entry:
-            self._when_inactive(current_frame, traced)
+            self._when_inactive(current_frame)
             logger.debug(
                 f"{TypeStableLoop.__name__}: {self._status} -> INACTIVE due to being under entry count"
             )
@@ -60,17 +76,19 @@ class TypeStableLoop(Optimisation):
             logger.debug(
                 f"{TypeStableLoop.__name__}: {self._status} -> ENTRY due to meeting entry count"
             )
-            self._when_entry(current_frame, traced)
+            self._when_entry(current_frame)
             self._status = TriggerStatus.ENTRY
 
         elif self._iterations_since_type_changes > self.until_entry:
             logger.debug(
                 f"{TypeStableLoop.__name__}: {self._status} -> ONGOING due to being above entry count"
             )
-            self._when_ongoing(current_frame, traced)
+            self._when_ongoing(current_frame)
             self._status = TriggerStatus.ONGOING
 
-        if current_frame.f_lineno > self._relevant_lines[1]:
+        if self._is_own_frame(current_frame) and not (
+            self._relevant_lines[0] <= current_frame.f_lineno <= self._relevant_lines[1]
+        ):
             logger.debug(
                 f"{TypeStableLoop.__name__}: {self._status} -> EXITED due to leaving loop"
             )
@@ -82,51 +100,88 @@ class TypeStableLoop(Optimisation):
         logger.debug(f"Total iterations is now {self._total_iterations}")
 
     def _when_inactive(
-        self, current_frame: utils.FrameWithMetadata, traced: pd.DataFrame
+        self, current_frame: utils.FrameWithMetadata
     ) -> None:
         # In the first iteration, update line range information
         if self._total_iterations == 0:
+            if not self._is_own_frame(current_frame):
+                return
             begin, end = self._relevant_lines
             self._relevant_lines = begin, max(end or 0, current_frame.f_lineno)
             logger.debug(f"Updating from ({begin}, {end}) to {self._relevant_lines=}")
 
         # In later iterations, at the start of each iteration,
-        # compare against known type information
-        # and see if anything has changed by checking no more lines have been added
-
-        # NOTE: this assumes that traced only contains unique information
-        # TODO: filter by file!
+        # see if anything has changed by checking whether new rows have been traced within the loop
         else:
             if self._is_loop_head(current_frame):
-                new_loop_traced_count = (
-                    traced[Column.LINENO]
-                    .between(*self._relevant_lines, inclusive="both")  # type: ignore
-                    .shape[0]
+                logger.debug(
+                    f"{self._loop_traced_count=} vs {self._loop_traced_count_at_head=}"
                 )
-                logger.debug(f"{new_loop_traced_count=} vs {self._loop_traced_count=}")
-                if new_loop_traced_count != self._loop_traced_count:
+                if self._loop_traced_count != self._loop_traced_count_at_head:
                     # Update count since type changes
                     self._iterations_since_type_changes = 0
-                    self._loop_traced_count = new_loop_traced_count
+                    self._loop_traced_count_at_head = self._loop_traced_count
 
                 # No types have changed, update counter
                 else:
                     self._iterations_since_type_changes += 1
 
+    def on_new_rows(
+        self, current_frame: utils.FrameWithMetadata, line_numbers: list[int]
+    ) -> None:
+        if current_frame.co_filename != self.fwm.co_filename:
+            return
+
+        begin, end = self._relevant_lines
+        self._loop_traced_count += sum(
+            begin <= line_number <= end for line_number in line_numbers
+        )
+
     def _when_entry(
-        self, current_frame: utils.FrameWithMetadata, traced: pd.DataFrame
+        self, current_frame: utils.FrameWithMetadata
     ) -> None:
         if self._is_loop_head(current_frame):
             self._iterations_since_type_changes += 1
 
     def _when_ongoing(
-        self, current_frame: utils.FrameWithMetadata, traced: pd.DataFrame
+        self, current_frame: utils.FrameWithMetadata
     ) -> None:
         if self._is_loop_head(current_frame):
             self._iterations_since_type_changes += 1
 
+    def _has_exited(self, current_frame: utils.FrameWithMetadata) -> bool:
+        if current_frame._frame is self._caller:
+            return True
+
+        # Generator expressions are left and resumed for every element
+        if not self._is_own_frame(current_frame) or self._resumes:
+            return False
+
+        if current_frame.event == "return":
+            return True
+
+        # Comprehensions are part of statements, whose kind does not affect them
+        if self._loop is not None and self._loop.kind == StatementKind.COMPREHENSION:
+            return False
+
+        # Breaking out of a nested loop does not leave this one
+        return current_frame.is_return() or (
+            current_frame.is_break() and current_frame.loop() == self._loop
+        )
+
     def _is_loop_head(self, current_frame: utils.FrameWithMetadata) -> bool:
-        return self.fwm.f_lineno == current_frame.f_lineno
+        if not self._is_own_frame(current_frame):
+            return False
+        if self._resumes:
+            return current_frame.event == "call"
+        return current_frame.event != "return" and current_frame.f_lineno == self._head
+
+    def _is_own_frame(self, current_frame: utils.FrameWithMetadata) -> bool:
+        return current_frame._frame is self.fwm._frame
 
     def __eq__(self, o: object) -> bool:
-        return isinstance(o, TypeStableLoop) and self.fwm.f_lineno == o.fwm.f_lineno
+        return (
+            isinstance(o, TypeStableLoop)
+            and self.fwm._frame is o.fwm._frame
+            and self._head == o._head
+        )
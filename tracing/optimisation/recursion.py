@@ -0,0 +1,123 @@
+import logging
+
+from . import Optimisation, TriggerStatus, utils
+from .utils import FrameWithMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class TypeStableRecursion(Optimisation):
+    """
+    Triggers when a function keeps calling itself with argument types that it has already been called with.
+
+    Bound to the first recursive call of a function. Deeper recursive calls are traced as long as their depth
+    does not exceed the given threshold, or their argument types have not been seen before. Otherwise, the call
+    and every call made by it are not traced, until it returns. The optimisation is exited once the
+    recursive call it is bound to returns.
+    """
+
+    # Events of skipped calls are still needed to notice their return
+    DISABLES_LOCATIONS = False
+
+    def __init__(self, frame: FrameWithMetadata, depth: int, max_depth: int = 10):
+        """
+        :param frame: Representation of the stack frame of the first recursive call, passed on its call event
+        :param depth: The amount of calls to the frame's code that are active, including the frame's own
+        :param max_depth: Recursive calls up to this depth are always traced
+        """
+        super().__init__(frame)
+        self.max_depth = max_depth
+
+        self._code = self.fwm._frame.f_code
+        self._status = TriggerStatus.INACTIVE
+
+        # Frames of the traced recursive calls that have not returned yet, and the depth of the calls below them
+        self._frames: list = [self.fwm._frame]
+        self._outer_depth = depth - 1
+        self._caller = self.fwm._frame.f_back
+
+        # The argument types the traced recursive calls have been made with
+        self._signatures: set[tuple[type, ...]] = {_signature(self.fwm)}
+
+        # The call whose subtree is not traced, and whether tracing resumes with the next event
+        self._skipped: object | None = None
+        self._resumes = False
+
+    def status(self) -> TriggerStatus:
+        return self._status
+
+    def advance(self, current_frame: utils.FrameWithMetadata) -> None:
+        if self._resumes:
+            logger.debug(
+                f"{TypeStableRecursion.__name__}: {self._status} -> INACTIVE: skipped call returned"
+            )
+            self._status = TriggerStatus.INACTIVE
+            self._skipped = None
+            self._resumes = False
+
+        if self._skipped is not None:
+            self._advance_skipped(current_frame)
+        else:
+            self._advance_traced(current_frame)
+
+    def _advance_skipped(self, current_frame: utils.FrameWithMetadata) -> None:
+        frame = current_frame._frame
+
+        # The return of the skipped call is skipped as well
+        if frame is self._skipped and current_frame.event == "return":
+            self._resumes = True
+
+        # If the return has not been noticed, e.g. because of an exception, the caller of the skipped call continues
+        elif frame is getattr(self._skipped, "f_back", None):
+            logger.debug(
+                f"{TypeStableRecursion.__name__}: {self._status} -> INACTIVE: left skipped call"
+            )
+            self._status = TriggerStatus.INACTIVE
+            self._skipped = None
+            self._advance_traced(current_frame)
+            return
+
+        if self._status == TriggerStatus.ENTRY:
+            self._status = TriggerStatus.ONGOING
+
+    def _advance_traced(self, current_frame: utils.FrameWithMetadata) -> None:
+        frame = current_frame._frame
+
+        if frame is self._caller:
+            logger.debug(
+                f"{TypeStableRecursion.__name__}: {self._status} -> EXITED: left recursion"
+            )
+            self._status = TriggerStatus.EXITED
+            return
+
+        if current_frame.event == "return" and frame is self._frames[-1]:
+            self._frames.pop()
+            if not self._frames:
+                logger.debug(
+                    f"{TypeStableRecursion.__name__}: {self._status} -> EXITED: recursion returned"
+                )
+                self._status = TriggerStatus.EXITED
+            return
+
+        if current_frame.event != "call" or frame.f_code is not self._code:
+            return
+
+        signature = _signature(current_frame)
+        depth = self._outer_depth + len(self._frames) + 1
+        if depth > self.max_depth and signature in self._signatures:
+            logger.debug(
+                f"{TypeStableRecursion.__name__}: {self._status} -> ENTRY: {self._code.co_name} at depth {depth}"
+            )
+            self._status = TriggerStatus.ENTRY
+            self._skipped = frame
+        else:
+            self._signatures.add(signature)
+            self._frames.append(frame)
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, TypeStableRecursion) and self._code is o._code
+
+
+def _signature(fwm: FrameWithMetadata) -> tuple[type, ...]:
+    # On the call event, the locals only hold the arguments
+    return tuple(type(value) for value in fwm._frame.f_locals.values())
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import contextlib
+from dataclasses import dataclass, field
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import types
+import typing
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where concurrent saves are merged without a lock
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CodeSaturation:
+    # Consecutive calls that did not produce any new trace data
+    stable_calls: int = 0
+    saturated: bool = False
+    # Saturated calls since the last fully traced call
+    calls_since_sample: int = 0
+
+
+@dataclass
+class _ActiveCall:
+    frame: typing.Any
+    traces_lines: bool
+    new_rows: int = 0
+
+
+class TypeSaturation:
+    """
+    Tracks, per code object, whether calls to it still produce new trace data.
+
+    Unlike the optimisations on the tracer's stack, which live as long as the frame that triggered them,
+    this state is kept across all calls. Once a code object has been called the given amount of times in a row
+    without any new trace data, it is saturated; line events are turned off for further calls, whose parameters
+    and return values are still traced. Every so often, a saturated call is sampled and traced fully.
+    If any call, sampled or not, produces new trace data, the code object is traced fully again.
+    """
+
+    def __init__(
+        self,
+        calls_until_saturation: int = 10,
+        backoff: int = 50,
+        cache: SaturationCache | None = None,
+    ):
+        """
+        :param calls_until_saturation: The amount of consecutive calls without new trace data until line events are turned off
+        :param backoff: Every `backoff`-th call to a saturated code object is traced fully
+        :param cache: Saturated code objects from previous runs, which start out saturated, and is kept up to date
+        """
+        self.calls_until_saturation = calls_until_saturation
+        self.backoff = backoff
+        self.cache = cache
+
+        self._codes: dict[types.CodeType, _CodeSaturation] = dict()
+        self._calls: list[_ActiveCall] = list()
+
+    def enter(self, frame) -> bool:
+        """
+        Register a call to a traced code object.
+
+        :param frame: The frame of the call
+        :returns: True if line events shall be traced for this call
+        """
+        saturation = self._codes.get(frame.f_code)
+        if saturation is None:
+            saturated = self.cache is not None and self.cache.is_saturated(frame.f_code)
+            saturation = self._codes[frame.f_code] = _CodeSaturation(saturated=saturated)
+
+        traces_lines = True
+        if saturation.saturated:
+            saturation.calls_since_sample += 1
+            if saturation.calls_since_sample >= self.backoff:
+                saturation.calls_since_sample = 0
+            else:
+                traces_lines = False
+
+        self._calls.append(_ActiveCall(frame, traces_lines))
+        return traces_lines
+
+    def traces_lines(self, frame) -> bool:
+        """
+        Check whether line events are traced for the given frame.
+
+        :param frame: A frame that has been passed to `enter`
+        :returns: False if the frame belongs to a saturated call that is not sampled
+        """
+        if not self._calls or self._calls[-1].frame is not frame:
+            return True
+        return self._calls[-1].traces_lines
+
+    def record(self, new_rows: int) -> None:
+        """
+        Attribute newly traced rows to the innermost call.
+
+        :param new_rows: The amount of rows that have not been traced before
+        """
+        if self._calls:
+            self._calls[-1].new_rows += new_rows
+
+    def exit(self, frame) -> None:
+        """
+        Register the return from a call, and update the saturation of its code object.
+        Returns from frames that have not been passed to `enter` are ignored.
+
+        :param frame: The frame of the returning call
+        """
+        # Calls whose returns were not registered, e.g. because an optimisation was active, are discarded
+        for index in range(len(self._calls) - 1, -1, -1):
+            if self._calls[index].frame is frame:
+                call = self._calls[index]
+                del self._calls[index:]
+                break
+        else:
+            return
+
+        saturation = self._codes[frame.f_code]
+
+        if call.new_rows:
+            if saturation.saturated:
+                logger.debug(f"{frame.f_code.co_name} is no longer saturated")
+                if self.cache is not None:
+                    self.cache.discard(frame.f_code)
+            self._codes[frame.f_code] = _CodeSaturation()
+            return
+
+        saturation.stable_calls += 1
+        if (
+            not saturation.saturated
+            and saturation.stable_calls >= self.calls_until_saturation
+        ):
+            logger.debug(f"{frame.f_code.co_name} is saturated")
+            saturation.saturated = True
+            if self.cache is not None:
+                self.cache.add(frame.f_code)
+
+    def is_saturated(self, code: types.CodeType) -> bool:
+        """
+        :param code: A code object
+        :returns: True if line events are currently turned off for calls to the code object
+        """
+        saturation = self._codes.get(code)
+        return saturation is not None and saturation.saturated
+
+    def clear_calls(self) -> None:
+        """Forget all calls that have not returned, while keeping the saturation of each code object."""
+        self._calls.clear()
+
+
+# A code location, given by its qualified name and first line, within a file
+_Location = tuple[str, int]
+
+
+@dataclass
+class _CachedFile:
+    # Hash of the file's source the locations were saturated with
+    sha256: str
+    saturated: set[_Location] = field(default_factory=set)
+
+
+class SaturationCache:
+    """
+    Persistent record of the code locations that have been saturated, see `TypeSaturation`,
+    so that tracers in later runs do not have to rediscover them.
+
+    Locations are identified by the file they are defined in, relative to the project, their qualified name and
+    their first line. The locations of a file are forgotten once the hash of its source changes.
+    Multiple processes may share a cache file, e.g. the workers of pytest-xdist; each of them saves only
+    the locations it has added or discarded, see `save`.
+    """
+
+    _VERSION = 1
+
+    def __init__(self, proj_path: pathlib.Path):
+        """
+        Creates an empty cache.
+
+        :param proj_path: Path to project's directory; code outside of it is not cached
+        """
+        self.proj_path = proj_path
+
+        self._files: dict[str, _CachedFile] = dict()
+
+        # Hashes of the current sources, and the cached location of each code object
+        self._hashes: dict[str, str | None] = dict()
+        self._keys: dict[types.CodeType, tuple[str, _Location] | None] = dict()
+
+        # Locations added (True) or discarded (False) since the cache was loaded or last saved
+        self._changes: dict[tuple[str, _Location], bool] = dict()
+
+    @staticmethod
+    def load(path: pathlib.Path, proj_path: pathlib.Path) -> SaturationCache:
+        """
+        Load the cache stored at the given path.
+
+        :param path: The path the cache has been saved to
+        :param proj_path: Path to project's directory
+        :returns: The loaded cache, or an empty one if there is no valid cache at the path
+        """
+        cache = SaturationCache(proj_path)
+        if not path.is_file():
+            return cache
+
+        try:
+            with path.open() as f:
+                stored = json.load(f)
+            if stored.get("version") != SaturationCache._VERSION:
+                logger.info(f"Ignoring saturation cache {path} of another version")
+                return cache
+
+            for file_name, entry in stored["files"].items():
+                cache._files[file_name] = _CachedFile(
+                    sha256=entry["sha256"],
+                    saturated={(qualname, line) for qualname, line in entry["saturated"]},
+                )
+
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring invalid saturation cache {path}: {e}")
+            cache._files.clear()
+
+        return cache
+
+    def copy(self) -> SaturationCache:
+        """
+        :returns: A cache with the same saturated locations, which are recorded independently of this cache
+        """
+        copied = SaturationCache(self.proj_path)
+        copied._files = {
+            file_name: _CachedFile(entry.sha256, set(entry.saturated))
+            for file_name, entry in self._files.items()
+        }
+        copied._hashes = dict(self._hashes)
+        copied._keys = dict(self._keys)
+        copied._changes = dict(self._changes)
+        return copied
+
+    def save(self, path: pathlib.Path) -> None:
+        """
+        Store the cache at the given path, merged with the cache that other processes have stored there:
+        only the locations this cache has added or discarded since it was loaded or last saved are changed.
+        Saves are serialised by a lock file next to the cache, and the file is replaced atomically,
+        so that concurrent readers never see a partially written cache.
+        Afterwards, this cache holds the merged locations.
+
+        :param path: The path to store the cache at
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _locked(path.with_name(f"{path.name}.lock")):
+            merged = SaturationCache.load(path, self.proj_path)
+            for file_name, sha256 in self._hashes.items():
+                entry = merged._files.get(file_name)
+                if sha256 is not None and (entry is None or entry.sha256 != sha256):
+                    merged._files[file_name] = _CachedFile(sha256=sha256)
+
+            for (file_name, location), saturated in self._changes.items():
+                locations = merged._files[file_name].saturated
+                if saturated:
+                    locations.add(location)
+                else:
+                    locations.discard(location)
+
+            merged._write(path)
+
+        self._files = merged._files
+        self._changes.clear()
+
+    def _write(self, path: pathlib.Path) -> None:
+        stored = {
+            "version": SaturationCache._VERSION,
+            "files": {
+                file_name: {
+                    "sha256": entry.sha256,
+                    "saturated": sorted(entry.saturated),
+                }
+                for file_name, entry in self._files.items()
+                if entry.saturated
+            },
+        }
+
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(stored, f)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def is_saturated(self, code: types.CodeType) -> bool:
+        """
+        :param code: A code object
+        :returns: True if the code object's location has been saturated, and its source has not changed since
+        """
+        key = self._key(code)
+        if key is None:
+            return False
+
+        file_name, location = key
+        entry = self._files.get(file_name)
+        return entry is not None and location in entry.saturated
+
+    def add(self, code: types.CodeType) -> None:
+        """
+        Record the code object's location as saturated.
+
+        :param code: A code object
+        """
+        key = self._key(code)
+        if key is not None:
+            file_name, location = key
+            self._files[file_name].saturated.add(location)
+            self._changes[key] = True
+
+    def discard(self, code: types.CodeType) -> None:
+        """
+        Remove the code object's location from the saturated locations.
+
+        :param code: A code object
+        """
+        key = self._key(code)
+        if key is not None:
+            file_name, location = key
+            self._files[file_name].saturated.discard(location)
+            self._changes[key] = False
+
+    def _key(self, code: types.CodeType) -> tuple[str, _Location] | None:
+        try:
+            return self._keys[code]
+        except KeyError:
+            pass
+
+        key = None
+        path = pathlib.Path(code.co_filename)
+        if path.is_relative_to(self.proj_path):
+            file_name = path.relative_to(self.proj_path).as_posix()
+            if self._validate(file_name, path):
+                # Qualified names of code objects are only available from Python 3.11 onwards
+                qualname = getattr(code, "co_qualname", code.co_name)
+                key = file_name, (qualname, code.co_firstlineno)
+
+        self._keys[code] = key
+        return key
+
+    def _validate(self, file_name: str, path: pathlib.Path) -> bool:
+        # Hashes the current source once, and forgets the locations of the file if it has changed
+        if file_name not in self._hashes:
+            try:
+                sha256 = hashlib.sha256(path.read_bytes()).hexdigest()
+            except OSError:
+                sha256 = None
+            self._hashes[file_name] = sha256
+
+            entry = self._files.get(file_name)
+            if sha256 is not None and (entry is None or entry.sha256 != sha256):
+                self._files[file_name] = _CachedFile(sha256=sha256)
+
+        return self._hashes[file_name] is not None
+
+
+@contextlib.contextmanager
+def _locked(lock_path: pathlib.Path) -> typing.Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+
+    with lock_path.open("a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -1,15 +1,260 @@
-from dataclasses import dataclass
-from traceback import linecache  # type: ignore
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import ast
+import enum
 import functools
-import io
+import inspect
+import linecache
+import logging
 import typing
-import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class StatementKind(enum.IntEnum):
+    """
+    The kind of statement on a line of source code
+    """
+
+    OTHER = 0
+    """Any statement that is irrelevant to the optimisations"""
+
+    FOR = 1
+    """The head of a for loop"""
+
+    WHILE = 2
+    """The head of a while loop"""
+
+    BREAK = 3
+    """A break statement"""
+
+    RETURN = 4
+    """A return statement"""
+
+    COMPREHENSION = 5
+    """A list, set or dict comprehension, or a generator expression"""
+
+
+@dataclass(frozen=True)
+class LoopRange:
+    """
+    The lines of a loop, from its first line to the last line of its body, excluding any else clause.
+    The head is the line that is executed at the start of every iteration, e.g. the condition of a while loop
+    """
+
+    kind: StatementKind
+    start: int
+    end: int
+    head: int
+
+    def __contains__(self, line_number: object) -> bool:
+        return isinstance(line_number, int) and self.start <= line_number <= self.end
+
+
+class LineIndex:
+    """
+    Classification of the lines of a source file, built once from its AST.
+
+    Maps each line to the kind of statement on it, to the innermost loop it belongs to,
+    and to the loop whose iterations start on it.
+    Lines of statements that span multiple lines are all classified like their first line.
+    """
+
+    def __init__(self, tree: ast.AST | None):
+        """
+        :param tree: The AST of the source file. If None, no line is classified
+        """
+        self._kinds: dict[int, StatementKind] = dict()
+        self._loops: dict[int, LoopRange] = dict()
+        self._heads: dict[int, LoopRange] = dict()
+        self._decorators: dict[int, tuple[str, ...]] = dict()
+
+        if tree is not None:
+            self._classify(tree)
+
+    @staticmethod
+    def from_file(
+        filename: str, module_globals: dict[str, typing.Any] | None = None
+    ) -> LineIndex:
+        """
+        Build the index of the given source file.
+
+        :param filename: The file name referenced by a code object
+        :param module_globals: The globals of the module, used to find the source of modules loaded by import hooks
+        :returns: The index of the file, which classifies no lines if the source cannot be parsed
+        """
+        return LineIndex(_parse(filename, module_globals))
+
+    def kind(self, line_number: int) -> StatementKind:
+        """
+        :param line_number: A line of the source file
+        :returns: The kind of statement on the line
+        """
+        return self._kinds.get(line_number, StatementKind.OTHER)
+
+    def loop(self, line_number: int) -> LoopRange | None:
+        """
+        :param line_number: A line of the source file
+        :returns: The innermost loop the line belongs to, or None if it is not part of a loop
+        """
+        return self._loops.get(line_number)
+
+    def head(self, line_number: int) -> LoopRange | None:
+        """
+        :param line_number: A line of the source file
+        :returns: The outermost loop whose iterations start on the line, or None if there is no such loop
+        """
+        return self._heads.get(line_number)
+
+    def decorators(self, line_number: int) -> tuple[str, ...]:
+        """
+        :param line_number: The first line of a function definition, i.e. the line of its first decorator, if any
+        :returns: The decorators of the function as written in the source, without their arguments
+        """
+        return self._decorators.get(line_number, ())
+
+    def _classify(self, tree: ast.AST) -> None:
+        # Statements are visited before the statements nested in them; one-line compound statements,
+        # such as `for x in y: pass`, are therefore classified by their head
+        for node in _walk_preorder(tree):
+            if isinstance(node, _COMPREHENSIONS):
+                self._classify_comprehension(node)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self._classify_function(node)
+            if not isinstance(node, ast.stmt):
+                continue
+
+            if isinstance(node, (ast.For, ast.AsyncFor)):
+                self._classify_loop(node, StatementKind.FOR, head=node.lineno)
+            elif isinstance(node, ast.While):
+                self._classify_loop(node, StatementKind.WHILE, head=node.test.lineno)
+            elif isinstance(node, ast.Break):
+                self._classify_lines(node, StatementKind.BREAK)
+            elif isinstance(node, ast.Return):
+                self._classify_lines(node, StatementKind.RETURN)
+            else:
+                self._classify_lines(node, StatementKind.OTHER, end=_head_end(node))
+
+    def _classify_lines(
+        self, node: ast.stmt, kind: StatementKind, end: int | None = None
+    ) -> None:
+        last = end or node.end_lineno or node.lineno
+        for line_number in range(node.lineno, last + 1):
+            self._kinds.setdefault(line_number, kind)
+
+    def _classify_loop(
+        self, node: ast.For | ast.AsyncFor | ast.While, kind: StatementKind, head: int
+    ) -> None:
+        self._classify_lines(node, kind, end=_head_end(node))
+
+        end = max(statement.end_lineno or statement.lineno for statement in node.body)
+        self._add_loop(LoopRange(kind=kind, start=node.lineno, end=end, head=head))
+
+    def _classify_comprehension(
+        self, node: ast.ListComp | ast.SetComp | ast.DictComp | ast.GeneratorExp
+    ) -> None:
+        # Every iteration starts by assigning the target of the first for clause
+        head = node.generators[0].target.lineno
+        end = node.end_lineno or node.lineno
+        self._add_loop(
+            LoopRange(kind=StatementKind.COMPREHENSION, start=node.lineno, end=end, head=head)
+        )
+
+    def _classify_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        if not node.decorator_list:
+            return
+
+        names = tuple(
+            ast.unparse(
+                decorator.func if isinstance(decorator, ast.Call) else decorator
+            )
+            for decorator in node.decorator_list
+        )
+        self._decorators[node.decorator_list[0].lineno] = names
+
+    def _add_loop(self, loop: LoopRange) -> None:
+        # Nested loops are visited later, and overwrite the lines of their body
+        for line_number in range(loop.start, loop.end + 1):
+            self._loops[line_number] = loop
+        self._heads.setdefault(loop.head, loop)
+
+
+class LineIndexCache:
+    """
+    The indices of the source files that are executed during a trace, each built on its first request.
+    Held by the tracer, so that the indices are dropped with it, and sources changed in between traces are parsed again.
+    """
+
+    def __init__(self):
+        self._indices: dict[str, LineIndex] = dict()
+
+    def for_file(
+        self, filename: str, module_globals: dict[str, typing.Any] | None = None
+    ) -> LineIndex:
+        """
+        Get the index of the given source file, building it on the first request.
+
+        :param filename: The file name referenced by a code object
+        :param module_globals: The globals of the module, used to find the source of modules loaded by import hooks
+        :returns: The index of the file, see `LineIndex.from_file`
+        """
+        index = self._indices.get(filename)
+        if index is None:
+            index = LineIndex.from_file(filename, module_globals)
+            self._indices[filename] = index
+        return index
+
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _head_end(node: ast.stmt) -> int | None:
+    # Compound statements only occupy the lines up to their body, which are classified by themselves
+    body = getattr(node, "body", None)
+    if isinstance(body, list) and body:
+        return max(node.lineno, body[0].lineno - 1)
+
+    cases = getattr(node, "cases", None)
+    if isinstance(cases, list) and cases:
+        return max(node.lineno, cases[0].pattern.lineno - 1)
+
+    return None
+
+
+def _walk_preorder(tree: ast.AST) -> typing.Iterator[ast.AST]:
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(ast.iter_child_nodes(node))))
+
+
+def _parse(
+    filename: str, module_globals: dict[str, typing.Any] | None
+) -> ast.AST | None:
+    # The source may have changed since it was cached by an earlier trace
+    linecache.checkcache(filename)
+    source = "".join(linecache.getlines(filename, module_globals))
+    if not source:
+        logger.debug(f"No source available for {filename}, its lines are not classified")
+        return None
+
+    try:
+        return ast.parse(source, filename=filename)
+    except (SyntaxError, ValueError) as e:
+        logger.debug(f"Failed to parse {filename}, its lines are not classified: {e}")
+        return None
 
 
 @dataclass
 class FrameWithMetadata:
     """A wrapper dataclass that takes the current frame and checks properties of the frame's state"""
     _frame: typing.Any
+    event: str | None = None
+    """The event the frame has been passed to the tracer with, if any"""
+    line_indices: LineIndexCache = field(default_factory=LineIndexCache)
+    """The indices of the source files, which are shared by the frames of a trace"""
 
     @functools.cached_property
     def co_filename(self) -> str:
@@ -22,48 +267,47 @@ class FrameWithMetadata:
         return self._frame.f_lineno
 
     @functools.cached_property
-    def tokens(self) -> list[tokenize.TokenInfo] | str:
-        """Get a representation of the line currently being executed"""
-        # Adapted from https://stackoverflow.com/a/22363519 and
-        # https://stackoverflow.com/a/62167093
-        filename = self._frame.f_code.co_filename
-        linecache.checkcache(filename)
-
-        line = linecache.getline(filename, self._frame.f_lineno, self._frame.f_globals)
-        sio = io.StringIO(line)
-
-        try:
-            tokens = list(tokenize.generate_tokens(sio.readline))
-            return tokens
-        except tokenize.TokenError:
-            return line
+    def line_index(self) -> LineIndex:
+        """Get the index of the lines of the file the frame's code is defined in"""
+        return self.line_indices.for_file(self.co_filename, self._frame.f_globals)
+
+    @functools.cached_property
+    def kind(self) -> StatementKind:
+        """Get the kind of statement currently being executed"""
+        return self.line_index.kind(self.f_lineno)
+
+    def loop(self) -> LoopRange | None:
+        """Return the innermost loop the line currently being executed belongs to"""
+        return self.line_index.loop(self.f_lineno)
+
+    def started_loop(self) -> LoopRange | None:
+        """
+        Return the loop whose iteration is started by the frame, if any.
+        Generator expressions are suspended after every element, and start an iteration whenever they are resumed
+        """
+        if self.is_generator_expression():
+            return self.loop() if self.event == "call" else None
+        if self.event == "return":
+            return None
+        return self.line_index.head(self.f_lineno)
+
+    def is_loop_head(self) -> bool:
+        """Return True if the frame starts an iteration of a loop"""
+        return self.started_loop() is not None
+
+    def is_generator_expression(self) -> bool:
+        """Return True if the frame's code is a generator expression"""
+        code = self._frame.f_code
+        return bool(code.co_flags & inspect.CO_GENERATOR) and code.co_name == "<genexpr>"
 
     def is_return(self) -> bool:
         """Return True if the frame represents a return statement"""
-        if isinstance(self.tokens, list):
-            return self.tokens[0].string == "return"
-        return self.tokens.startswith("return")
+        return self.kind == StatementKind.RETURN
 
     def is_break(self) -> bool:
         """Return True if the frame represents a break statement"""
-        if isinstance(self.tokens, list):
-            return self.tokens[0].string == "break"
-        return self.tokens.startswith("break")
+        return self.kind == StatementKind.BREAK
 
     def is_for_loop(self) -> bool:
         """Return True if the frame represents a for loop"""
-        if isinstance(self.tokens, list):
-            fors = filter(lambda tok: tok.string == "for", self.tokens)
-            has_for = next(fors, None)
-            if not has_for:
-                return False
-
-            ins = filter(lambda tok: tok.string == "in", self.tokens)
-            has_in = next(ins, None)
-            if not has_in:
-                return False
-
-            (fbegin, fend), (ibegin, iend) = has_for.start, has_in.start
-            return fend < iend or (fend == iend and fbegin < ibegin)
-
-        return "for" in self.tokens and "in" in self.tokens
+        return self.kind == StatementKind.FOR
@@ -0,0 +1,188 @@
+"""
+pytest plugin that traces all tests of a session with a single tracer.
+
+Enabled by passing `--pytypes` to pytest. The plugin is loaded automatically once PyTypes is installed,
+or with `-p tracing.plugin` if it is not, but does not trace anything without this flag.
+Unlike the `trace` decorator, the test files do not need to be modified.
+Under pytest-xdist, every worker traces its tests with its own tracer, and writes its own shard of files.
+"""
+import logging
+import os
+import pathlib
+import traceback
+
+import pandas as pd
+import pytest
+
+import constants
+from common import ptconfig, trace_data_encoding
+from tracing import configured, shards, writer
+from tracing.optimisation import SaturationCache
+from tracing.tracer import TracerBase
+
+logger = logging.getLogger(__name__)
+
+_PLUGIN_NAME = "pytypes-tracing"
+
+
+class TracingPlugin:
+    """
+    Traces the call of every test with the same tracer, so that its caches and optimisations are kept across tests.
+
+    Once `batch_size` tests have finished, and when the session ends, the rows that each of these tests has traced
+    are stored by a single write, with how often they have been traced and by how many of the tests,
+    see `TracerBase.trace_data_increment` and `Schema.Multiplicities`, so that the counts of all batches add up
+    to how often each row has been traced. Batches are stored in the location given by the config file,
+    like the `trace` decorator does, under the test case `constants.PLUGIN_BATCH_TEST_CASE`;
+    the error of a failed test is stored in the location of the test itself.
+    """
+
+    def __init__(
+        self,
+        config: ptconfig.TomlCfg,
+        batch_size: int = constants.TRACE_DATA_BATCH_SIZE,
+        merge: bool = False,
+    ):
+        """
+        :param config: The config of the project whose tests are traced
+        :param batch_size: The amount of tests whose trace data is stored at once
+        :param merge: When set to True, all trace data files of the project are merged at the end of the session,
+        see `shards.merge_shards`
+        """
+        self.config = config
+        self.batch_size = batch_size
+        self.merge = merge
+
+        self._saturation_cache_path: pathlib.Path | None
+        self._saturation_cache: SaturationCache | None
+        self._saturation_cache_path, self._saturation_cache = configured.load_saturation_cache(
+            config, config.pytypes.project
+        )
+
+        self.tracer: TracerBase = configured.construct_tracer(
+            config,
+            configured.ignore_rules(config),
+            apply_opts=config.pytypes.apply_optimisations,
+            saturation_cache=self._saturation_cache,
+        )
+
+        # Trace data of the finished tests that has not been stored yet
+        self._pending: list[
+            tuple[configured.TemplateSubstitutes, pd.DataFrame, str | None]
+        ] = list()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item: pytest.Item):
+        self.tracer.start_trace()
+        try:
+            outcome = yield
+        finally:
+            self.tracer.stop_trace(collect=False)
+
+        err = None
+        # Skipping a test is not an error of the traced code
+        if outcome.excinfo is not None and not isinstance(
+            outcome.excinfo[1], pytest.skip.Exception
+        ):
+            err = "".join(traceback.format_exception(*outcome.excinfo))
+
+        traced = self.tracer.trace_data_increment()
+        if not traced.empty or err is not None:
+            self._pending.append((self._substitutes(item), traced, err))
+
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        self.flush()
+
+        if self._saturation_cache is not None and self._saturation_cache_path is not None:
+            self._saturation_cache.save(self._saturation_cache_path)
+
+        writer.shared_writer().drain()
+
+        # Workers of pytest-xdist finish before the controller, which merges their shards
+        if self.merge and not hasattr(session.config, "workerinput"):
+            shards.merge_shards(shards.project_output_path(self.config))
+
+    def flush(self) -> None:
+        """Store the trace data of all finished tests that has not been stored yet, as a single batch."""
+        if not self._pending:
+            return
+
+        logger.info(f"Storing trace data of {len(self._pending)} tests")
+        traced = [
+            trace_data_encoding.per_test(increment)
+            for _, increment, _ in self._pending
+            if not increment.empty
+        ]
+        if traced:
+            batch = trace_data_encoding.deduplicate(pd.concat(traced, ignore_index=True))
+            subst = configured.TemplateSubstitutes(
+                project=self.config.pytypes.project,
+                test_case=constants.PLUGIN_BATCH_TEST_CASE,
+                func_name=constants.PLUGIN_BATCH_FILE_NAME,
+            )
+            configured.store_trace_data(self.config, subst, batch, None)
+
+        for subst, _, err in self._pending:
+            if err is not None:
+                configured.store_error(configured.trace_data_path(self.config, subst), err)
+        self._pending.clear()
+
+    def _substitutes(self, item: pytest.Item) -> configured.TemplateSubstitutes:
+        # Like the trace decorator, test cases are named after the test's module; parametrised
+        # tests are distinguished by their parameters in the name
+        module = getattr(item, "module", None)
+        if module is not None:
+            test_case = module.__name__.replace(".", os.path.sep)
+        else:
+            test_case = pathlib.Path(item.nodeid.split("::")[0]).with_suffix("").as_posix()
+
+        return configured.TemplateSubstitutes(
+            project=self.config.pytypes.project,
+            test_case=test_case,
+            func_name=item.name.replace(os.path.sep, "_"),
+        )
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("pytypes", "tracing with PyTypes")
+    group.addoption(
+        "--pytypes",
+        action="store_true",
+        default=False,
+        help="Trace all tests of the session with PyTypes",
+    )
+    group.addoption(
+        "--pytypes-config",
+        type=pathlib.Path,
+        default=None,
+        help=f"Path to the config file, by default {constants.CONFIG_FILE_NAME} in the rootdir",
+    )
+    group.addoption(
+        "--pytypes-merge",
+        action="store_true",
+        default=False,
+        help="Merge the trace data files of all tests and workers once the session has finished",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # Installing PyTypes loads this plugin in every session, including those of projects without a config
+    if not config.getoption("--pytypes"):
+        return
+
+    config_path = config.getoption("--pytypes-config") or (
+        config.rootpath / constants.CONFIG_FILE_NAME
+    )
+
+    cfg = ptconfig.load_config(config_path)
+    plugin = TracingPlugin(cfg, merge=config.getoption("--pytypes-merge"))
+    config.pluginmanager.register(plugin, _PLUGIN_NAME)
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    plugin = config.pluginmanager.get_plugin(_PLUGIN_NAME)
+    if plugin is not None:
+        config.pluginmanager.unregister(plugin)
@@ -0,0 +1,145 @@
+from dataclasses import dataclass, field
+import enum
+import fnmatch
+import pathlib
+import types
+import typing
+
+from tracing.optimisation.utils import LineIndexCache
+
+
+class CodeScope(enum.IntEnum):
+    """
+    How much of the execution of a code object is traced
+    """
+
+    IGNORED = 0
+    """No events are traced, e.g. for code outside of the project"""
+
+    TRACED = 1
+    """All events are traced"""
+
+    EXCLUDED = 2
+    """Code within the project that is matched by the IgnoreRules. Its events are not traced,
+    and when optimising, neither are the events of the calls it makes"""
+
+
+@dataclass
+class IgnoreRules:
+    """
+    Patterns of code within the project that shall not be traced. Every pattern is a glob, see `fnmatch`.
+    """
+
+    modules: list[str] = field(default_factory=list)
+    """Patterns of dotted module names, e.g. `project.serialisation.*`"""
+
+    functions: list[str] = field(default_factory=list)
+    """Patterns of qualified function names, prefixed by their module, e.g. `project.logs.Logger.*`"""
+
+    decorators: list[str] = field(default_factory=list)
+    """Patterns of decorators as written in the source, without their arguments, e.g. `functools.cache`"""
+
+    def __bool__(self) -> bool:
+        return bool(self.modules or self.functions or self.decorators)
+
+    def matches(
+        self, module: str, qualname: str, decorators: typing.Iterable[str]
+    ) -> bool:
+        """
+        Check whether a function is matched by any of the patterns.
+
+        :param module: The dotted name of the module the function is defined in
+        :param qualname: The qualified name of the function within its module
+        :param decorators: The decorators of the function, see `LineIndex.decorators`
+        :returns: True if the function shall not be traced
+        """
+        if _matches_any(module, self.modules):
+            return True
+        if _matches_any(f"{module}.{qualname}", self.functions):
+            return True
+        return any(_matches_any(decorator, self.decorators) for decorator in decorators)
+
+
+def _matches_any(name: str, patterns: list[str]) -> bool:
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+class ScopeCache:
+    """
+    Decides once per code object how much of it is traced, so that the decision and the
+    path operations it requires are not repeated on every event.
+    """
+
+    def __init__(
+        self, proj_path: pathlib.Path, ignore_rules: IgnoreRules | None = None
+    ):
+        """
+        :param proj_path: Path to project's directory; code outside of it is ignored
+        :param ignore_rules: Patterns of code within the project that is excluded from tracing
+        """
+        self.proj_path = proj_path
+        self.ignore_rules = ignore_rules or IgnoreRules()
+
+        self._scopes: dict[types.CodeType, CodeScope] = dict()
+        self._file_names: dict[str, pathlib.Path | None] = dict()
+
+        # The indices of the source files, which are shared with the optimisations of the tracer
+        self.line_indices = LineIndexCache()
+
+    def scope(self, code: types.CodeType) -> CodeScope:
+        """
+        Get the scope of the given code object, deciding upon it on the first lookup.
+
+        :param code: The code object referenced by a stack frame
+        :returns: The scope of the code object
+        """
+        scope = self._scopes.get(code)
+        if scope is None:
+            scope = self._decide(code)
+            self._scopes[code] = scope
+        return scope
+
+    def file_name(self, code: types.CodeType) -> pathlib.Path | None:
+        """
+        Get the path of the file that defines the given code object, relative to the project's directory.
+
+        :param code: The code object referenced by a stack frame
+        :returns: The relative path, or None if the file lies outside of the project
+        """
+        co_filename = code.co_filename
+        try:
+            return self._file_names[co_filename]
+        except KeyError:
+            path = pathlib.Path(co_filename)
+            relative = (
+                path.relative_to(self.proj_path)
+                if path.is_relative_to(self.proj_path)
+                else None
+            )
+            self._file_names[co_filename] = relative
+            return relative
+
+    def _decide(self, code: types.CodeType) -> CodeScope:
+        file_name = self.file_name(code)
+        if file_name is None:
+            return CodeScope.IGNORED
+        if self.ignore_rules and self._is_excluded(code, file_name):
+            return CodeScope.EXCLUDED
+        return CodeScope.TRACED
+
+    def _is_excluded(self, code: types.CodeType, file_name: pathlib.Path) -> bool:
+        module_parts = file_name.with_suffix("").parts
+        if module_parts[-1] == "__init__":
+            module_parts = module_parts[:-1]
+
+        # Qualified names of code objects are only available from Python 3.11 onwards
+        qualname = getattr(code, "co_qualname", code.co_name)
+
+        # Decorators are only looked up if there are patterns for them, as this requires parsing the source
+        decorators: tuple[str, ...] = ()
+        if self.ignore_rules.decorators:
+            decorators = self.line_indices.for_file(code.co_filename).decorators(
+                code.co_firstlineno
+            )
+
+        return self.ignore_rules.matches(".".join(module_parts), qualname, decorators)
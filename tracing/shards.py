@@ -0,0 +1,118 @@
+"""
+Naming and merging of the files written by parallel traced test runs.
+
+Every process that traces tests, e.g. each worker of pytest-xdist, writes its files as its own shard:
+their names end with the id of the worker and a sequence number that is unique within the worker,
+so that workers never overwrite each other's files. Once all workers have finished, the shards can be merged.
+"""
+import itertools
+import logging
+import os
+import pathlib
+
+import pandas as pd
+
+import constants
+from common import ptconfig, trace_data_encoding, trace_data_file
+from constants import Schema
+
+logger = logging.getLogger(__name__)
+
+# Sequence numbers of the files written by this process
+_SEQUENCE = itertools.count()
+
+
+def worker_id() -> str:
+    """
+    :returns: The id of the pytest-xdist worker the current process is, or `constants.MAIN_WORKER_ID` otherwise
+    """
+    return os.environ.get(constants.XDIST_WORKER_VARIABLE, constants.MAIN_WORKER_ID)
+
+
+def shard_suffix() -> str:
+    """
+    Generate the suffix of a file name written by the current process,
+    which is unique among all files written by all workers of the run.
+
+    :returns: The worker id and the next sequence number, separated by dashes
+    """
+    return f"-{worker_id()}-{next(_SEQUENCE)}"
+
+
+def project_output_path(config: ptconfig.TomlCfg) -> pathlib.Path:
+    """
+    :param config: The config of the traced project
+    :returns: The folder that the trace data of all test cases of the project is written to
+    """
+    project_template = config.pytypes.output_template.split("{test_case}")[0]
+    return config.pytypes.proj_path / project_template.format_map(
+        {"project": config.pytypes.project}
+    )
+
+
+def find_shards(path: pathlib.Path) -> list[pathlib.Path]:
+    """
+    Find the trace data files in the given folder and its subfolders, except for the file written by compaction,
+    see `tracing.compaction`.
+
+    :param path: The folder the trace data of a project is written to
+    :returns: The paths of the files, sorted
+    """
+    compacted_path = path / (
+        constants.COMPACTED_TRACE_DATA_FILE_NAME + constants.TRACE_DATA_FILE_ENDING
+    )
+    return sorted(
+        shard
+        for shard in path.rglob(f"*{constants.TRACE_DATA_FILE_ENDING}")
+        if shard != compacted_path
+    )
+
+
+def merge_shards(path: pathlib.Path) -> pathlib.Path | None:
+    """
+    Combine the trace data files in the given folder and its subfolders into a single file of unique rows,
+    which replaces them. The rows are followed by the columns of `Schema.Multiplicities`, which are summed up
+    over all files, so that the merged file can be compacted like its shards. Error files and the file written
+    by compaction are kept.
+
+    :param path: The folder the trace data of a project is written to
+    :returns: The path of the merged file, or None if there are no trace data files
+    """
+    merged_path = path / (
+        constants.MERGED_TRACE_DATA_FILE_NAME + constants.TRACE_DATA_FILE_ENDING
+    )
+    shards = find_shards(path)
+    if not shards:
+        return None
+
+    merged_shards: list[pathlib.Path] = list()
+    collected: list[pd.DataFrame] = list()
+    for shard in shards:
+        trace_data = trace_data_file.load(shard)
+        if not trace_data_encoding.has_trace_data_schema(trace_data):
+            logger.info(f"Not merging {shard}, its columns do not match the trace data schema")
+            continue
+        if trace_data_encoding.is_compact(trace_data):
+            trace_data = trace_data_encoding.expand(trace_data)
+        merged_shards.append(shard)
+        # Every shard is the trace data of a single test, see trace_data_encoding.per_test
+        collected.append(trace_data_encoding.per_test(trace_data))
+
+    if not collected:
+        return None
+
+    merged = pd.concat(collected, ignore_index=True)
+    schema = Schema.TraceData | Schema.Multiplicities
+    merged = trace_data_encoding.deduplicate(merged.astype(schema))
+
+    # Written next to the shards first, so that an interrupted merge does not lose any data
+    tmp_path = merged_path.with_name(merged_path.name + ".tmp")
+    tmp_path.write_bytes(trace_data_file.serialise(merged))
+    os.replace(tmp_path, merged_path)
+
+    for shard in merged_shards:
+        if shard != merged_path:
+            shard.unlink()
+
+    logger.info(f"Merged {len(merged_shards)} files into {merged_path} with {len(merged)} rows")
+    return merged_path
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import typing
+
+import pandas as pd
+
+from constants import Schema
+
+
+TraceRow = tuple[
+    str, str | None, str | None, str | None, int, int, str, str | None, str
+]
+
+
+class TraceDataBuffer:
+    """
+    Append-only, columnar storage for unique trace data during tracing.
+
+    Holds one preallocated array per column of `Schema.TraceData`, which grows geometrically
+    when full, so that appending a row costs amortised O(1) regardless of how many rows have
+    already been collected. Rows are kept as plain Python values and only turned into a DataFrame
+    when `to_frame` is called.
+
+    Rows that have already been appended are not stored again; instead, the amount of times
+    each row has been appended is counted. `take_increments` reports how these counts have grown
+    since it was last called, e.g. per traced test.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Construct an empty buffer.
+
+        :param capacity: The amount of rows to preallocate storage for
+        """
+        self._capacity = max(capacity, 1)
+        self._size = 0
+        self._columns: list[list[typing.Any]] = [
+            [None] * self._capacity for _ in Schema.TraceData
+        ]
+
+        # Map of each stored row to its index in the columns, and the amount of times each row was appended
+        self._indices: dict[TraceRow, int] = dict()
+        self._counts: list[int] = list()
+
+        # The amount of rows when take_increments was last called,
+        # and the counts at that time of the rows among them that have been appended again since
+        self._taken = 0
+        self._recounted: dict[int, int] = dict()
+
+        # The DataFrame produced by the last call to to_frame, as long as no rows have been added since
+        self._frame: pd.DataFrame | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, row: TraceRow) -> bool:
+        """
+        Append a single row, whose values are ordered like the columns of `Schema.TraceData`.
+
+        :param row: The row to append
+        :returns: True if the row has not been appended before
+        """
+        index = self._indices.get(row)
+        if index is not None:
+            if index < self._taken:
+                self._recounted.setdefault(index, self._counts[index])
+            self._counts[index] += 1
+            return False
+
+        if self._size == self._capacity:
+            self._grow()
+
+        index = self._size
+        for column, value in zip(self._columns, row):
+            column[index] = value
+        self._indices[row] = index
+        self._counts.append(1)
+        self._size += 1
+        self._frame = None
+
+        return True
+
+    def extend(self, rows: typing.Iterable[TraceRow]) -> int:
+        """
+        Append multiple rows, see `append`.
+
+        :param rows: The rows to append
+        :returns: The amount of rows that had not been appended before
+        """
+        return sum(self.append(row) for row in rows)
+
+    def count(self, row: TraceRow) -> int:
+        """
+        Get the amount of times the given row has been appended.
+
+        :param row: The row to look up
+        :returns: The amount of appends, 0 if the row is unknown
+        """
+        index = self._indices.get(row)
+        return 0 if index is None else self._counts[index]
+
+    def counts(self, start: int = 0) -> pd.Series:
+        """
+        Get the amount of times each row has been appended.
+
+        :param start: The amount of rows to skip, in insertion order
+        :returns: A Series that is aligned with the DataFrame produced by `to_frame` with the same `start`
+        """
+        counts = pd.Series(self._counts[start:], dtype=pd.UInt64Dtype())
+        counts.index += start
+        return counts
+
+    def take_increments(self) -> pd.Series:
+        """
+        Get how often rows have been appended since the last call, leaving out those that have not been appended since.
+        The increments of consecutive calls therefore add up to the counts of all rows.
+
+        :returns: A Series of the increments, indexed by the position of each row in insertion order, see `select`
+        """
+        positions = sorted(self._recounted) + list(range(self._taken, self._size))
+        increments = [
+            self._counts[position] - self._recounted.get(position, 0)
+            for position in positions
+        ]
+
+        self._taken = self._size
+        self._recounted.clear()
+        return pd.Series(increments, index=positions, dtype=pd.UInt64Dtype())
+
+    def clear(self) -> None:
+        """Forget all rows, while keeping the allocated storage."""
+        self._size = 0
+        self._indices.clear()
+        self._counts.clear()
+        self._taken = 0
+        self._recounted.clear()
+        self._frame = None
+
+    def to_frame(self, start: int = 0) -> pd.DataFrame:
+        """
+        Produce a DataFrame of the buffered rows that conforms to `Schema.TraceData`.
+        The DataFrame of all rows is reused until further rows are added, and must therefore not be modified.
+
+        :param start: The amount of rows to skip, in insertion order
+        :returns: A DataFrame containing every unique row after the skipped ones in insertion order
+        """
+        if start > 0:
+            return self._build_frame(start)
+
+        if self._frame is None:
+            self._frame = self._build_frame(0)
+        return self._frame
+
+    def select(self, positions: typing.Sequence[int]) -> pd.DataFrame:
+        """
+        Produce a DataFrame of the rows at the given positions that conforms to `Schema.TraceData`.
+
+        :param positions: The positions of the rows in insertion order
+        :returns: A DataFrame containing the rows in the given order, indexed by their positions
+        """
+        data = {
+            name: [column[position] for position in positions]
+            for name, column in zip(Schema.TraceData.keys(), self._columns)
+        }
+        frame = pd.DataFrame(data, columns=Schema.TraceData.keys()).astype(
+            Schema.TraceData
+        )
+        frame.index = pd.Index(positions, dtype="int64")
+        return frame
+
+    def _build_frame(self, start: int) -> pd.DataFrame:
+        data = {
+            name: column[start : self._size]
+            for name, column in zip(Schema.TraceData.keys(), self._columns)
+        }
+        frame = pd.DataFrame(data, columns=Schema.TraceData.keys()).astype(
+            Schema.TraceData
+        )
+        # Keep the index aligned with the positions of the rows in the buffer
+        frame.index += start
+        return frame
+
+    def _grow(self) -> None:
+        for column in self._columns:
+            column.extend([None] * self._capacity)
+        self._capacity *= 2
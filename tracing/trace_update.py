@@ -2,13 +2,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 import pathlib
-import operator
+import typing
 
 from common import TraceDataCategory
 
 import pandas as pd
 
-from constants import Column, Schema
+from tracing.trace_buffer import TraceDataBuffer, TraceRow
 
 
 @dataclass(frozen=True)
@@ -206,11 +206,32 @@ class BatchTraceUpdate:
                 category=TraceDataCategory.CLASS_MEMBER,
                 names2types=names2types,
             )
-
-        self._updates.append(update)
+            self._updates.append(update)
 
         return self
 
+    def to_rows(self: BatchTraceUpdate) -> typing.Iterator[TraceRow]:
+        """
+        Consume this batch of updates in order to produce rows for a `TraceDataBuffer`.
+
+        :params self: Nothing else :)
+        :returns: An iterator over the rows of the entire batch, ordered like the columns of `Schema.TraceData`
+        """
+        for update in self._updates:
+            file_name = str(update.file_name)
+            for varname, (vartype_module, vartype) in update.names2types.items():
+                yield (
+                    file_name,
+                    update.class_module,
+                    update.class_name,
+                    update.function_name,
+                    update.line_number,
+                    update.category,
+                    varname,
+                    vartype_module,
+                    vartype,
+                )
+
     def to_frame(self: BatchTraceUpdate) -> pd.DataFrame:
         """
         Consume this batch of updates in order to produce a DataFrame.
@@ -218,32 +239,6 @@ class BatchTraceUpdate:
         :params self: Nothing else :)
         :returns: A DataFrame encompassing the entire batch 
         """
-        updates = list()
-        for update in self._updates:
-            names2types = update.names2types
-            varnames = list(names2types.keys())
-            vartype_modules = list(map(operator.itemgetter(0), names2types.values()))
-            vartypes = list(map(operator.itemgetter(1), names2types.values()))
-
-            update_dict = {
-                Column.FILENAME: [str(update.file_name)] * len(varnames),
-                Column.CLASS_MODULE: [update.class_module] * len(varnames),
-                Column.CLASS: [update.class_name] * len(varnames),
-                Column.FUNCNAME: [update.function_name] * len(varnames),
-                Column.LINENO: [update.line_number] * len(varnames),
-                Column.CATEGORY: [update.category] * len(varnames),
-                Column.VARNAME: varnames,
-                Column.VARTYPE_MODULE: vartype_modules,
-                Column.VARTYPE: vartypes,
-            }
-            update_df = pd.DataFrame(
-                update_dict, columns=Schema.TraceData.keys()
-            ).astype(Schema.TraceData)
-            updates.append(update_df)
-
-        if not updates:
-            return pd.DataFrame(columns=Schema.TraceData.keys()).astype(
-                Schema.TraceData
-            )
-
-        return pd.concat(updates, ignore_index=True).astype(Schema.TraceData)
+        buffer = TraceDataBuffer(capacity=sum(len(u.names2types) for u in self._updates))
+        buffer.extend(self.to_rows())
+        return buffer.to_frame()
@@ -2,30 +2,42 @@ from __future__ import annotations
 
 import abc
 import contextlib
+import dis
 import functools
 import logging
 import inspect
 import operator
 import sys
+import threading
+import types
 
 import pandas as pd
 import typing
 import pathlib
 
-from constants import Column, Schema
+from constants import PROJECT_NAME, Column, Schema
 from common.resolver import Resolver
+from tracing.scope import CodeScope, IgnoreRules, ScopeCache
+from tracing.trace_buffer import TraceDataBuffer, TraceRow
 from tracing.trace_update import BatchTraceUpdate
 
 from .optimisation import (
     TriggerStatus,
     FrameWithMetadata,
+    Ignore,
     Optimisation,
     TypeStableLoop,
+    TypeStableRecursion,
+    TypeSaturation,
+    SaturationCache,
 )
 
 
 logger = logging.getLogger(__name__)
 
+# Position of the line number in a TraceRow, see Schema.TraceData
+_LINENO_INDEX: typing.Final = 4
+
 
 class TracerBase(abc.ABC):
     """Base class for all Tracers. If more tracers need to be implemented, this class should be inherited from 
@@ -35,6 +47,7 @@ class TracerBase(abc.ABC):
         proj_path: pathlib.Path,
         stdlib_path: pathlib.Path,
         venv_path: pathlib.Path,
+        ignore_rules: IgnoreRules | None = None,
     ):
         """
         Construct instance with provided paths.
@@ -42,21 +55,27 @@ class TracerBase(abc.ABC):
         :param proj_path: Path to project's directory that shall be traced
         :param stdlib_path: Path to standard library's directory of the Python binary used to run the project's tests
         :param venv_path: Path to project's virtual environment's directory used to run the project's tests
+        :param ignore_rules: Patterns of code within the project that shall not be traced
         """
         self.trace_data = pd.DataFrame(columns=Schema.TraceData.keys()).astype(
             Schema.TraceData
         )
 
+        # Rows are collected here during tracing, and only turned into trace_data by stop_trace
+        self._buffer = TraceDataBuffer()
+
         self.proj_path = proj_path
         self.stdlib_path = stdlib_path
         self.venv_path = venv_path
 
         self._resolver = Resolver(self.stdlib_path, self.proj_path, self.venv_path)
+        self._scopes = ScopeCache(self.proj_path, ignore_rules)
 
-        # Map of a function name to the variables in that functions scope
-        self.old_local_vars: dict[str, dict[str, typing.Any]] = dict()
+        # Map of the frame of each active call to the variables in its scope
+        self.old_local_vars: dict[types.FrameType, dict[str, typing.Any]] = dict()
 
-        # Map of filename to the global variables in that variable's scope
+        # Map of a module's filename to the snapshot of its global variables.
+        # Unlike local variables, the snapshot is shared by and kept across all calls into the module
         self.old_global_vars: dict[str, dict[str, typing.Any]] = dict()
 
         # stack based in order to hold previous line when returning
@@ -67,19 +86,23 @@ class TracerBase(abc.ABC):
             self.stop_trace.__name__,
             self.start_trace.__name__,
             self.active_trace.__name__,
+            self._unregister.__name__,
         ]
 
         self._old_trace: typing.Callable | None = None
 
+        # The amount of events the tracer has been invoked with, reported by benchmarks
+        self.event_count = 0
+
     def start_trace(self: "TracerBase") -> None:
-        """Starts the trace by calling `sys.settrace` and backing-up the previous one.
+        """Starts the trace by registering the tracer with the interpreter.
         All Python code run after this will now be traced.
         
         :param self: An instance of a deriving class"""
         logger.info("Starting trace")
-        self._old_trace = sys.gettrace()
-        sys.settrace(self._on_trace_is_called)
         self._prev_line.clear()
+        self.old_global_vars.clear()
+        self._register()
 
     @contextlib.contextmanager
     def active_trace(self: "TracerBase") -> typing.Iterator[None]:
@@ -93,30 +116,84 @@ class TracerBase(abc.ABC):
         finally:
             self.stop_trace()
 
-    def stop_trace(self: "TracerBase"):
+    def stop_trace(self: "TracerBase", collect: bool = True):
         """
         Stops the trace and reinstates the previously set trace function.
-        Also deduplicates the accumulated trace data.
+        Also converts the accumulated rows, which are unique already, into `trace_data`.
 
         :param self: An instance of a deriving class
+        :param collect: When set to False, the accumulated rows are kept without being converted,
+        so that tracing can be resumed cheaply; see `trace_data_since`
         """
         logger.info("Stopping trace")
-        sys.settrace(self._old_trace)
+        self._unregister()
+        if not collect:
+            return
 
-        # Drop all references to the tracer
-        self.trace_data = self.trace_data.drop_duplicates(ignore_index=True)
+        logger.debug(f"Resolver cache: {self._resolver.cache_info()}")
+
+        logger.debug(
+            f"Traced {len(self._buffer)} unique rows out of {self._buffer.counts().sum()}"
+        )
+        self.trace_data = self.trace_data_since(0)
+
+    @property
+    def traced_rows(self) -> int:
+        """The amount of unique rows that have been traced since the tracer has been constructed"""
+        return len(self._buffer)
+
+    def trace_data_since(self, start: int, counted: bool = False) -> pd.DataFrame:
+        """
+        Converts the unique rows that have been traced after the first `start` rows into trace data.
+
+        :param start: The amount of rows to skip, e.g. the value of `traced_rows` at an earlier point
+        :param counted: When set to True, the trace data is followed by `Column.COUNT`, how often each row
+        has been traced so far. Events that are skipped by optimisations are not counted
+        :returns: The trace data of the rows, without references to the tracer
+        """
+        trace_data = self._buffer.to_frame(start)
+        if counted:
+            trace_data = trace_data.assign(**{Column.COUNT: self._buffer.counts(start)})
+        return self._without_tracer_rows(trace_data)
+
+    def trace_data_increment(self) -> pd.DataFrame:
+        """
+        Converts the rows that have been traced since the last call into trace data, followed by `Column.COUNT`,
+        how often each row has been traced since. Unlike with `trace_data_since`, rows that had been traced before
+        are included again once they have been traced again, so that the counts of consecutive increments,
+        e.g. of consecutive tests, add up to how often each row has been traced.
+        Events that are skipped by optimisations are not counted.
+
+        :returns: The trace data of the rows, without references to the tracer
+        """
+        increments = self._buffer.take_increments()
+        trace_data = self._buffer.select(increments.index).assign(
+            **{Column.COUNT: increments}
+        )
+        return self._without_tracer_rows(trace_data)
 
+    def _without_tracer_rows(self, trace_data: pd.DataFrame) -> pd.DataFrame:
+        # Drop all references to the tracer
         drop_masks = [
-            self.trace_data[Column.CLASS].isin(self.class_names_to_drop),
-            self.trace_data[Column.FUNCNAME].isin(self.function_names_to_drop),
+            trace_data[Column.CLASS].isin(self.class_names_to_drop),
+            trace_data[Column.FUNCNAME].isin(self.function_names_to_drop),
         ]
-        td_drop = self.trace_data[functools.reduce(operator.and_, drop_masks)]
-        self.trace_data = self.trace_data.drop(td_drop.index)
+        td_drop = trace_data[functools.reduce(operator.and_, drop_masks)]
+        trace_data = trace_data.drop(td_drop.index)
+
+        return trace_data.astype(Schema.TraceData)
+
+    def _register(self) -> None:
+        """Sets `_on_trace_is_called` as the trace function by calling `sys.settrace`, and backs-up the previous one."""
+        self._old_trace = sys.gettrace()
+        sys.settrace(self._on_trace_is_called)
 
-        self.trace_data = self.trace_data.astype(Schema.TraceData)
+    def _unregister(self) -> None:
+        """Reinstates the trace function that was set before `_register` was called."""
+        sys.settrace(self._old_trace)
 
     @abc.abstractmethod
-    def _on_trace_is_called(self, frame, event, arg: typing.Any) -> typing.Callable:
+    def _on_trace_is_called(self, frame, event, arg: typing.Any) -> typing.Callable | None:
         pass
 
 
@@ -126,6 +203,7 @@ class NoOperationTracer(TracerBase):
     Used to provide benchmarking, i.e. to measure the overhead by the "real" Tracer
     """
     def _on_trace_is_called(self, frame, event, arg: typing.Any) -> typing.Callable:
+        self.event_count += 1
         return self._on_trace_is_called
 
 
@@ -140,60 +218,147 @@ class Tracer(TracerBase):
         stdlib_path: pathlib.Path,
         venv_path: pathlib.Path,
         apply_opts: bool=True,
+        type_only_snapshots: bool=False,
+        saturation_threshold: int=10,
+        saturation_backoff: int=50,
+        recursion_depth: int=10,
+        ignore_rules: IgnoreRules | None=None,
+        saturation_cache: SaturationCache | None=None,
     ):
         """
         Construct instance with provided paths.
-        Additionally accepts an extra argument that indicates whether optimisations should be enabled
+        Additionally accepts extra arguments that indicate whether optimisations should be enabled,
+        and how variables are compared between events
         
         :param proj_path: Path to project's directory that shall be traced
         :param stdlib_path: Path to standard library's directory of the Python binary used to run the project's tests
         :param venv_path: Path to project's virtual environment's directory used to run the project's tests
         :param apply_opts: When set to True, tries to optimise loop execution by turning off tracing if enough iterations have passed since any types have changed
+        :param type_only_snapshots: When set to True, only the types of variables are remembered between events,
+        and a variable is only traced again if its type changes. Otherwise, variables are traced whenever their value changes
+        :param saturation_threshold: When optimising, line events are turned off for functions that have been called this many times in a row
+        without producing new trace data
+        :param saturation_backoff: When optimising, every call with this index to a function whose line events are turned off is still traced fully
+        :param recursion_depth: When optimising, recursive calls deeper than this are not traced, including the calls they make,
+        if the function has already been called recursively with the same argument types
+        :param ignore_rules: Patterns of code within the project that shall not be traced.
+        When optimising, the calls made by such code are not traced either
+        :param saturation_cache: When optimising, functions that have been saturated in previous runs start out saturated,
+        and the cache is updated with the functions that are saturated during tracing
         """
-        super().__init__(proj_path, stdlib_path, venv_path)
+        super().__init__(proj_path, stdlib_path, venv_path, ignore_rules)
         self.class_names_to_drop.append(Tracer.__name__)
         self.apply_opts = apply_opts
+        self.type_only_snapshots = type_only_snapshots
+
+        if self.type_only_snapshots:
+            self._take_snapshot = _snapshot_types
+            self._snapshot_of = _type_snapshot
+            self._has_changed = _type_has_changed
+        else:
+            self._take_snapshot = _snapshot_values
+            self._snapshot_of = _value_snapshot
+            self._has_changed = _value_has_changed
+
+        # Map of code objects to the lines on which they may assign or delete global variables
+        self._global_store_lines: dict[types.CodeType, frozenset[int]] = dict()
+
+        # Map of code objects to the class they are defined in, or None if they are not
+        self._code2class: dict[types.CodeType, type | None] = dict()
 
         if self.apply_opts:
             self.optimisation_stack: list[Optimisation] = list()
+            self.saturation = TypeSaturation(
+                calls_until_saturation=saturation_threshold,
+                backoff=saturation_backoff,
+                cache=saturation_cache,
+            )
+            self.recursion_depth = recursion_depth
+
+            # Map of code objects to the amount of their traced calls that have not returned yet
+            self._call_depths: dict[types.CodeType, int] = dict()
 
-    def stop_trace(self) -> None:
+    def stop_trace(self, collect: bool = True) -> None:
         # Clear out all optimisations
         if self.apply_opts:
             self.optimisation_stack.clear()
 
-        super().stop_trace()
+        super().stop_trace(collect)
+
+        # Only called once the tracer is unregistered, so that the call is not traced itself
+        if self.apply_opts:
+            self.saturation.clear_calls()
+            self._call_depths.clear()
 
     def _update_optimisations(self, fwm: FrameWithMetadata) -> None:
         """Remove optimisations that are marked as TriggerStatus.EXITED, and insert new ones as needed."""
-                # Remove dead optimisations
-        while self.optimisation_stack:
-            top = self.optimisation_stack[-1]
-            if top.status() == TriggerStatus.EXITED:
+        # Remove dead optimisations; loops of frames that have been left may lie below live ones
+        if any(
+            opt.status() == TriggerStatus.EXITED for opt in self.optimisation_stack
+        ):
+            logger.debug(
+                f"Removing {[opt.__class__.__name__ for opt in self.optimisation_stack if opt.status() == TriggerStatus.EXITED]} from optimisations"
+            )
+            self.optimisation_stack[:] = [
+                opt
+                for opt in self.optimisation_stack
+                if opt.status() != TriggerStatus.EXITED
+            ]
+
+        # Optimisations are only applied to code that is traced
+        if self._is_optimising():
+            return
+
+        if fwm.event == "call":
+            code = fwm._frame.f_code
+
+            # Entering excluded code, whose calls are not traced until it returns
+            if self._scopes.scope(code) == CodeScope.EXCLUDED:
+                logger.debug(f"Applying Ignore for {fwm.co_filename}:{code.co_name}")
+                self.optimisation_stack.append(Ignore(fwm))
+                return
+
+            # Entering a recursion that is not optimised yet
+            depth = self._call_depths.get(code, 0)
+            if depth and not any(
+                isinstance(opt, TypeStableRecursion) and opt.fwm._frame.f_code is code
+                for opt in self.optimisation_stack
+            ):
                 logger.debug(
-                    f"Removing {self.optimisation_stack[-1].__class__.__name__} from optimisations"
+                    f"Applying TypeStableRecursion for {fwm.co_filename}:{code.co_name}"
                 )
-                self.optimisation_stack.pop()
-            else:
-                break
-
-        # Appending; only one optimisation at a time
-        # Entering a loop for the first time
-        if not self.optimisation_stack or not isinstance(
-            self.optimisation_stack[-1], TypeStableLoop
-        ):
-            if fwm.is_for_loop():
+                self.optimisation_stack.append(
+                    TypeStableRecursion(fwm, depth + 1, self.recursion_depth)
+                )
+
+        # Entering a loop that is not optimised yet; nested loops are optimised by their own instance
+        if fwm.is_loop_head():
+            tsl = TypeStableLoop(fwm)
+            if tsl not in self.optimisation_stack:
                 logger.debug(
-                    f"Applying TypeStableLoop for {inspect.getframeinfo(fwm._frame)}"
+                    f"Applying TypeStableLoop for {fwm.co_filename}:{fwm.f_lineno}"
                 )
-                tsl = TypeStableLoop(fwm)
-                if not self.optimisation_stack or tsl != self.optimisation_stack[-1]:
-                    self.optimisation_stack.append(tsl)
-                    return
+                self.optimisation_stack.append(tsl)
+
+    def _is_optimising(self) -> bool:
+        """Return True if any active optimisation has currently turned off tracing."""
+        return self.apply_opts and any(
+            opt.status() in Optimisation.OPTIMIZING_STATES
+            for opt in self.optimisation_stack
+        )
 
     def _advance_optimisations(self, fwm: FrameWithMetadata) -> None:
         for optimisation in self.optimisation_stack:
-            optimisation.advance(fwm, self.trace_data)
+            optimisation.advance(fwm)
+
+    def _on_new_rows(self, fwm: FrameWithMetadata, new_rows: list[TraceRow]) -> None:
+        """Passes the line numbers of rows that had not been traced before to the active optimisations."""
+        if not self.optimisation_stack:
+            return
+
+        line_numbers = [row[_LINENO_INDEX] for row in new_rows]
+        for optimisation in self.optimisation_stack:
+            optimisation.on_new_rows(fwm, line_numbers)
 
     def _on_call(self, frame, batch: BatchTraceUpdate) -> BatchTraceUpdate:
         names2types = dict()
@@ -220,24 +385,50 @@ class Tracer(TracerBase):
         return batch.returns(names2types)
 
     def _on_line(
-        self, frame, real_line_number: int, batch: BatchTraceUpdate
+        self,
+        frame,
+        real_line_number: int,
+        batch: BatchTraceUpdate,
+        update_globals: bool,
     ) -> BatchTraceUpdate:
         local_names2types = self._get_new_defined_variables_with_types(
-            self.old_local_vars[frame.f_code.co_name],
+            self.old_local_vars.get(frame, {}),
             frame.f_locals,
         )
         with_local = batch.local_variables(
             line_number=real_line_number, names2types=local_names2types
         )
 
-        global_names2types = self._get_new_defined_variables_with_types(
-            self.old_global_vars[frame.f_code.co_filename],
-            frame.f_globals,
-        )
+        if not update_globals:
+            return with_local
+
+        global_names2types = self._get_changed_globals_with_types(frame)
         with_global = with_local.global_variables(global_names2types)
 
         return with_global
 
+    def _get_changed_globals_with_types(
+        self, frame
+    ) -> dict[str, tuple[str | None, str]]:
+        """Gets the global variables that changed since the module's snapshot was last updated, and updates it."""
+        f_globals = frame.f_globals
+        snapshot = self.old_global_vars.setdefault(frame.f_code.co_filename, dict())
+
+        names2types = self._get_new_defined_variables_with_types(snapshot, f_globals)
+        for name in names2types:
+            snapshot[name] = self._snapshot_of(f_globals[name])
+
+        return names2types
+
+    def _stores_globals(self, code: types.CodeType, line_number: int) -> bool:
+        """Return True if the given line of the code object may assign or delete global variables."""
+        try:
+            lines = self._global_store_lines[code]
+        except KeyError:
+            lines = _get_global_store_lines(code)
+            self._global_store_lines[code] = lines
+        return line_number in lines
+
     def _on_class_function_return(
         self, frame, batch: BatchTraceUpdate
     ) -> BatchTraceUpdate:
@@ -258,29 +449,35 @@ class Tracer(TracerBase):
 
         return batch.members(names2types)
 
-    def _on_trace_is_called(self, frame, event, arg: typing.Any) -> typing.Callable:
+    def _on_trace_is_called(self, frame, event, arg: typing.Any) -> typing.Callable | None:
         """Called during execution of a function which is traced. Collects trace data from the frame."""
-        # Ignore out of project files
-        file_name = pathlib.Path(frame.f_code.co_filename)
+        self.event_count += 1
 
-        if not file_name.is_relative_to(self.proj_path):
-            return self._on_trace_is_called
+        # Ignore out of project files; returning None on the call event
+        # means no further events are emitted for this frame
+        scope = self._scopes.scope(frame.f_code)
+        if scope == CodeScope.IGNORED:
+            return None
+
+        if event == "call" and scope == CodeScope.EXCLUDED:
+            frame.f_trace_lines = False
 
         if self.apply_opts:
-            fwm = FrameWithMetadata(frame)
+            fwm = FrameWithMetadata(frame, event, self._scopes.line_indices)
 
             self._advance_optimisations(fwm)
             self._update_optimisations(fwm)
 
             # Tracing has been toggled off for this line now, simply return
-            if any(
-                opt.status() in Optimisation.OPTIMIZING_STATES
-                for opt in self.optimisation_stack
-            ):
+            if self._is_optimising():
                 return self._on_trace_is_called
 
+        # Excluded code is only observed to notice when the calls it makes are over
+        if scope == CodeScope.EXCLUDED:
+            return None
+
         function_name = frame.f_code.co_name
-        enclosing_class = _get_class_in_frame(frame)
+        enclosing_class = self._get_enclosing_class(frame)
 
         if enclosing_class is not None:
             modname = self._resolver.get_module_and_name(enclosing_class)
@@ -290,10 +487,13 @@ class Tracer(TracerBase):
         else:
             class_module, class_name = None, None
 
-        file_name = file_name.relative_to(self.proj_path)
+        file_name = self._scopes.file_name(frame.f_code)
+        assert file_name is not None
         line_number = frame.f_lineno
 
-        frameinfo = inspect.getframeinfo(frame)
+        # Looking up the frame's source is expensive, and only done for logging
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Tracing {event}: {inspect.getframeinfo(frame)}")
 
         batch = BatchTraceUpdate(
             file_name=file_name,
@@ -304,21 +504,31 @@ class Tracer(TracerBase):
         )
 
         if event == "call":
-            logger.info(f"Tracing call: {frameinfo}")
-
-            # Add to storage
-            self.old_local_vars[function_name] = dict()
-            self.old_global_vars[frame.f_code.co_filename] = dict()
+            # Add to storage; globals that exist before the module is first called into are not traced
+            self.old_local_vars[frame] = dict()
+            if frame.f_code.co_filename not in self.old_global_vars:
+                self.old_global_vars[frame.f_code.co_filename] = self._take_snapshot(
+                    frame.f_globals
+                )
             self._prev_line.append(line_number)
 
+            if self.apply_opts:
+                code = frame.f_code
+                self._call_depths[code] = self._call_depths.get(code, 0) + 1
+
+                # Functions that keep producing the same trace data have their line events turned off
+                if scope == CodeScope.TRACED:
+                    self._set_traces_lines(frame, self.saturation.enter(frame))
+
             batch = self._on_call(frame, batch)
 
         elif event == "return":
-            logger.info(f"Tracing return: {frameinfo}")
-
-            # Catch locals and globals that are changed on last line
+            # Catch locals and globals that are changed on last line,
+            # unless no lines have been traced for this frame.
+            # Globals may also have been changed by untraced code, so they are always compared here
             line_number = self._prev_line[-1]
-            batch = self._on_line(frame, line_number, batch)
+            if scope == CodeScope.TRACED and self._traces_lines(frame):
+                batch = self._on_line(frame, line_number, batch, update_globals=True)
 
             # Adds tracing data of class members if the return is from a class function / method.
             if enclosing_class is not None:
@@ -327,47 +537,88 @@ class Tracer(TracerBase):
             batch = self._on_return(frame, arg, batch)
 
             # Remove from storage
-            self.old_local_vars.pop(function_name)
-            self.old_global_vars.pop(frame.f_code.co_filename)
+            self.old_local_vars.pop(frame, None)
             self._prev_line.pop()
 
+            if self.apply_opts:
+                self._leave_call(frame.f_code)
+
         elif event == "line":
             line_number, self._prev_line[-1] = self._prev_line[-1], line_number
-            logger.info(f"Tracing line: {frameinfo}")
-            batch = self._on_line(frame, line_number, batch)
-
-        self._update_trace_data_with(batch)
-
-        self.old_local_vars[function_name] = frame.f_locals.copy()
-        self.old_global_vars[frame.f_code.co_filename] = frame.f_globals.copy()
+            batch = self._on_line(
+                frame,
+                line_number,
+                batch,
+                update_globals=self._stores_globals(frame.f_code, line_number),
+            )
+
+        new_rows = self._update_trace_data_with(batch)
         if self.apply_opts:
-            self.trace_data = self.trace_data.drop_duplicates()
+            self.saturation.record(len(new_rows))
+            if new_rows:
+                self._on_new_rows(fwm, new_rows)
+            if event == "return":
+                self.saturation.exit(frame)
+
+        # The snapshot of a returning call is not needed anymore, and would keep its frame alive
+        if event != "return":
+            self.old_local_vars[frame] = self._take_snapshot(frame.f_locals)
 
         return self._on_trace_is_called
 
-    def _update_trace_data_with(self, batch_update: BatchTraceUpdate) -> None:
+    def _get_enclosing_class(self, frame) -> type | None:
+        """Get the class the frame's code object is defined in, looking it up only once per code object."""
+        code = frame.f_code
+        try:
+            return self._code2class[code]
+        except KeyError:
+            pass
+
+        enclosing_class = _get_class_by_qualname(frame)
+        if enclosing_class is None:
+            enclosing_class = _get_class_in_frame(frame)
+
+        # A method may be called before its class is bound to a global name, e.g. from the class body.
+        # Only remember a miss once that name is bound, as the lookup would fail again until then anyway
+        if enclosing_class is not None or not _may_be_unbound_method(frame):
+            self._code2class[code] = enclosing_class
+        return enclosing_class
+
+    def _update_trace_data_with(self, batch_update: BatchTraceUpdate) -> list[TraceRow]:
         """
-        Constructs a DataFrame from the provided updates, and appends
-        it to the existing trace data collection.
+        Appends the rows of the provided updates to the buffered trace data.
+
+        :returns: The rows that had not been traced before
         """
+        append = self._buffer.append
+        return [row for row in batch_update.to_rows() if append(row)]
 
-        batch_df = batch_update.to_frame()
-        if batch_df.empty:
-            return
-        self.trace_data = pd.concat(
-            [self.trace_data, batch_df], ignore_index=True
-        ).astype(Schema.TraceData)
+    def _leave_call(self, code: types.CodeType) -> None:
+        depth = self._call_depths.get(code, 0) - 1
+        if depth > 0:
+            self._call_depths[code] = depth
+        else:
+            self._call_depths.pop(code, None)
+
+    def _traces_lines(self, frame) -> bool:
+        """Return False if line events have been turned off for the frame because its function is saturated."""
+        return not self.apply_opts or self.saturation.traces_lines(frame)
+
+    def _set_traces_lines(self, frame, enabled: bool) -> None:
+        """Turns line events on or off for the frame that is being called."""
+        frame.f_trace_lines = enabled
 
     def _get_new_defined_variables_with_types(
         self,
         prev_vars2vals: dict[str, typing.Any],
         new_vars2vals: dict[str, typing.Any],
     ) -> dict[str, tuple[str | None, str]]:
-        """Gets the new defined variable from one frame to the next frame."""
+        """Gets the new defined variable from one frame to the next frame, comparing against a snapshot taken by `_take_snapshot`."""
         names2types = {}
+        has_changed = self._has_changed
 
         for name, value in new_vars2vals.items():
-            if name not in prev_vars2vals or value != prev_vars2vals[name]:
+            if name not in prev_vars2vals or has_changed(prev_vars2vals[name], value):
                 valt = type(value)
                 modname = self._resolver.get_module_and_name(valt)
                 if modname is None:
@@ -382,6 +633,312 @@ class Tracer(TracerBase):
         )
 
 
+_MONITORING: typing.Any = getattr(sys, "monitoring", None)
+
+
+class MonitoringTracer(Tracer):
+    """
+    Tracer that receives its events from `sys.monitoring` (PEP 669) instead of `sys.settrace`,
+    which is only available from Python 3.12 onwards.
+
+    Call events are received for every code object, but return and line events are only enabled
+    for code objects within the project. Locations that do not need to be traced, such as code outside of
+    the project or lines skipped by an optimisation, are answered with `sys.monitoring.DISABLE`, so that
+    CPython stops calling back into Python for them. The events are then handled exactly like in `Tracer`.
+    Events are received from every thread, but like with `sys.settrace`, only those of the thread
+    that started the trace are handled.
+    """
+
+    # Tool ids that are not reserved for debuggers, coverage tools or optimisers come first
+    _TOOL_IDS = (3, 4, 2)
+
+    def __init__(
+        self,
+        proj_path: pathlib.Path,
+        stdlib_path: pathlib.Path,
+        venv_path: pathlib.Path,
+        **kwargs,
+    ):
+        """
+        Construct instance with provided paths, see `Tracer` for the remaining arguments.
+
+        :raises RuntimeError: If `sys.monitoring` is not available in the running interpreter
+        """
+        if not MonitoringTracer.is_available():
+            raise RuntimeError(
+                f"{MonitoringTracer.__name__} requires sys.monitoring, which is only available from Python 3.12 onwards"
+            )
+        super().__init__(proj_path, stdlib_path, venv_path, **kwargs)
+        self.class_names_to_drop.append(MonitoringTracer.__name__)
+
+        self._tool_id: int | None = None
+        self._thread_id: int | None = None
+
+        # Code objects whose return and line events have been enabled
+        self._monitored: set[types.CodeType] = set()
+
+        # Code objects with locations that have been disabled while an optimisation was active
+        self._disabled_in: set[types.CodeType] = set()
+
+        # Code objects whose line events have been turned off because they are saturated
+        self._lines_disabled: set[types.CodeType] = set()
+
+    @staticmethod
+    def is_available() -> bool:
+        """Return True if the running interpreter offers `sys.monitoring`."""
+        return _MONITORING is not None
+
+    def _register(self) -> None:
+        """Acquires a `sys.monitoring` tool id, registers the callbacks and enables call events globally."""
+        events = _MONITORING.events
+        self._tool_id = self._acquire_tool_id()
+        self._thread_id = threading.get_ident()
+
+        for event, callback in self._callbacks().items():
+            _MONITORING.register_callback(self._tool_id, event, callback)
+
+        _MONITORING.set_events(
+            self._tool_id, events.PY_START | events.PY_RESUME | events.PY_UNWIND
+        )
+
+    def _unregister(self) -> None:
+        """Disables all events, unregisters the callbacks and frees the tool id again."""
+        if self._tool_id is None:
+            return
+
+        events = _MONITORING.events
+        _MONITORING.set_events(self._tool_id, events.NO_EVENTS)
+        for code in self._monitored:
+            _MONITORING.set_local_events(self._tool_id, code, events.NO_EVENTS)
+        self._monitored.clear()
+        self._lines_disabled.clear()
+        self._disabled_in.clear()
+
+        for event in self._callbacks():
+            _MONITORING.register_callback(self._tool_id, event, None)
+
+        # Locations disabled by this tracer would otherwise stay disabled for the next user of the tool id
+        _MONITORING.restart_events()
+
+        _MONITORING.free_tool_id(self._tool_id)
+        self._tool_id = None
+        self._thread_id = None
+
+    def _acquire_tool_id(self) -> int:
+        for tool_id in MonitoringTracer._TOOL_IDS:
+            if _MONITORING.get_tool(tool_id) is None:
+                _MONITORING.use_tool_id(tool_id, PROJECT_NAME)
+                return tool_id
+
+        raise RuntimeError("All sys.monitoring tool ids are in use, unable to trace execution!")
+
+    def _callbacks(self) -> dict[int, typing.Callable]:
+        events = _MONITORING.events
+        return {
+            events.PY_START: self._on_py_start,
+            events.PY_RESUME: self._on_py_start,
+            events.PY_RETURN: self._on_py_return,
+            events.PY_YIELD: self._on_py_return,
+            events.PY_UNWIND: self._on_py_unwind,
+            events.LINE: self._on_line_event,
+        }
+
+    def _on_py_start(self, code: types.CodeType, instruction_offset: int) -> typing.Any:
+        if not self._is_monitored(code):
+            return _MONITORING.DISABLE
+        # Disabling locations would disable them for the tracing thread too
+        if threading.get_ident() != self._thread_id:
+            return None
+        return self._dispatch(sys._getframe(1), "call", None)
+
+    def _on_py_return(
+        self, code: types.CodeType, instruction_offset: int, retval: typing.Any
+    ) -> typing.Any:
+        if threading.get_ident() != self._thread_id:
+            return None
+        return self._dispatch(sys._getframe(1), "return", retval)
+
+    def _on_py_unwind(
+        self, code: types.CodeType, instruction_offset: int, exception: BaseException
+    ) -> None:
+        # Unwinding cannot be enabled per code object, and may not be disabled either.
+        # sys.settrace emits a return event with None as its argument in this case
+        if code in self._monitored and threading.get_ident() == self._thread_id:
+            self._dispatch(sys._getframe(1), "return", None)
+
+    def _on_line_event(self, code: types.CodeType, line_number: int) -> typing.Any:
+        if threading.get_ident() != self._thread_id:
+            return None
+        return self._dispatch(sys._getframe(1), "line", None)
+
+    def _dispatch(self, frame, event: str, arg: typing.Any) -> typing.Any:
+        try:
+            self._on_trace_is_called(frame, event, arg)
+        except BaseException:
+            # Like sys.settrace, which unsets trace functions that raise
+            self._unregister()
+            raise
+
+        # Locations that are skipped by an optimisation are turned off until the optimisation is over.
+        # Call events are enabled globally, and disabling them could only be undone for all code objects at once
+        if event != "call" and self._disables_locations():
+            self._disabled_in.add(frame.f_code)
+            return _MONITORING.DISABLE
+
+        if self._disabled_in:
+            self._restart_disabled_locations()
+
+        return None
+
+    def _restart_disabled_locations(self) -> None:
+        # Unlike sys.monitoring.restart_events, which would also restart the locations outside of the project,
+        # only the local events of the code objects with disabled locations are restarted, by setting them anew
+        events = _MONITORING.events
+        for code in self._disabled_in:
+            local_events = _MONITORING.get_local_events(self._tool_id, code)
+            _MONITORING.set_local_events(self._tool_id, code, events.NO_EVENTS)
+            _MONITORING.set_local_events(self._tool_id, code, local_events)
+        self._disabled_in.clear()
+
+    def _disables_locations(self) -> bool:
+        """Return True if tracing has been turned off by optimisations that allow the skipped locations to be disabled."""
+        if not self.apply_opts:
+            return False
+
+        optimising = [
+            opt
+            for opt in self.optimisation_stack
+            if opt.status() in Optimisation.OPTIMIZING_STATES
+        ]
+        return bool(optimising) and all(opt.DISABLES_LOCATIONS for opt in optimising)
+
+    def _set_traces_lines(self, frame, enabled: bool) -> None:
+        # Events can only be enabled per code object, not per frame
+        code = frame.f_code
+        if enabled != (code in self._lines_disabled):
+            return
+
+        events = _MONITORING.events
+        local_events = events.PY_RETURN | events.PY_YIELD
+        if enabled:
+            local_events |= events.LINE
+            self._lines_disabled.discard(code)
+        else:
+            self._lines_disabled.add(code)
+        _MONITORING.set_local_events(self._tool_id, code, local_events)
+
+    def _is_monitored(self, code: types.CodeType) -> bool:
+        if code in self._monitored:
+            return True
+
+        scope = self._scopes.scope(code)
+        if scope == CodeScope.IGNORED:
+            return False
+
+        events = _MONITORING.events
+        local_events = events.PY_RETURN | events.PY_YIELD
+        if scope == CodeScope.TRACED:
+            local_events |= events.LINE
+        _MONITORING.set_local_events(self._tool_id, code, local_events)
+        self._monitored.add(code)
+
+        return True
+
+
+def _snapshot_values(vars2vals: typing.Mapping[str, typing.Any]) -> dict[str, typing.Any]:
+    return dict(vars2vals)
+
+
+def _value_snapshot(value: typing.Any) -> typing.Any:
+    return value
+
+
+def _value_has_changed(old: typing.Any, new: typing.Any) -> bool:
+    if old is new:
+        return False
+
+    # Comparisons may raise, or return non-booleans such as numpy's elementwise results,
+    # which cannot be converted to a single truth value
+    try:
+        return bool(old != new)
+    except Exception:
+        return True
+
+
+def _snapshot_types(vars2vals: typing.Mapping[str, typing.Any]) -> dict[str, typing.Any]:
+    # Only the identity of the type is stored, which neither keeps values alive nor requires comparing them
+    return {name: _type_snapshot(value) for name, value in vars2vals.items()}
+
+
+def _type_snapshot(value: typing.Any) -> typing.Any:
+    return id(type(value))
+
+
+def _type_has_changed(old: typing.Any, new: typing.Any) -> bool:
+    return old != id(type(new))
+
+
+_GLOBAL_STORES = frozenset(("STORE_GLOBAL", "DELETE_GLOBAL"))
+_NAME_STORES = frozenset(("STORE_NAME", "DELETE_NAME"))
+
+
+def _get_global_store_lines(code: types.CodeType) -> frozenset[int]:
+    # Without new locals, e.g. on module level, names are stored in the globals
+    opnames = _GLOBAL_STORES
+    if not code.co_flags & inspect.CO_NEWLOCALS:
+        opnames = opnames | _NAME_STORES
+
+    lines: set[int] = set()
+    line_number = None
+    for instruction in dis.get_instructions(code):
+        # Before Python 3.13, only the first instruction of each line knows its line number
+        if hasattr(instruction, "line_number"):
+            line_number = getattr(instruction, "line_number")
+        elif instruction.starts_line is not None:
+            line_number = instruction.starts_line
+
+        if instruction.opname in opnames and line_number is not None:
+            lines.add(line_number)
+
+    return frozenset(lines)
+
+
+def _may_be_unbound_method(frame) -> bool:
+    # Without co_qualname, there is no telling
+    qualname = getattr(frame.f_code, "co_qualname", None)
+    if qualname is None:
+        return False
+
+    *owners, _ = qualname.split(".")
+    return bool(owners) and "<locals>" not in owners and owners[0] not in frame.f_globals
+
+
+def _get_class_by_qualname(frame) -> type | None:
+    # co_qualname is only available from Python 3.11 onwards
+    code = frame.f_code
+    qualname = getattr(code, "co_qualname", None)
+    if qualname is None:
+        return None
+
+    # Classes defined in functions cannot be reached from the globals
+    *owners, function_name = qualname.split(".")
+    if not owners or "<locals>" in owners:
+        return None
+
+    candidate = frame.f_globals.get(owners[0])
+    for owner in owners[1:]:
+        candidate = getattr(candidate, owner, None)
+
+    if not inspect.isclass(candidate):
+        return None
+
+    member = getattr(candidate, function_name, None)
+    if inspect.isfunction(member) and member.__code__ == code:
+        return candidate
+
+    return None
+
+
 def _get_class_in_frame(frame) -> type | None:
     code = frame.f_code
     function_name = code.co_name
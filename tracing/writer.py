@@ -0,0 +1,238 @@
+"""
+Writing of trace data and benchmarks on a background thread, so that serialising them does not
+add to the wall time of the traced tests.
+"""
+from __future__ import annotations
+
+import atexit
+from dataclasses import dataclass
+import io
+import json
+import logging
+import os
+import pathlib
+import pickle
+import queue
+import tempfile
+import threading
+import typing
+
+import numpy as np
+import pandas as pd
+
+import constants
+from common import compression, trace_data_file
+from common.trace_store import TraceStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Write:
+    path: pathlib.Path
+    serialise: typing.Callable[[], bytes]
+
+
+@dataclass
+class _Insert:
+    path: pathlib.Path
+    trace_data: pd.DataFrame
+
+
+@dataclass
+class _CloseStores:
+    pass
+
+
+class BackgroundWriter:
+    """
+    Serialises, optionally compresses and writes files, or inserts into trace stores, on a single background thread.
+
+    Writes are queued in the order they are submitted; once `max_pending` writes are queued,
+    further submissions block until the thread has caught up, which bounds the memory held by pending writes.
+    Every file is written to a temporary file, synced to disk, and atomically moved to its destination,
+    so that readers never see partially written files. The submitted objects must not be modified afterwards.
+    Trace stores are kept open by the thread until the writer is drained, and insertions into the same store
+    that are queued one after another are performed in a single transaction.
+    """
+
+    def __init__(self, max_pending: int = constants.MAX_PENDING_WRITES):
+        """
+        :param max_pending: The amount of writes that may be queued before submissions block
+        """
+        self._queue: queue.Queue[_Write | _Insert | _CloseStores] = queue.Queue(
+            maxsize=max_pending
+        )
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+        # The first error of a write, which is raised by the next call to drain
+        self._error: BaseException | None = None
+
+        # The trace stores inserted into, which are only used by the thread
+        self._stores: dict[pathlib.Path, TraceStore] = dict()
+
+    def submit_trace_data(
+        self,
+        path: pathlib.Path,
+        trace_data: pd.DataFrame,
+        output_format: trace_data_file.Format = "columnar",
+        compress: compression.Compression | None = None,
+    ) -> None:
+        """
+        Queue serialising trace data.
+
+        :param path: The path to write the trace data to
+        :param trace_data: The trace data to serialise
+        :param output_format: Whether to write the trace data in the columnar format of `common.trace_data_file`,
+        which can be memory-mapped, or as a pickle
+        :param compress: The compression to apply to pickles, if any; columnar files are not compressed
+        """
+        if output_format == "columnar":
+            self._submit(_Write(path, lambda: trace_data_file.serialise(trace_data)))
+            return
+
+        self._submit(
+            _Write(
+                path,
+                lambda: compression.compress(
+                    pickle.dumps(trace_data, protocol=pickle.HIGHEST_PROTOCOL), compress
+                ),
+            )
+        )
+
+    def submit_to_store(self, path: pathlib.Path, trace_data: pd.DataFrame) -> None:
+        """
+        Queue inserting trace data into a trace store, see `common.trace_store`.
+
+        :param path: The path of the trace store, which is created if it does not exist yet
+        :param trace_data: The trace data to insert in a single transaction
+        """
+        self._submit(_Insert(path, trace_data))
+
+    def submit_benchmarks(self, path: pathlib.Path, benchmarks: np.ndarray) -> None:
+        """
+        Queue saving benchmarks in NumPy's format.
+
+        :param path: The path to save the benchmarks to; like `np.save`, `.npy` is appended if missing
+        :param benchmarks: The benchmarks to save
+        """
+        if path.suffix != ".npy":
+            path = path.with_name(path.name + ".npy")
+        self._submit(_Write(path, lambda: _serialise_array(benchmarks)))
+
+    def submit_json(self, path: pathlib.Path, record: dict[str, typing.Any]) -> None:
+        """
+        Queue writing a record as JSON.
+
+        :param path: The path to write the record to
+        :param record: The record, consisting of values that can be serialised to JSON
+        """
+        self._submit(_Write(path, lambda: json.dumps(record, indent=2).encode()))
+
+    def drain(self) -> None:
+        """
+        Block until all submitted writes have been completed, and close the trace stores that have been inserted into.
+
+        :raises: The first error a write has failed with since the last call, if any
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_CloseStores())
+        self._queue.join()
+
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _submit(self, write: _Write | _Insert) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"{constants.PROJECT_NAME}-writer", daemon=True
+                )
+                self._thread.start()
+
+        self._queue.put(write)
+
+    def _run(self) -> None:
+        following: _Write | _Insert | _CloseStores | None = None
+        while True:
+            write = following if following is not None else self._queue.get()
+            following = None
+
+            inserts: list[_Insert] = list()
+            if isinstance(write, _Insert):
+                # Insertions into the same store that have already been queued share a transaction
+                inserts.append(write)
+                while following is None:
+                    try:
+                        queued = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(queued, _Insert) and queued.path == write.path:
+                        inserts.append(queued)
+                    else:
+                        following = queued
+
+            try:
+                if isinstance(write, _Insert):
+                    self._store(write.path).insert_all(insert.trace_data for insert in inserts)
+                elif isinstance(write, _CloseStores):
+                    self._close_stores()
+                else:
+                    _write_atomically(write.path, write.serialise())
+            except BaseException as e:
+                target = "trace stores" if isinstance(write, _CloseStores) else write.path
+                logger.error(f"Failed to write {target}: {e}")
+                if self._error is None:
+                    self._error = e
+            finally:
+                for _ in range(max(len(inserts), 1)):
+                    self._queue.task_done()
+
+    def _store(self, path: pathlib.Path) -> TraceStore:
+        store = self._stores.get(path)
+        if store is None:
+            store = self._stores[path] = TraceStore(path)
+        return store
+
+    def _close_stores(self) -> None:
+        stores, self._stores = list(self._stores.values()), dict()
+        for store in stores:
+            store.close()
+
+
+def _serialise_array(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+def _write_atomically(path: pathlib.Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+_SHARED: BackgroundWriter | None = None
+
+
+def shared_writer() -> BackgroundWriter:
+    """
+    Get the writer that is shared by all tracing in this process, which is drained at interpreter exit.
+
+    :returns: The shared writer
+    """
+    global _SHARED
+    if _SHARED is None:
+        _SHARED = BackgroundWriter()
+        atexit.register(_SHARED.drain)
+    return _SHARED
@@ -1,4 +1,5 @@
 import logging
+import os
 import click
 import pathlib
 from typegen.trace_data_file_collector import TraceDataFileCollector, DataFileCollector
@@ -7,6 +8,7 @@ from typegen.trace_data_file_collector import TraceDataFileCollector, DataFileCo
 from constants import CONFIG_FILE_NAME
 
 from common import ptconfig
+from common.trace_store import TraceStore, store_path
 
 from .unification import TraceDataFilter
 from .unification.drop_dupes import DropDuplicatesFilter
@@ -75,6 +77,21 @@ __all__ = [
     required=False,
     default=False,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="Amount of trace data files that are loaded in parallel",
+    required=False,
+    default=os.cpu_count() or 1,
+)
+@click.option(
+    "--processes",
+    help="Load trace data files in a pool of processes rather than threads",
+    is_flag=True,
+    required=False,
+    default=False,
+)
 def main(**params):
     projpath, verb, strat_name, unifiers = (
         params["path"],
@@ -111,14 +128,39 @@ def main(**params):
 
         filters.append(impl)
 
+    filter_list = TraceDataFilter(ident=TraceDataFilterList.ident, filters=filters)
+
+    if pytypes_cfg.pytypes.trace_store:
+        with TraceStore(store_path(pytypes_cfg)) as store:
+            print(f"Rows of trace data in {store.path}: {len(store)}")
+            if filter_list.applies_per_file():
+                # The trace data is queried and filtered file by file rather than loaded as a whole
+                typegen = TypeHintGenerator(
+                    ident=strat_name, types=store, trace_data_filter=filter_list
+                )
+            else:
+                logging.info(
+                    "Querying all trace data from the store, as the unifiers compare rows of different files"
+                )
+                filtered = filter_list.apply(store.query())
+                print(f"Shape of filtered trace data: {filtered.shape}")
+                typegen = TypeHintGenerator(ident=strat_name, types=filtered)
+            typegen.apply(pytypes_cfg.pytypes.proj_path)
+        return
+
     traced_df_folder = pathlib.Path(pytypes_cfg.pytypes.proj_path)
-    collector = TraceDataFileCollector()
+    collector = TraceDataFileCollector(
+        compact=True,
+        counted=True,
+        workers=params["jobs"],
+        use_processes=params["processes"],
+        streaming=True,
+    )
     collector.collect_data(traced_df_folder, include_also_files_in_subdirectories=True)
 
     td_df = collector.trace_data
     print(f"Shape of trace data: {td_df.shape}")
 
-    filter_list = TraceDataFilter(ident=TraceDataFilterList.ident, filters=filters)
     filtered = filter_list.apply(collector.trace_data)
 
     print(f"Shape of filtered trace data: {filtered.shape}")
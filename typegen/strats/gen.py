@@ -7,7 +7,10 @@ import typing
 import libcst as cst
 import pandas as pd
 
+from common import trace_data_encoding
+from common.trace_store import TraceStore
 from constants import Column
+from typegen.unification.filter_base import TraceDataFilter
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +21,8 @@ class TypeHintGenerator(abc.ABC):
     _REGISTRY: dict[str, typing.Type["TypeHintGenerator"]] = {}
     _PATH_GLOB = "*.py"
 
-    types: pd.DataFrame
+    types: pd.DataFrame | TraceStore
+    trace_data_filter: TraceDataFilter | None
 
     @classmethod
     def __init_subclass__(cls, **kwargs):
@@ -26,11 +30,29 @@ class TypeHintGenerator(abc.ABC):
         TypeHintGenerator._REGISTRY[cls.ident] = cls
 
     def __new__(
-        cls: typing.Type["TypeHintGenerator"], /, ident: str, types: pd.DataFrame
+        cls: typing.Type["TypeHintGenerator"],
+        /,
+        ident: str,
+        types: pd.DataFrame | TraceStore,
+        trace_data_filter: TraceDataFilter | None = None,
     ) -> "TypeHintGenerator":
+        """
+        :param ident: The generation style of type hints
+        :param types: The trace data, or a trace store whose trace data is queried file by file,
+        so that it is never loaded as a whole
+        :param trace_data_filter: A filter that is applied to the trace data of each file separately,
+        which must therefore not compare rows of different files, see `TraceDataFilter.applies_per_file`
+        """
+        if trace_data_filter is not None and not trace_data_filter.applies_per_file():
+            raise ValueError(
+                f"{type(trace_data_filter).__name__} compares rows of different files, "
+                "and cannot be applied to the trace data of each file separately"
+            )
+
         if (subcls := TypeHintGenerator._REGISTRY.get(ident, None)) is not None:
             subinst = object.__new__(subcls)
             subinst.types = types
+            subinst.trace_data_filter = trace_data_filter
 
             return subinst
 
@@ -46,11 +68,14 @@ class TypeHintGenerator(abc.ABC):
         """Applies the type hint generation on the files in the root folder.
         
         :param root: The root folder path."""
-        files = self.types[Column.FILENAME].unique()
+        if isinstance(self.types, TraceStore):
+            files = self.types.filenames()
+        else:
+            files = self.types[Column.FILENAME].unique()
         as_paths = map(pathlib.Path, files)
         for path in filter(self._is_hintable_file, as_paths):
-            # Get type hints relevant to this file
-            applicable = self.types[self.types[Column.FILENAME] == str(path)]
+            # Get type hints relevant to this file; transformers expect decoded strings
+            applicable = self._applicable(path)
             if not applicable.empty:
                 logger.info(f"Generating type hints for {path}")
 
@@ -60,6 +85,16 @@ class TypeHintGenerator(abc.ABC):
                 typed = self._gen_hinted_ast(applicable=applicable, module=module)
                 self._store_hinted_ast(source_file=from_root, hinting=typed)
 
+    def _applicable(self, path: pathlib.Path) -> pd.DataFrame:
+        if isinstance(self.types, TraceStore):
+            applicable = self.types.query(filename=str(path))
+        else:
+            applicable = self.types[self.types[Column.FILENAME] == str(path)]
+
+        if self.trace_data_filter is not None:
+            applicable = self.trace_data_filter.apply(applicable)
+        return trace_data_encoding.expand(applicable)
+
     def _gen_hinted_ast(
         self, applicable: pd.DataFrame, module: cst.Module
     ) -> cst.Module:
@@ -1,10 +1,13 @@
+import collections
+import concurrent.futures
 import typing
 import pathlib
 
 import pandas as pd
 import constants
-from common import DataFileCollector
-from constants import Schema
+from common import DataFileCollector, InternTable, trace_data_encoding, trace_data_file
+from common.trace_data_encoding import STRING_COLUMNS, StreamingConcatenation
+from constants import Column, Schema
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,29 +16,180 @@ logger = logging.getLogger(__name__)
 class TraceDataFileCollector(DataFileCollector):
     """Collects trace data files in a given path."""
 
-    def __init__(self):
-        """Creates an instance of TraceDataFileCollector."""
+    def __init__(
+        self,
+        compact: bool = False,
+        counted: bool = False,
+        workers: int = 1,
+        use_processes: bool = False,
+        streaming: bool = False,
+        batch_size: int = constants.COLLECTION_BATCH_SIZE,
+    ):
+        """Creates an instance of TraceDataFileCollector.
+        :param compact: Whether the collected trace data is dictionary-encoded, see `Schema.CompactTraceData`.
+        Files in either encoding are accepted regardless.
+        :param counted: Whether the collected trace data is followed by `Column.COUNT`, how often each row has occurred;
+        rows of files without counts count once.
+        :param workers: The amount of files that are loaded in parallel.
+        :param use_processes: Whether the files are loaded by a pool of processes rather than threads.
+        Processes load pickles in parallel, but return the trace data to this process by pickling it.
+        :param streaming: Whether `collect_data` concatenates the trace data batch by batch, see `StreamingConcatenation`,
+        rather than keeping every file in `collected_data` until all of them are loaded.
+        :param batch_size: The amount of rows per batch yielded by `iter_batches`."""
         super().__init__(f"*{constants.TRACE_DATA_FILE_ENDING}")
-        self.trace_data = pd.DataFrame(columns=Schema.TraceData.keys())
-        self.trace_data = self.trace_data.astype(Schema.TraceData)
+        self.compact = compact
+        self.counted = counted
+        self.workers = workers
+        self.use_processes = use_processes
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self._intern_table = InternTable()
+
+        schema = Schema.CompactTraceData if self.compact else Schema.TraceData
+        if self.counted:
+            schema = schema | {Column.COUNT: Schema.Multiplicities[Column.COUNT]}
+        self.trace_data = pd.DataFrame(columns=schema.keys())
+        self.trace_data = self.trace_data.astype(schema)
 
     def collect_data(
         self, path: pathlib.Path, include_also_files_in_subdirectories: bool = True
     ) -> None:
         """Collects the data in a given path.
-        :param path: The path of the folder containing the files. 
+        :param path: The path of the folder containing the files.
         :param include_also_files_in_subdirectories: Whether the data files in the subfolders should also be collected."""
-        super().collect_data(path, include_also_files_in_subdirectories)
+        self.collected_data.clear()
+        if self.streaming:
+            concatenation = StreamingConcatenation()
+            for batch in self.iter_batches(path, include_also_files_in_subdirectories):
+                concatenation.add(batch)
+            if len(concatenation) > 0:
+                self.trace_data = concatenation.result()
+            return
 
+        file_paths = self._find_file_paths(path, include_also_files_in_subdirectories)
+        self.collected_data = list(self._load_files(file_paths))
         if len(self.collected_data) > 0:
-            self.trace_data = pd.concat(
-                self.collected_data, ignore_index=True, sort=False
-            )
+            self.trace_data = self._encode(self.collected_data)
 
-    def _on_potential_file_path_found(self, file_path: pathlib.Path) -> typing.Any:
-        potential_trace_data = pd.read_pickle(file_path)
-        if (self.trace_data.dtypes == potential_trace_data.dtypes).all():
-            return potential_trace_data
+    def iter_batches(
+        self, path: pathlib.Path, include_also_files_in_subdirectories: bool = True
+    ) -> typing.Iterator[pd.DataFrame]:
+        """Loads the trace data in a given path, and yields it in batches of `batch_size` rows, the last one
+        possibly being smaller. Only the files that are being loaded and the rows of the current batch are held in memory.
+        :param path: The path of the folder containing the files.
+        :param include_also_files_in_subdirectories: Whether the data files in the subfolders should also be collected.
+        :returns: The batches, in the encoding of this collector and in the order of the files."""
+        file_paths = self._find_file_paths(path, include_also_files_in_subdirectories)
+
+        pending: list[pd.DataFrame] = list()
+        pending_rows = 0
+        for trace_data in self._load_files(file_paths):
+            pending.append(trace_data)
+            pending_rows += len(trace_data)
+            if pending_rows < self.batch_size:
+                continue
+
+            rows = self._encode(pending)
+            start = 0
+            while len(rows) - start >= self.batch_size:
+                yield rows.iloc[start : start + self.batch_size].reset_index(drop=True)
+                start += self.batch_size
+            pending = [rows.iloc[start:]]
+            pending_rows = len(rows) - start
+
+        if pending_rows > 0:
+            yield self._encode(pending)
+
+    def _load_files(
+        self, file_paths: list[pathlib.Path]
+    ) -> typing.Iterator[pd.DataFrame]:
+        # Loads the files in their order, keeping at most two per worker in flight
+        if self.workers <= 1:
+            for file_path in file_paths:
+                yield from self._result_of(
+                    file_path, lambda: _load_trace_data(file_path, self.counted)
+                )
+            return
+
+        executor_type = (
+            concurrent.futures.ProcessPoolExecutor
+            if self.use_processes
+            else concurrent.futures.ThreadPoolExecutor
+        )
+        with executor_type(max_workers=self.workers) as executor:
+            in_flight: collections.deque[
+                tuple[pathlib.Path, concurrent.futures.Future]
+            ] = collections.deque()
+            for file_path in file_paths:
+                # Paths are passed as strings, as processes may not share the classes of pathlib
+                future = executor.submit(_load_trace_data, str(file_path), self.counted)
+                in_flight.append((file_path, future))
+                if len(in_flight) >= 2 * self.workers:
+                    file_path, future = in_flight.popleft()
+                    yield from self._result_of(file_path, future.result)
+
+            while in_flight:
+                file_path, future = in_flight.popleft()
+                yield from self._result_of(file_path, future.result)
+
+    def _result_of(
+        self,
+        file_path: pathlib.Path,
+        load: typing.Callable[[], pd.DataFrame | None],
+    ) -> typing.Iterator[pd.DataFrame]:
+        try:
+            trace_data = load()
+        except Exception as exception:
+            logger.error(f"Error encountered for file: {str(file_path)}")
+            logger.error(exception)
+            return
+
+        if trace_data is not None:
+            yield trace_data
+
+    def _encode(self, collected: list[pd.DataFrame]) -> pd.DataFrame:
+        if self.compact:
+            # Every string is interned before encoding, so that all trace data shares the same categories
+            # and is concatenated without being decoded
+            for trace_data in collected:
+                for column in STRING_COLUMNS:
+                    self._intern_table.intern(trace_data[column].dropna().unique())
+            collected = [
+                trace_data_encoding.compact(trace_data, self._intern_table)
+                for trace_data in collected
+            ]
         else:
-            logger.info(f"Invalid column types for file: {str(file_path)}")
-            return None
+            collected = [
+                trace_data_encoding.expand(trace_data)
+                if trace_data_encoding.is_compact(trace_data)
+                else trace_data
+                for trace_data in collected
+            ]
+        return pd.concat(collected, ignore_index=True, sort=False)
+
+    def _on_potential_file_path_found(self, file_path: pathlib.Path) -> typing.Any:
+        return _load_trace_data(file_path, self.counted)
+
+
+def _load_trace_data(
+    file_path: pathlib.Path | str, counted: bool
+) -> pd.DataFrame | None:
+    # Runs in the workers of the collector, so that files of other schemas are discarded before being returned.
+    # The footer of columnar files describes their schema, so that those are not even mapped;
+    # pickles can only be checked once unpickled
+    file_path = pathlib.Path(file_path)
+    if trace_data_file.is_columnar(file_path) and not trace_data_file.has_trace_data_schema(file_path):
+        logger.info(f"Invalid column types for file: {str(file_path)}")
+        return None
+
+    potential_trace_data = trace_data_file.load(file_path)
+    if not trace_data_encoding.has_trace_data_schema(potential_trace_data):
+        logger.info(f"Invalid column types for file: {str(file_path)}")
+        return None
+
+    # Apart from their counts, the multiplicities of compacted files are not used by the unifiers
+    if not counted:
+        return potential_trace_data[list(Schema.TraceData)]
+    return potential_trace_data[list(Schema.TraceData)].assign(
+        **{Column.COUNT: trace_data_encoding.occurrences(potential_trace_data)}
+    )
@@ -2,14 +2,14 @@ import pandas as pd
 
 from .filter_base import TraceDataFilter
 
-from constants import Schema
+from common.trace_data_encoding import deduplicate, with_encoding_of
 
 
 class DropDuplicatesFilter(TraceDataFilter):
-    """Drops all duplicates in the trace data."""
+    """Drops all duplicates in the trace data, summing up their counts."""
 
     ident = "dedup"
 
     def apply(self, trace_data: pd.DataFrame) -> pd.DataFrame:
-        processed_trace_data = trace_data.drop_duplicates(ignore_index=True)
-        return processed_trace_data.reset_index(drop=True).astype(Schema.TraceData)
+        processed_trace_data = deduplicate(trace_data)
+        return with_encoding_of(processed_trace_data.reset_index(drop=True), trace_data)
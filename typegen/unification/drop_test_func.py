@@ -4,7 +4,8 @@ import pandas as pd
 
 from .filter_base import TraceDataFilter
 
-from constants import Column, Schema
+from common.trace_data_encoding import with_encoding_of
+from constants import Column
 
 
 class DropTestFunctionDataFilter(TraceDataFilter):
@@ -23,4 +24,4 @@ class DropTestFunctionDataFilter(TraceDataFilter):
         processed_trace_data = trace_data[
             ~trace_data[Column.FUNCNAME].str.match(self.test_name_pat, na=False)
         ]
-        return processed_trace_data.astype(Schema.TraceData)
+        return with_encoding_of(processed_trace_data, trace_data)
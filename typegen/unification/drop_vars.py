@@ -2,6 +2,7 @@ import pandas as pd
 
 from .filter_base import TraceDataFilter
 
+from common.trace_data_encoding import grouping_keys, with_encoding_of
 from constants import Column, Schema
 
 
@@ -15,18 +16,11 @@ class DropVariablesOfMultipleTypesFilter(TraceDataFilter):
     def apply(self, trace_data: pd.DataFrame) -> pd.DataFrame:
         subset = list(Schema.TraceData.keys())
         subset.remove(Column.VARTYPE)
-        grouped_trace_data_with_unique_count = (
-            trace_data.groupby(subset, dropna=False)[Column.VARTYPE]
-            .nunique()
-            .reset_index(name="amount_types")
-        )
-        joined_trace_data = pd.merge(
-            trace_data, grouped_trace_data_with_unique_count, on=subset, how="inner"
-        )
-        trace_data_with_dropped_variables = joined_trace_data[
-            joined_trace_data["amount_types"] < self.min_amount_types_to_drop
-        ]
-        processed_data = trace_data_with_dropped_variables.drop(
-            ["amount_types"], axis=1
-        )
-        return processed_data.reset_index(drop=True).astype(Schema.TraceData)
+
+        (types,) = grouping_keys(trace_data, [Column.VARTYPE])
+        amount_types = types.groupby(
+            grouping_keys(trace_data, subset), dropna=False
+        ).transform("nunique")
+
+        processed_data = trace_data[amount_types < self.min_amount_types_to_drop]
+        return with_encoding_of(processed_data.reset_index(drop=True), trace_data)
@@ -41,6 +41,15 @@ class TraceDataFilter(abc.ABC):
         """
         pass
 
+    def applies_per_file(self) -> bool:
+        """
+        Whether the filter may be applied to the trace data of each file separately,
+        i.e. it gives the same result as when applied to the trace data of all files at once.
+
+        :returns: True, unless the filter compares rows of different files.
+        """
+        return True
+
 
 class TraceDataFilterList(TraceDataFilter):
     """Applies the filters in this list on the trace data in the order they were appended"""
@@ -63,3 +72,9 @@ class TraceDataFilterList(TraceDataFilter):
         for trace_data_filter in self.filters:
             trace_data = trace_data_filter.apply(trace_data)
         return trace_data.reset_index(drop=True)
+
+    def applies_per_file(self) -> bool:
+        """
+        :returns: True if all filters in this list may be applied to the trace data of each file separately.
+        """
+        return all(trace_data_filter.applies_per_file() for trace_data_filter in self.filters)
@@ -2,6 +2,7 @@ import pandas as pd
 
 from .filter_base import TraceDataFilter
 
+from common.trace_data_encoding import grouping_keys, with_encoding_of
 from constants import Column, Schema
 
 
@@ -15,6 +16,8 @@ class KeepOnlyFirstFilter(TraceDataFilter):
         subset.remove(Column.VARTYPE_MODULE)
         subset.remove(Column.VARTYPE)
 
-        grouped_data = trace_data.groupby(subset, as_index=False, dropna=False)
+        grouped_data = trace_data.groupby(
+            grouping_keys(trace_data, subset), as_index=False, dropna=False
+        )
         processed_data = grouped_data.nth(0)
-        return processed_data.reset_index(drop=True).astype(Schema.TraceData)
+        return with_encoding_of(processed_data.reset_index(drop=True), trace_data)
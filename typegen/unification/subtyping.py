@@ -5,7 +5,8 @@ import pathlib
 from common.resolver import Resolver
 
 from .filter_base import TraceDataFilter
-from constants import Column, Schema
+from common.trace_data_encoding import deduplicate, grouping_keys, with_encoding_of
+from constants import Column
 
 logger = logging.getLogger(__name__)
 
@@ -30,20 +31,23 @@ class UnifySubTypesFilter(TraceDataFilter):
         self._resolver = Resolver(self.stdlib_path, self.proj_path, self.venv_path)
 
         grouped_trace_data = trace_data.groupby(
-            by=[
-                Column.CLASS_MODULE,
-                Column.CLASS,
-                Column.FUNCNAME,
-                Column.LINENO,
-                Column.CATEGORY,
-                Column.VARNAME,
-            ],
+            by=grouping_keys(
+                trace_data,
+                [
+                    Column.CLASS_MODULE,
+                    Column.CLASS,
+                    Column.FUNCNAME,
+                    Column.LINENO,
+                    Column.CATEGORY,
+                    Column.VARNAME,
+                ],
+            ),
             dropna=False,
             sort=False,
         )
 
         unified = [
-            self._update_group(trace_data, group).drop_duplicates()
+            deduplicate(self._update_group(trace_data, group))
             for _, group in grouped_trace_data
         ]
 
@@ -51,9 +55,13 @@ class UnifySubTypesFilter(TraceDataFilter):
 
         restored = pd.DataFrame(
             processed_trace_data.reset_index(drop=True),
-            columns=list(Schema.TraceData.keys()),
-        ).astype(Schema.TraceData)
-        return restored
+            columns=trace_data.columns,
+        )
+        return with_encoding_of(restored, trace_data)
+
+    def applies_per_file(self) -> bool:
+        # Rows are grouped regardless of their file, and base types may have been traced in other files
+        return False
 
     def _update_group(self, entire: pd.DataFrame, group):
         modules_with_types_in_group = group[
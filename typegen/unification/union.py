@@ -3,7 +3,8 @@ from typegen.unification.filter_base import TraceDataFilter
 
 import pandas as pd
 
-from constants import Column, Schema
+from common.trace_data_encoding import deduplicate, grouping_keys, with_encoding_of
+from constants import Column
 
 
 logger = logging.getLogger(__name__)
@@ -16,28 +17,35 @@ class UnionFilter(TraceDataFilter):
 
     def apply(self, trace_data: pd.DataFrame) -> pd.DataFrame:
         grouped = trace_data.groupby(
-            by=[
-                Column.CLASS_MODULE,
-                Column.CLASS,
-                Column.FUNCNAME,
-                Column.LINENO,
-                Column.CATEGORY,
-                Column.VARNAME,
-            ],
+            by=grouping_keys(
+                trace_data,
+                [
+                    Column.CLASS_MODULE,
+                    Column.CLASS,
+                    Column.FUNCNAME,
+                    Column.LINENO,
+                    Column.CATEGORY,
+                    Column.VARNAME,
+                ],
+            ),
             dropna=False,
             group_keys=False,
             sort=False,
         )
 
         # Update group changes the values of every element in the group; only keep the first occurrence
-        unions = [self._update_group(group).drop_duplicates() for _, group in grouped]
+        unions = [deduplicate(self._update_group(group)) for _, group in grouped]
         processed_trace_data = pd.concat(unions)
 
         restored = pd.DataFrame(
             processed_trace_data.reset_index(drop=True),
-            columns=list(Schema.TraceData.keys()),
-        ).astype(Schema.TraceData)
-        return restored
+            columns=trace_data.columns,
+        )
+        return with_encoding_of(restored, trace_data)
+
+    def applies_per_file(self) -> bool:
+        # Rows are grouped regardless of their file
+        return False
 
     def _update_group(self, group):
         if group.shape[0] == 1:
@@ -48,7 +56,7 @@ class UnionFilter(TraceDataFilter):
             )
             return group
 
-        new_module = ",".join(group[Column.VARTYPE_MODULE].fillna(""))
+        new_module = ",".join(group[Column.VARTYPE_MODULE].astype("string").fillna(""))
         new_type = " | ".join(group[Column.VARTYPE])
 
         updated_group = group.copy()